@@ -0,0 +1,152 @@
+from __future__ import annotations
+
+import asyncio
+import math
+import time
+from collections import Counter, OrderedDict, deque
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from typing import Any
+
+from .profiling import record
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, reason: str, retry_after: int) -> None:
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """Concurrency limits per user and per organization in front of Azure DevOps fan-out.
+
+    Waiting requests are queued per user and granted round-robin across users, so one user
+    refreshing in a loop only queues behind themselves. Requests whose expected wait exceeds
+    ``queue_budget_seconds`` are shed instead of queued.
+    """
+
+    def __init__(
+        self,
+        user_concurrency: int = 4,
+        org_concurrency: int = 16,
+        queue_budget_seconds: float = 5.0,
+        max_queue: int = 200,
+    ) -> None:
+        self.user_concurrency = user_concurrency
+        self.org_concurrency = org_concurrency
+        self.queue_budget_seconds = queue_budget_seconds
+        self.max_queue = max_queue
+        self._in_flight_user: Counter[str] = Counter()
+        self._in_flight_org: Counter[str] = Counter()
+        self._waiting: OrderedDict[tuple[str, str], deque[asyncio.Future]] = OrderedDict()
+        self._queued = 0
+        # Exponentially weighted service time per org, used to predict queueing delay.
+        self._service_seconds: dict[str, float] = {}
+        self._counters: Counter[str] = Counter()
+
+    def _eligible(self, org: str, user: str) -> bool:
+        return self._in_flight_user[user] < self.user_concurrency and self._in_flight_org[org] < self.org_concurrency
+
+    def _expected_wait(self, org: str, user: str) -> float:
+        service = self._service_seconds.get(org, 1.0)
+        own_queue = len(self._waiting.get((org, user), ()))
+        org_queue = sum(len(q) for (q_org, _), q in self._waiting.items() if q_org == org)
+        return max((own_queue + 1) / self.user_concurrency, (org_queue + 1) / self.org_concurrency) * service
+
+    def _dispatch(self) -> None:
+        granted = True
+        while granted:
+            granted = False
+            for key in list(self._waiting):
+                org, user = key
+                queue = self._waiting[key]
+                while queue and queue[0].done():
+                    queue.popleft()
+                if queue and self._eligible(org, user):
+                    self._grant(org, user)
+                    self._queued -= 1
+                    queue.popleft().set_result(None)
+                    granted = True
+                    # Move this user behind the others so the next free slot goes elsewhere.
+                    self._waiting.move_to_end(key)
+                if not queue:
+                    del self._waiting[key]
+
+    def _grant(self, org: str, user: str) -> None:
+        self._in_flight_user[user] += 1
+        self._in_flight_org[org] += 1
+
+    def _release(self, org: str, user: str, elapsed: float | None = None) -> None:
+        self._in_flight_user[user] -= 1
+        self._in_flight_org[org] -= 1
+        if self._in_flight_user[user] <= 0:
+            del self._in_flight_user[user]
+        if self._in_flight_org[org] <= 0:
+            del self._in_flight_org[org]
+        if elapsed is not None:
+            previous = self._service_seconds.get(org)
+            self._service_seconds[org] = elapsed if previous is None else 0.8 * previous + 0.2 * elapsed
+        self._dispatch()
+
+    def _reject(self, reason: str, wait: float) -> AdmissionRejected:
+        self._counters[f"rejected_{reason}"] += 1
+        return AdmissionRejected(reason, max(1, math.ceil(wait)))
+
+    async def _acquire(self, org: str, user: str) -> None:
+        key = (org, user)
+        if key not in self._waiting and self._eligible(org, user):
+            self._grant(org, user)
+            return
+
+        expected = self._expected_wait(org, user)
+        if self._queued >= self.max_queue:
+            raise self._reject("queue_full", expected)
+        if expected > self.queue_budget_seconds:
+            raise self._reject("over_budget", expected)
+
+        future = asyncio.get_running_loop().create_future()
+        self._waiting.setdefault(key, deque()).append(future)
+        self._queued += 1
+        self._counters["queued"] += 1
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(asyncio.shield(future), self.queue_budget_seconds)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as ex:
+            if future.done() and not future.cancelled():
+                # Granted at the same moment the wait gave up: hand the slot back.
+                self._release(org, user)
+            else:
+                future.cancel()
+                self._queued -= 1
+                self._dispatch()
+            if isinstance(ex, asyncio.CancelledError):
+                raise
+            raise self._reject("timeout", self._expected_wait(org, user)) from ex
+        finally:
+            record("queue", time.perf_counter() - started)
+
+    @asynccontextmanager
+    async def slot(self, organization: str, user: str) -> AsyncIterator[None]:
+        org = organization.strip().lower()
+        await self._acquire(org, user)
+        self._counters["admitted"] += 1
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._release(org, user, time.perf_counter() - started)
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            "limits": {
+                "user_concurrency": self.user_concurrency,
+                "org_concurrency": self.org_concurrency,
+                "queue_budget_seconds": self.queue_budget_seconds,
+                "max_queue": self.max_queue,
+            },
+            "counters": dict(self._counters),
+            "queued": self._queued,
+            "in_flight_by_org": dict(self._in_flight_org),
+            "service_seconds_by_org": {org: round(v, 3) for org, v in self._service_seconds.items()},
+        }
@@ -1,8 +1,13 @@
+import json
+import time
+from collections.abc import AsyncIterator
+
 import httpx
 from .config import settings
+from .profiling import record, timed_call
 
 
-async def summarize_failures(failure_messages: list[str]) -> str | None:
+def _chat_request(failure_messages: list[str]) -> tuple[str, dict, dict] | None:
     if not failure_messages:
         return None
     if not (settings.azure_openai_endpoint and settings.azure_openai_api_key and settings.azure_openai_deployment):
@@ -13,7 +18,7 @@ async def summarize_failures(failure_messages: list[str]) -> str | None:
         "and suggest concise remediations:\n\n" + "\n".join(f"- {m}" for m in failure_messages)
     )
     url = (
-        f"{settings.azure_openai_endpoint}/openai/deployments/{settings.azure_openai_deployment}"
+        f"{settings.azure_openai_endpoint.rstrip('/')}/openai/deployments/{settings.azure_openai_deployment}"
         f"/chat/completions?api-version={settings.azure_openai_api_version}"
     )
     headers = {"api-key": settings.azure_openai_api_key, "Content-Type": "application/json"}
@@ -24,9 +29,52 @@ async def summarize_failures(failure_messages: list[str]) -> str | None:
         ],
         "temperature": 0.2,
     }
+    return url, headers, body
+
+
+@timed_call("ai")
+async def summarize_failures(failure_messages: list[str]) -> str | None:
+    request = _chat_request(failure_messages)
+    if not request:
+        return None
+    url, headers, body = request
 
     async with httpx.AsyncClient(timeout=30) as client:
         response = await client.post(url, headers=headers, json=body)
         response.raise_for_status()
         data = response.json()
         return data["choices"][0]["message"]["content"]
+
+
+async def stream_failure_summary(failure_messages: list[str]) -> AsyncIterator[str]:
+    """Yield summary tokens as Azure OpenAI streams them.
+
+    Closing the generator (e.g. when the browser disconnects) closes the upstream connection,
+    which stops the generation.
+    """
+    request = _chat_request(failure_messages)
+    if not request:
+        return
+    url, headers, body = request
+
+    started = time.perf_counter()
+    try:
+        async with httpx.AsyncClient(timeout=httpx.Timeout(30, read=60)) as client:
+            async with client.stream("POST", url, headers=headers, json={**body, "stream": True}) as response:
+                response.raise_for_status()
+                async for line in response.aiter_lines():
+                    if not line.startswith("data:"):
+                        continue
+                    data = line[5:].strip()
+                    if data == "[DONE]":
+                        break
+                    try:
+                        chunk = json.loads(data)
+                    except ValueError:
+                        continue
+                    for choice in chunk.get("choices") or []:
+                        token = (choice.get("delta") or {}).get("content")
+                        if token:
+                            yield token
+    finally:
+        record("ai", time.perf_counter() - started)
@@ -1,22 +1,96 @@
+import asyncio
 import base64
-from collections import Counter
-from datetime import datetime
+import re
+import time
+from collections import Counter, deque
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
 import httpx
 
+from .disk_cache import immutable_cache
+from .profiling import record, timed
+
+
+# Azure Pipelines marks task errors with "##[error]"; the generic pattern is a fallback
+# for tools that only print plain error text.
+LOG_ERROR_MARKER = re.compile(r"##\[error\]", re.IGNORECASE)
+LOG_ERROR_PATTERN = re.compile(r"\b(error|failed|failure|exception|fatal)\b", re.IGNORECASE)
+LOG_TIMESTAMP_PREFIX = re.compile(r"^\ufeff?\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}(\.\d+)?Z\s?")
+LOG_LINE_MAX_CHARS = 500
+
+ADO_TIME_FRACTION = re.compile(r"\.(\d{1,6})\d*")
+
+
+def parse_ado_time(value: str | None) -> datetime | None:
+    """Parse Azure DevOps timestamps (``Z`` suffix, up to 7 fractional digits) as naive UTC."""
+    if not value:
+        return None
+    text = ADO_TIME_FRACTION.sub(lambda m: "." + m.group(1), value.strip()).replace("Z", "+00:00")
+    try:
+        parsed = datetime.fromisoformat(text)
+    except ValueError:
+        return None
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
 
 class AzureDevOpsClient:
-    def __init__(self, organization: str, pat: str):
+    def __init__(self, organization: str, pat: str, http: httpx.AsyncClient | None = None):
         self.organization = organization
         token = base64.b64encode(f":{pat}".encode("utf-8")).decode("utf-8")
         self.headers = {"Authorization": f"Basic {token}"}
         self.base_url = f"https://dev.azure.com/{organization}"
+        # A shared client keeps connections alive across the calls of one request fan-out.
+        self.http = http
 
-    async def _get(self, path: str, params: dict | None = None) -> dict:
-        url = f"{self.base_url}/{path}"
+    @asynccontextmanager
+    async def _http(self) -> AsyncIterator[httpx.AsyncClient]:
+        if self.http is not None:
+            yield self.http
+            return
         async with httpx.AsyncClient(timeout=20) as client:
-            response = await client.get(url, headers=self.headers, params=params)
-            response.raise_for_status()
-            return response.json()
+            yield client
+
+    async def _get_response(self, path: str, params: dict | None = None) -> httpx.Response:
+        url = f"{self.base_url}/{path}"
+        with timed("ado"):
+            async with self._http() as client:
+                response = await client.get(url, headers=self.headers, params=params)
+                response.raise_for_status()
+                return response
+
+    async def _get(self, path: str, params: dict | None = None) -> dict:
+        return (await self._get_response(path, params)).json()
+
+    async def _stream_lines(self, url: str, params: dict | None = None) -> AsyncIterator[str]:
+        if not url.startswith("http"):
+            url = f"{self.base_url}/{url}"
+        headers = {**self.headers, "Accept": "text/plain"}
+        # Recorded by hand: a context manager held across yields may be closed from another context.
+        started = time.perf_counter()
+        try:
+            async with self._http() as client:
+                async with client.stream("GET", url, headers=headers, params=params) as response:
+                    response.raise_for_status()
+                    async for line in response.aiter_lines():
+                        yield line
+        finally:
+            record("ado", time.perf_counter() - started)
+
+    async def validate(self) -> None:
+        """Cheap credential check: one project, no paging."""
+        response = await self._get_response("_apis/projects", {"api-version": "7.1-preview.4", "$top": 1})
+        if response.status_code == 203:
+            # An invalid PAT is answered with the sign-in page rather than a 401.
+            raise httpx.HTTPStatusError("Invalid personal access token", request=response.request, response=response)
+
+    async def check_project_access(self, project: str) -> None:
+        """Cheap per-project read check: one build, no paging."""
+        response = await self._get_response(f"{project}/_apis/build/builds", {"api-version": "7.1", "$top": 1})
+        if response.status_code == 203:
+            raise httpx.HTTPStatusError("Invalid personal access token", request=response.request, response=response)
 
     async def list_projects(self) -> list[dict]:
         data = await self._get("_apis/projects", {"api-version": "7.1-preview.4"})
@@ -40,8 +114,272 @@ class AzureDevOpsClient:
         )
         return data.get("value", [])
 
+    async def list_agent_pools(self) -> list[dict]:
+        data = await self._get("_apis/distributedtask/pools", {"api-version": "7.1"})
+        return data.get("value", [])
+
+    async def list_pool_agents(self, pool_id: int) -> list[dict]:
+        data = await self._get(
+            f"_apis/distributedtask/pools/{pool_id}/agents",
+            {"api-version": "7.1", "includeAssignedRequest": "true"},
+        )
+        return data.get("value", [])
+
+    async def list_environments(self, project: str) -> list[dict]:
+        data = await self._get(f"{project}/_apis/pipelines/environments", {"api-version": "7.1", "$top": 1000})
+        return data.get("value", [])
+
+    async def list_environment_deployments(
+        self,
+        project: str,
+        environment_id: int,
+        since_record_id: int | None = None,
+        min_finish_time: str | None = None,
+        continuation_token: str | None = None,
+        page_size: int = 100,
+        max_pages: int = 20,
+    ) -> tuple[list[dict], str | None]:
+        """Deployment records newest first, and the continuation token when ``max_pages`` cut the listing short.
+
+        Paging stops at the first record already ingested or finished before ``min_finish_time``.
+        A truncated listing misses the oldest new records; pass the token back to continue it.
+        """
+        records: list[dict] = []
+        token = continuation_token
+        for _ in range(max_pages):
+            params: dict = {"api-version": "7.1", "top": page_size}
+            if token:
+                params["continuationToken"] = token
+            response = await self._get_response(
+                f"{project}/_apis/distributedtask/environments/{environment_id}/environmentdeploymentrecords", params
+            )
+            for record in response.json().get("value", []):
+                if since_record_id is not None and (record.get("id") or 0) <= since_record_id:
+                    return records, None
+                if min_finish_time and record.get("finishTime") and record["finishTime"] < min_finish_time:
+                    return records, None
+                records.append(record)
+            token = response.headers.get("x-ms-continuationtoken")
+            if not token:
+                return records, None
+        return records, token
+
+    async def list_repositories(self, project: str) -> list[dict]:
+        data = await self._get(f"{project}/_apis/git/repositories", {"api-version": "7.1"})
+        return data.get("value", [])
+
+    async def list_pushes(
+        self,
+        project: str,
+        repository_id: str,
+        since_push_id: int | None = None,
+        from_date: str | None = None,
+        to_date: str | None = None,
+        page_size: int = 100,
+        max_pages: int = 20,
+    ) -> tuple[list[dict], bool]:
+        """Pushes newer than ``since_push_id``, newest first, and whether ``max_pages`` cut the listing short.
+
+        Paging stops at the first push already ingested. A truncated listing misses the oldest
+        new pushes, so callers must not advance a cursor past them.
+        """
+        pushes: list[dict] = []
+        for page in range(max_pages):
+            params: dict = {"api-version": "7.1", "$top": page_size, "$skip": page * page_size}
+            if from_date:
+                params["searchCriteria.fromDate"] = from_date
+            if to_date:
+                params["searchCriteria.toDate"] = to_date
+            data = await self._get(f"{project}/_apis/git/repositories/{repository_id}/pushes", params)
+            batch = data.get("value", [])
+            for push in batch:
+                if since_push_id is not None and (push.get("pushId") or 0) <= since_push_id:
+                    return pushes, False
+                pushes.append(push)
+            if len(batch) < page_size:
+                return pushes, False
+        return pushes, True
+
+    async def list_completed_pull_requests(
+        self,
+        project: str,
+        repository_id: str,
+        closed_since: str | None = None,
+        closed_until: str | None = None,
+        page_size: int = 100,
+        concurrency: int = 4,
+        max_pages: int = 40,
+    ) -> tuple[list[dict], bool]:
+        """Pull requests completed in the window, and whether ``max_pages`` cut the listing short.
+
+        Pages are $skip-addressed, so a wave of ``concurrency`` pages is fetched at once; the
+        first short page ends the listing. The API does not order by closing date, so a
+        truncated listing may miss any pull request in the window.
+        """
+        params: dict = {
+            "api-version": "7.1",
+            "searchCriteria.status": "completed",
+            "$top": page_size,
+        }
+        if closed_since or closed_until:
+            params["searchCriteria.queryTimeRangeType"] = "closed"
+        if closed_since:
+            params["searchCriteria.minTime"] = closed_since
+        if closed_until:
+            params["searchCriteria.maxTime"] = closed_until
+        path = f"{project}/_apis/git/repositories/{repository_id}/pullrequests"
+
+        pull_requests: list[dict] = []
+        for first_page in range(0, max_pages, concurrency):
+            pages = range(first_page, min(first_page + concurrency, max_pages))
+            batches = await asyncio.gather(*(self._get(path, {**params, "$skip": p * page_size}) for p in pages))
+            for data in batches:
+                batch = data.get("value", [])
+                pull_requests.extend(batch)
+                if len(batch) < page_size:
+                    return pull_requests, False
+        return pull_requests, True
+
+    async def list_pull_request_threads(self, project: str, repository_id: str, pull_request_id: int) -> list[dict]:
+        data = await self._get(
+            f"{project}/_apis/git/repositories/{repository_id}/pullRequests/{pull_request_id}/threads",
+            {"api-version": "7.1"},
+        )
+        return data.get("value", [])
+
+    async def list_test_runs(self, project: str, build_id: int) -> list[dict]:
+        data = await self._get(
+            f"{project}/_apis/test/runs",
+            {"api-version": "7.1", "buildUri": f"vstfs:///Build/Build/{build_id}"},
+        )
+        return data.get("value", [])
+
+    async def list_test_results(
+        self,
+        project: str,
+        run_id: int,
+        page_size: int = 1000,
+        max_pages: int = 20,
+    ) -> list[dict]:
+        results: list[dict] = []
+        for page in range(max_pages):
+            data = await self._get(
+                f"{project}/_apis/test/Runs/{run_id}/results",
+                {"api-version": "7.1", "$top": page_size, "$skip": page * page_size},
+            )
+            batch = data.get("value", [])
+            results.extend(batch)
+            if len(batch) < page_size:
+                break
+        return results
+
+    async def list_builds_page(
+        self,
+        project: str,
+        definition_id: int,
+        min_time: str | None = None,
+        max_time: str | None = None,
+        top: int = 50,
+        continuation_token: str | None = None,
+    ) -> tuple[list[dict], str | None]:
+        params: dict = {
+            "api-version": "7.1",
+            "definitions": definition_id,
+            "$top": top,
+            "queryOrder": "queueTimeDescending",
+        }
+        if min_time:
+            params["minTime"] = min_time
+        if max_time:
+            params["maxTime"] = max_time
+        if continuation_token:
+            params["continuationToken"] = continuation_token
+        response = await self._get_response(f"{project}/_apis/build/builds", params)
+        return response.json().get("value", []), response.headers.get("x-ms-continuationtoken")
+
+    async def get_build(self, project: str, build_id: int) -> dict:
+        key = immutable_cache.key(self.organization, project, "build", build_id)
+        if cached := await immutable_cache.aget(key):
+            return cached
+        build = await self._get(f"{project}/_apis/build/builds/{build_id}", {"api-version": "7.1"})
+        if build.get("status") == "completed":
+            await immutable_cache.aset(key, build)
+        return build
+
     async def timeline(self, project: str, build_id: int) -> dict:
-        return await self._get(f"{project}/_apis/build/builds/{build_id}/timeline", {"api-version": "7.1"})
+        key = immutable_cache.key(self.organization, project, "timeline", build_id)
+        if cached := await immutable_cache.aget(key):
+            return cached
+        data = await self._get(f"{project}/_apis/build/builds/{build_id}/timeline", {"api-version": "7.1"})
+        records = data.get("records") or []
+        # In-progress builds still have pending records; only a finished timeline is immutable.
+        if records and all(r.get("state") == "completed" for r in records):
+            await immutable_cache.aset(key, data)
+        return data
+
+    async def list_build_logs(self, project: str, build_id: int) -> list[dict]:
+        data = await self._get(f"{project}/_apis/build/builds/{build_id}/logs", {"api-version": "7.1"})
+        return data.get("value", [])
+
+    async def build_log_errors(
+        self,
+        project: str,
+        build_id: int,
+        log_id: int,
+        tail_lines: int = 400,
+        max_errors: int = 5,
+        completed: bool = False,
+    ) -> list[str]:
+        kind = f"log-errors-{tail_lines}-{max_errors}"
+        key = immutable_cache.key(self.organization, project, kind, f"{build_id}-{log_id}")
+        if completed and (cached := await immutable_cache.aget(key)) is not None:
+            return cached
+
+        line_count = None
+        try:
+            logs = await self.list_build_logs(project, build_id)
+            line_count = next((log.get("lineCount") for log in logs if log.get("id") == log_id), None)
+        except httpx.HTTPError:
+            pass
+
+        params: dict = {"api-version": "7.1"}
+        if line_count and line_count > tail_lines:
+            params["startLine"] = line_count - tail_lines + 1
+            params["endLine"] = line_count
+
+        # Only the last few matches are kept, so memory stays bounded even when the
+        # range request is not possible and the whole log has to be streamed.
+        marked: deque[str] = deque(maxlen=max_errors)
+        generic: deque[str] = deque(maxlen=max_errors)
+        async for line in self._stream_lines(f"{project}/_apis/build/builds/{build_id}/logs/{log_id}", params):
+            if LOG_ERROR_MARKER.search(line):
+                marked.append(self.clean_log_line(LOG_ERROR_MARKER.sub("", line, count=1)))
+            elif not marked and LOG_ERROR_PATTERN.search(line):
+                generic.append(self.clean_log_line(line))
+
+        errors = [line for line in (marked or generic) if line]
+        if completed:
+            await immutable_cache.aset(key, errors)
+        return errors
+
+    @staticmethod
+    def slim_run(build: dict) -> dict:
+        # Same keys the pipeline runs API uses, so run-history rows match /runs rows.
+        return {
+            "id": build.get("id"),
+            "name": build.get("buildNumber"),
+            "state": build.get("status"),
+            "result": build.get("result"),
+            "createdDate": build.get("queueTime"),
+            "startTime": build.get("startTime"),
+            "finishedDate": build.get("finishTime"),
+            "sourceBranch": build.get("sourceBranch"),
+            "requestedFor": (build.get("requestedFor") or {}).get("displayName"),
+        }
+
+    @staticmethod
+    def clean_log_line(line: str) -> str:
+        return LOG_TIMESTAMP_PREFIX.sub("", line).strip()[:LOG_LINE_MAX_CHARS]
 
     @staticmethod
     def summarize_build_trends(builds: list[dict]) -> dict:
@@ -0,0 +1,397 @@
+from __future__ import annotations
+
+import threading
+from collections.abc import Iterator
+from datetime import datetime
+from typing import Any
+
+from .capacity_store import CapacityStore
+from .db import get_database
+from .profiling import timed_methods
+from .rollup_store import RollupStore
+
+BUILD_FIELDS = (
+    "id",
+    "buildNumber",
+    "status",
+    "result",
+    "reason",
+    "queueTime",
+    "startTime",
+    "finishTime",
+    "sourceBranch",
+    "sourceVersion",
+)
+
+
+def slim_build(build: dict[str, Any]) -> dict[str, Any]:
+    definition = build.get("definition") or {}
+    project = build.get("project") or definition.get("project") or {}
+    requested_for = build.get("requestedFor") or {}
+    queue = build.get("queue") or {}
+    slim = {key: build.get(key) for key in BUILD_FIELDS if build.get(key) is not None}
+    slim["definition"] = {"id": definition.get("id"), "name": definition.get("name")}
+    slim["project"] = {"id": project.get("id"), "name": project.get("name")}
+    if requested_for:
+        slim["requestedFor"] = {
+            "uniqueName": requested_for.get("uniqueName"),
+            "displayName": requested_for.get("displayName"),
+        }
+    if queue:
+        pool = queue.get("pool") or {}
+        slim["queue"] = {
+            "id": queue.get("id"),
+            "name": queue.get("name"),
+            "pool": {"id": pool.get("id"), "name": pool.get("name")},
+        }
+    return slim
+
+
+def _set_fields(row: dict[str, Any], prefix: str = "") -> dict[str, Any]:
+    """Flatten nested fields to dotted paths, dropping ``None`` values.
+
+    Partial records (e.g. run-state service hooks carry no project name) then only set what
+    they know instead of overwriting stored subfields with ``None``.
+    """
+    fields: dict[str, Any] = {}
+    for key, value in row.items():
+        if isinstance(value, dict):
+            fields.update(_set_fields(value, f"{prefix}{key}."))
+        elif value is not None:
+            fields[f"{prefix}{key}"] = value
+    return fields
+
+
+def _merge(stored: dict[str, Any], row: dict[str, Any]) -> dict[str, Any]:
+    merged = dict(stored)
+    for key, value in row.items():
+        if isinstance(value, dict):
+            merged[key] = _merge(stored.get(key) or {}, value)
+        elif value is not None:
+            merged[key] = value
+    return merged
+
+
+@timed_methods("store")
+class BuildStore:
+    """Local copy of build history per organization/project, fed by syncs and service hooks."""
+
+    def __init__(self, rollups: RollupStore | None = None, capacity: CapacityStore | None = None) -> None:
+        self.rollups = rollups
+        self.capacity = capacity
+        self._builds_mem: dict[tuple[str, str, int], dict[str, Any]] = {}
+        self._sync_mem: dict[tuple[str, str], dict[str, Any]] = {}
+        self._builds_ref = None
+        self._sync_ref = None
+        self._ready = False
+        self._ready_lock = threading.Lock()
+
+    def ensure_ready(self) -> None:
+        if self._ready:
+            return
+        with self._ready_lock:
+            if self._ready:
+                return
+            db = get_database()
+            if db is not None:
+                self._builds_ref = db["builds"]
+                self._sync_ref = db["build_sync"]
+            self._ready = True
+
+    @property
+    def _builds_collection(self):
+        self.ensure_ready()
+        return self._builds_ref
+
+    @property
+    def _sync_collection(self):
+        self.ensure_ready()
+        return self._sync_ref
+
+    def _org(self, organization: str) -> str:
+        return organization.strip().lower()
+
+    def upsert_builds(self, organization: str, project: str, builds: list[dict[str, Any]]) -> int:
+        org = self._org(organization)
+        rows = [{**slim_build(b), "organization": org, "project_name": project} for b in builds if b.get("id")]
+        if not rows:
+            return 0
+
+        if self._builds_collection is not None:
+            from pymongo import UpdateOne
+
+            self._builds_collection.bulk_write(
+                [
+                    UpdateOne(
+                        {"organization": org, "project_name": project, "id": row["id"]},
+                        {"$set": _set_fields(row)},
+                        upsert=True,
+                    )
+                    for row in rows
+                ],
+                ordered=False,
+            )
+        else:
+            for row in rows:
+                key = (org, project, row["id"])
+                self._builds_mem[key] = _merge(self._builds_mem.get(key, {}), row)
+
+        self._bump_version(org, project, rows)
+        self._roll_up(org, project, [row["id"] for row in rows if row.get("status") == "completed"])
+        return len(rows)
+
+    def _rollup_targets(self) -> list[tuple[str, RollupStore | CapacityStore]]:
+        # Each rollup has its own flag, so one added later still backfills from stored builds.
+        targets = (("rolled_up", self.rollups), ("capacity_rolled_up", self.capacity))
+        return [(flag, target) for flag, target in targets if target is not None]
+
+    def _roll_up(self, org: str, project: str, completed_ids: list[int], flag: str | None = None) -> None:
+        # Each completed build is folded into each rollup exactly once.
+        if not completed_ids:
+            return
+        for target_flag, target in self._rollup_targets():
+            if flag is None or flag == target_flag:
+                # Partial records (run-state hooks) may report completion before the finish
+                # time is known; those wait for a record that has it, so durations are kept.
+                claimed = self.claim_builds(org, project, completed_ids, target_flag, require=("finishTime",))
+                target.add_builds(org, project, claimed)
+
+    def claim_builds(
+        self,
+        organization: str,
+        project: str,
+        build_ids: list[int],
+        flag: str,
+        require: tuple[str, ...] = (),
+    ) -> list[dict[str, Any]]:
+        """Set ``flag`` on the given builds and return those this call set it on.
+
+        The flag is claimed with a conditional update, so concurrent workers cannot both
+        process the same build. Builds missing any field in ``require`` are left unclaimed.
+        """
+        org = self._org(organization)
+        if not build_ids:
+            return []
+        if self._builds_collection is not None:
+            scope = {"organization": org, "project_name": project, **{field: {"$ne": None} for field in require}}
+            pending = self._builds_collection.find({**scope, "id": {"$in": build_ids}, flag: {"$ne": True}}, {"_id": 0})
+            return [
+                build
+                for build in pending
+                if self._builds_collection.update_one(
+                    {**scope, "id": build["id"], flag: {"$ne": True}}, {"$set": {flag: True}}
+                ).modified_count
+            ]
+        claimed = []
+        for build_id in build_ids:
+            build = self._builds_mem.get((org, project, build_id))
+            if build and not build.get(flag) and all(build.get(field) is not None for field in require):
+                build[flag] = True
+                claimed.append(build)
+        return claimed
+
+    def release_builds(self, organization: str, project: str, build_ids: list[int], flag: str) -> None:
+        org = self._org(organization)
+        if self._builds_collection is not None:
+            self._builds_collection.update_many(
+                {"organization": org, "project_name": project, "id": {"$in": build_ids}}, {"$unset": {flag: ""}}
+            )
+            return
+        for build_id in build_ids:
+            build = self._builds_mem.get((org, project, build_id))
+            if build:
+                build.pop(flag, None)
+
+    def list_unflagged(
+        self,
+        organization: str,
+        project: str,
+        flag: str,
+        results: tuple[str, ...],
+        limit: int,
+    ) -> list[dict[str, Any]]:
+        """Oldest completed builds with one of ``results`` that do not carry ``flag`` yet.
+
+        Oldest first, so consumers folding builds into ordered histories see them in order even
+        when the backlog spans several batches.
+        """
+        org = self._org(organization)
+        if self._builds_collection is not None:
+            query = {
+                "organization": org,
+                "project_name": project,
+                "status": "completed",
+                "result": {"$in": list(results)},
+                flag: {"$ne": True},
+            }
+            return list(self._builds_collection.find(query, {"_id": 0}).sort("id", 1).limit(limit))
+        rows = [
+            b
+            for (b_org, b_project, _), b in self._builds_mem.items()
+            if b_org == org
+            and b_project == project
+            and b.get("status") == "completed"
+            and b.get("result") in results
+            and not b.get(flag)
+        ]
+        rows.sort(key=lambda b: b["id"])
+        return rows[:limit]
+
+    def roll_up_pending(self) -> int:
+        """Fold completed builds stored before a rollup existed; used by ``app.migrations``."""
+        folded = 0
+        for flag, _ in self._rollup_targets():
+            if self._builds_collection is not None:
+                scopes = self._builds_collection.aggregate(
+                    [
+                        {"$match": {"status": "completed", flag: {"$ne": True}}},
+                        {
+                            "$group": {
+                                "_id": {"organization": "$organization", "project_name": "$project_name"},
+                                "ids": {"$push": "$id"},
+                            }
+                        },
+                    ]
+                )
+                pending = [(row["_id"]["organization"], row["_id"]["project_name"], row["ids"]) for row in scopes]
+            else:
+                grouped: dict[tuple[str, str], list[int]] = {}
+                for (org, project, build_id), build in self._builds_mem.items():
+                    if build.get("status") == "completed" and not build.get(flag):
+                        grouped.setdefault((org, project), []).append(build_id)
+                pending = [(org, project, ids) for (org, project), ids in grouped.items()]
+
+            for org, project, ids in pending:
+                self._roll_up(org, project, ids, flag)
+            folded += sum(len(ids) for _, _, ids in pending)
+        return folded
+
+    def _builds_query(
+        self,
+        org: str,
+        project: str,
+        definition_id: int | None,
+        since: str | None,
+        until: str | None,
+    ) -> dict[str, Any]:
+        query: dict[str, Any] = {"organization": org, "project_name": project}
+        if definition_id is not None:
+            query["definition.id"] = definition_id
+        if since or until:
+            query["queueTime"] = {}
+            if since:
+                query["queueTime"]["$gte"] = since
+            if until:
+                query["queueTime"]["$lt"] = until
+        return query
+
+    def iter_builds(
+        self,
+        organization: str,
+        project: str,
+        definition_id: int | None = None,
+        since: str | None = None,
+        until: str | None = None,
+        batch_size: int = 1000,
+    ) -> Iterator[dict[str, Any]]:
+        """Like ``list_builds`` without a limit, but streamed from a cursor in batches."""
+        if self._builds_collection is None:
+            yield from self.list_builds(organization, project, definition_id, since, until)
+            return
+        query = self._builds_query(self._org(organization), project, definition_id, since, until)
+        cursor = self._builds_collection.find(query, {"_id": 0}).sort([("queueTime", -1), ("id", -1)])
+        with cursor.batch_size(batch_size) as rows:
+            yield from rows
+
+    def get_builds(self, organization: str, project: str, build_ids: list[int]) -> dict[int, dict[str, Any]]:
+        org = self._org(organization)
+        if self._builds_collection is not None:
+            rows = self._builds_collection.find(
+                {"organization": org, "project_name": project, "id": {"$in": build_ids}}, {"_id": 0}
+            )
+            return {row["id"]: row for row in rows}
+        return {
+            build_id: self._builds_mem[(org, project, build_id)]
+            for build_id in build_ids
+            if (org, project, build_id) in self._builds_mem
+        }
+
+    def list_builds(
+        self,
+        organization: str,
+        project: str,
+        definition_id: int | None = None,
+        since: str | None = None,
+        until: str | None = None,
+        limit: int | None = None,
+    ) -> list[dict[str, Any]]:
+        org = self._org(organization)
+        query = self._builds_query(org, project, definition_id, since, until)
+
+        if self._builds_collection is not None:
+            cursor = self._builds_collection.find(query, {"_id": 0}).sort([("queueTime", -1), ("id", -1)])
+            if limit:
+                cursor = cursor.limit(limit)
+            return list(cursor)
+
+        rows = [
+            b
+            for (b_org, b_project, _), b in self._builds_mem.items()
+            if b_org == org
+            and b_project == project
+            and (definition_id is None or (b.get("definition") or {}).get("id") == definition_id)
+            and (not since or (b.get("queueTime") or "") >= since)
+            and (not until or (b.get("queueTime") or "") < until)
+        ]
+        rows.sort(key=lambda b: (b.get("queueTime") or "", b.get("id") or 0), reverse=True)
+        return rows[:limit] if limit else rows
+
+    def get_sync_state(self, organization: str, project: str) -> dict[str, Any] | None:
+        org = self._org(organization)
+        if self._sync_collection is not None:
+            return self._sync_collection.find_one({"organization": org, "project_name": project}, {"_id": 0})
+        return self._sync_mem.get((org, project))
+
+    def mark_synced(self, organization: str, project: str) -> None:
+        org = self._org(organization)
+        now = datetime.utcnow()
+        if self._sync_collection is not None:
+            self._sync_collection.update_one(
+                {"organization": org, "project_name": project},
+                {"$set": {"synced_at": now}, "$setOnInsert": {"version": 0}},
+                upsert=True,
+            )
+            return
+        state = self._sync_mem.setdefault((org, project), {"organization": org, "project_name": project, "version": 0})
+        state["synced_at"] = now
+
+    def version(self, organization: str, project: str) -> int:
+        state = self.get_sync_state(organization, project)
+        return int((state or {}).get("version") or 0)
+
+    def project_name_for_id(self, organization: str, project_id: str) -> str | None:
+        org = self._org(organization)
+        if self._sync_collection is not None:
+            row = self._sync_collection.find_one({"organization": org, "project_id": project_id})
+            return row.get("project_name") if row else None
+        for state in self._sync_mem.values():
+            if state["organization"] == org and state.get("project_id") == project_id:
+                return state["project_name"]
+        return None
+
+    def _bump_version(self, org: str, project: str, rows: list[dict[str, Any]]) -> None:
+        project_id = next((r["project"]["id"] for r in rows if r["project"].get("id")), None)
+        update: dict[str, Any] = {"updated_at": datetime.utcnow()}
+        if project_id:
+            update["project_id"] = project_id
+
+        if self._sync_collection is not None:
+            self._sync_collection.update_one(
+                {"organization": org, "project_name": project},
+                {"$set": update, "$inc": {"version": 1}},
+                upsert=True,
+            )
+            return
+        state = self._sync_mem.setdefault((org, project), {"organization": org, "project_name": project, "version": 0})
+        state.update(update)
+        state["version"] += 1
@@ -0,0 +1,388 @@
+from __future__ import annotations
+
+import threading
+from collections import Counter
+from datetime import datetime
+from typing import Any
+
+from .azure_devops import parse_ado_time
+from .db import get_database
+from .profiling import timed_methods
+from .rollup_store import GRANULARITIES, bucket_key, sketch_bucket, sketch_quantile
+
+UNKNOWN_POOL = "unknown"
+
+
+def capacity_contribution(build: dict[str, Any]) -> dict[str, Any] | None:
+    queued = parse_ado_time(build.get("queueTime"))
+    started = parse_ado_time(build.get("startTime"))
+    if not queued or not started:
+        return None
+    finished = parse_ado_time(build.get("finishTime"))
+    pool = (build.get("queue") or {}).get("pool") or {}
+    definition = build.get("definition") or {}
+    return {
+        "queued": queued,
+        "definition_id": definition.get("id"),
+        "definition_name": definition.get("name"),
+        # Builds stored before the queue was kept have no pool; they still count for queue wait.
+        "pool_id": str(pool["id"]) if pool.get("id") is not None else UNKNOWN_POOL,
+        "pool_name": pool.get("name"),
+        "wait": max(0.0, (started - queued).total_seconds()),
+        "run": (finished - started).total_seconds() if finished and finished >= started else None,
+    }
+
+
+def _distribution(count: int, total: float, maximum: float, sketch: dict[str, int]) -> dict[str, float | None]:
+    return {
+        "avg": round(total / count, 1) if count else None,
+        "p50": sketch_quantile(sketch, 0.5),
+        "p90": sketch_quantile(sketch, 0.9),
+        "p95": sketch_quantile(sketch, 0.95),
+        "max": round(maximum, 1) if count else None,
+    }
+
+
+def _add_counts(row: dict[str, Any], counts: Counter[str]) -> None:
+    for field, value in counts.items():
+        if "." in field:
+            group, name = field.split(".", 1)
+            row.setdefault(group, {})
+            row[group][name] = row[group].get(name, 0) + value
+        else:
+            row[field] = row.get(field, 0) + value
+
+
+@timed_methods("store")
+class CapacityStore:
+    """Queue wait and run duration rollups per pipeline and agent pool, plus agent pool usage samples.
+
+    Build rollups are keyed by organization/project/definition/pool and hour or day bucket;
+    pool samples by organization/pool and bucket. Both hold sums and mergeable sketches, so
+    the capacity view sums a bounded number of rows.
+    """
+
+    def __init__(self) -> None:
+        self._rows_mem: dict[tuple, dict[str, Any]] = {}
+        self._samples_mem: dict[tuple, dict[str, Any]] = {}
+        self._rollups_ref = None
+        self._samples_ref = None
+        self._ready = False
+        self._ready_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+
+    def ensure_ready(self) -> None:
+        if self._ready:
+            return
+        with self._ready_lock:
+            if self._ready:
+                return
+            db = get_database()
+            if db is not None:
+                self._rollups_ref = db["capacity_rollups"]
+                self._samples_ref = db["pool_usage"]
+            self._ready = True
+
+    @property
+    def _rollups_collection(self):
+        self.ensure_ready()
+        return self._rollups_ref
+
+    @property
+    def _samples_collection(self):
+        self.ensure_ready()
+        return self._samples_ref
+
+    def add_builds(self, organization: str, project: str, builds: list[dict[str, Any]]) -> int:
+        """Fold started builds in. Callers guarantee each build is added once."""
+        org = organization.strip().lower()
+        increments: dict[tuple, dict[str, Any]] = {}
+        for build in builds:
+            contribution = capacity_contribution(build)
+            if not contribution:
+                continue
+            for granularity in GRANULARITIES:
+                key = (
+                    org,
+                    project,
+                    contribution["definition_id"],
+                    contribution["pool_id"],
+                    granularity,
+                    bucket_key(contribution["queued"], granularity),
+                )
+                inc = increments.setdefault(
+                    key,
+                    {
+                        "names": {
+                            "definition_name": contribution["definition_name"],
+                            "pool_name": contribution["pool_name"],
+                        },
+                        "counts": Counter(),
+                        "max": {"wait_max": 0.0, "run_max": 0.0},
+                    },
+                )
+                counts = inc["counts"]
+                counts["runs"] += 1
+                counts["wait_sum"] += contribution["wait"]
+                counts[f"wait_sketch.{sketch_bucket(contribution['wait'])}"] += 1
+                inc["max"]["wait_max"] = max(inc["max"]["wait_max"], contribution["wait"])
+                if contribution["run"] is not None:
+                    counts["run_count"] += 1
+                    counts["run_sum"] += contribution["run"]
+                    counts[f"run_sketch.{sketch_bucket(contribution['run'])}"] += 1
+                    inc["max"]["run_max"] = max(inc["max"]["run_max"], contribution["run"])
+
+        if not increments:
+            return 0
+
+        if self._rollups_collection is not None:
+            from pymongo import UpdateOne
+
+            self._rollups_collection.bulk_write(
+                [
+                    UpdateOne(
+                        {
+                            "organization": org,
+                            "project": project,
+                            "definition_id": definition_id,
+                            "pool_id": pool_id,
+                            "granularity": granularity,
+                            "bucket": bucket,
+                        },
+                        {
+                            "$inc": dict(inc["counts"]),
+                            "$max": inc["max"],
+                            # Builds without a pool must not blank out a known pool name.
+                            "$set": {k: v for k, v in inc["names"].items() if v is not None},
+                        },
+                        upsert=True,
+                    )
+                    for (_, _, definition_id, pool_id, granularity, bucket), inc in increments.items()
+                ],
+                ordered=False,
+            )
+            return len(increments)
+
+        with self._write_lock:
+            for key, inc in increments.items():
+                row = self._rows_mem.setdefault(
+                    key,
+                    {
+                        "organization": key[0],
+                        "project": key[1],
+                        "definition_id": key[2],
+                        "pool_id": key[3],
+                        "granularity": key[4],
+                        "bucket": key[5],
+                        "wait_max": 0.0,
+                        "run_max": 0.0,
+                    },
+                )
+                row.update({k: v for k, v in inc["names"].items() if v is not None})
+                for field, value in inc["max"].items():
+                    row[field] = max(row[field], value)
+                _add_counts(row, inc["counts"])
+        return len(increments)
+
+    def record_pool_sample(self, organization: str, pools: list[dict[str, Any]], at: datetime | None = None) -> None:
+        """Add one observation of online/busy agents per pool to the current buckets."""
+        org = organization.strip().lower()
+        at = at or datetime.utcnow()
+        if not pools:
+            return
+        keyed = [
+            ((org, str(pool["pool_id"]), granularity, bucket_key(at, granularity)), pool)
+            for pool in pools
+            for granularity in GRANULARITIES
+        ]
+
+        if self._samples_collection is not None:
+            from pymongo import UpdateOne
+
+            self._samples_collection.bulk_write(
+                [
+                    UpdateOne(
+                        {"organization": o, "pool_id": pool_id, "granularity": granularity, "bucket": bucket},
+                        {
+                            "$inc": {"samples": 1, "online_sum": pool["online"], "busy_sum": pool["busy"]},
+                            "$max": {"online_max": pool["online"], "busy_max": pool["busy"]},
+                            "$set": {"pool_name": pool["pool_name"], "agents": pool["agents"]},
+                        },
+                        upsert=True,
+                    )
+                    for (o, pool_id, granularity, bucket), pool in keyed
+                ],
+                ordered=False,
+            )
+            return
+
+        with self._write_lock:
+            for key, pool in keyed:
+                row = self._samples_mem.setdefault(
+                    key,
+                    {
+                        "organization": key[0],
+                        "pool_id": key[1],
+                        "granularity": key[2],
+                        "bucket": key[3],
+                        "samples": 0,
+                        "online_sum": 0,
+                        "busy_sum": 0,
+                        "online_max": 0,
+                        "busy_max": 0,
+                    },
+                )
+                row["pool_name"] = pool["pool_name"]
+                row["agents"] = pool["agents"]
+                row["samples"] += 1
+                row["online_sum"] += pool["online"]
+                row["busy_sum"] += pool["busy"]
+                row["online_max"] = max(row["online_max"], pool["online"])
+                row["busy_max"] = max(row["busy_max"], pool["busy"])
+
+    def _list(
+        self,
+        rows_mem: dict[tuple, dict[str, Any]],
+        collection,
+        query: dict[str, Any],
+        granularity: str,
+        start_bucket: str,
+        end_bucket: str,
+    ) -> list[dict[str, Any]]:
+        if collection is not None:
+            return list(
+                collection.find(
+                    {**query, "granularity": granularity, "bucket": {"$gte": start_bucket, "$lte": end_bucket}},
+                    {"_id": 0},
+                )
+            )
+        return [
+            row
+            for row in rows_mem.values()
+            if row["granularity"] == granularity
+            and start_bucket <= row["bucket"] <= end_bucket
+            and all(row.get(field) == value for field, value in query.items())
+        ]
+
+    def summarize(
+        self,
+        organization: str,
+        project: str,
+        start: datetime,
+        end: datetime,
+        definition_id: int | None = None,
+        granularity: str | None = None,
+        pool_usage: bool = True,
+    ) -> dict[str, Any]:
+        """Queue wait and run time per pipeline and pool of ``project``.
+
+        ``pool_usage`` adds sampled agent usage, which is organization-wide; callers pass
+        ``False`` for sessions that may not read agent pools.
+        """
+        if granularity not in GRANULARITIES:
+            granularity = "hour" if (end - start).total_seconds() <= 2 * 86400 else "day"
+        org = organization.strip().lower()
+        start_bucket, end_bucket = bucket_key(start, granularity), bucket_key(end, granularity)
+        query: dict[str, Any] = {"organization": org, "project": project}
+        if definition_id is not None:
+            query["definition_id"] = definition_id
+        rows = self._list(self._rows_mem, self._rollups_collection, query, granularity, start_bucket, end_bucket)
+
+        def empty() -> dict[str, Any]:
+            return {
+                "runs": 0,
+                "wait_sum": 0.0,
+                "wait_max": 0.0,
+                "wait_sketch": Counter(),
+                "run_count": 0,
+                "run_sum": 0.0,
+                "run_max": 0.0,
+                "run_sketch": Counter(),
+            }
+
+        overall = empty()
+        groups: dict[str, dict[tuple, dict[str, Any]]] = {"series": {}, "pipelines": {}, "pools": {}}
+        for row in rows:
+            targets = [
+                overall,
+                groups["series"].setdefault((row["bucket"],), empty()),
+                groups["pipelines"].setdefault((row.get("definition_id"), row.get("definition_name")), empty()),
+                groups["pools"].setdefault((row["pool_id"], row.get("pool_name")), empty()),
+            ]
+            for agg in targets:
+                for field in ("runs", "wait_sum", "run_count", "run_sum"):
+                    agg[field] += row.get(field, 0)
+                for field in ("wait_max", "run_max"):
+                    agg[field] = max(agg[field], row.get(field, 0.0))
+                agg["wait_sketch"].update(row.get("wait_sketch") or {})
+                agg["run_sketch"].update(row.get("run_sketch") or {})
+
+        def describe(agg: dict[str, Any]) -> dict[str, Any]:
+            run_total = agg["wait_sum"] + agg["run_sum"]
+            return {
+                "runs": agg["runs"],
+                "queue_wait_seconds": _distribution(agg["runs"], agg["wait_sum"], agg["wait_max"], agg["wait_sketch"]),
+                "run_duration_seconds": _distribution(agg["run_count"], agg["run_sum"], agg["run_max"], agg["run_sketch"]),
+                # Share of queued-to-finished time spent waiting for an agent.
+                "queue_share": round(agg["wait_sum"] / run_total, 3) if run_total else None,
+                "busy_seconds": round(agg["run_sum"], 1),
+            }
+
+        usage_by_pool = self._pool_usage(org, granularity, start_bucket, end_bucket) if pool_usage else {}
+        pools = []
+        for (pool_id, pool_name), agg in groups["pools"].items():
+            usage = usage_by_pool.pop(pool_id, None)
+            pools.append({"pool_id": pool_id, "pool_name": pool_name, **describe(agg), "usage": usage})
+        pools.sort(key=lambda p: p["queue_wait_seconds"]["p90"] or 0, reverse=True)
+
+        pipelines = [
+            {"definition_id": definition, "definition_name": name, **describe(agg)}
+            for (definition, name), agg in groups["pipelines"].items()
+        ]
+        pipelines.sort(key=lambda p: p["queue_wait_seconds"]["p90"] or 0, reverse=True)
+
+        return {
+            "granularity": granularity,
+            "rollup_rows": len(rows),
+            **describe(overall),
+            "series": {bucket: describe(agg) for (bucket,), agg in sorted(groups["series"].items())},
+            "pipelines": pipelines,
+            "pools": pools,
+            # Sampled pools this project's builds have not run on in the range.
+            "other_pools": [{"pool_id": pool_id, **usage} for pool_id, usage in usage_by_pool.items()],
+        }
+
+    def _pool_usage(self, org: str, granularity: str, start_bucket: str, end_bucket: str) -> dict[str, dict[str, Any]]:
+        rows = self._list(
+            self._samples_mem, self._samples_collection, {"organization": org}, granularity, start_bucket, end_bucket
+        )
+        usage: dict[str, dict[str, Any]] = {}
+        for row in sorted(rows, key=lambda r: r["bucket"]):
+            pool = usage.setdefault(
+                row["pool_id"],
+                {"pool_name": row.get("pool_name"), "agents": 0, "samples": 0, "online_sum": 0, "busy_sum": 0, "series": {}},
+            )
+            pool["pool_name"] = row.get("pool_name") or pool["pool_name"]
+            pool["agents"] = row.get("agents", 0)
+            pool["samples"] += row["samples"]
+            pool["online_sum"] += row["online_sum"]
+            pool["busy_sum"] += row["busy_sum"]
+            pool["series"][row["bucket"]] = {
+                "online_avg": round(row["online_sum"] / row["samples"], 2),
+                "busy_avg": round(row["busy_sum"] / row["samples"], 2),
+                "busy_max": row["busy_max"],
+                "utilization": round(row["busy_sum"] / row["online_sum"], 3) if row["online_sum"] else None,
+            }
+
+        return {
+            pool_id: {
+                "pool_name": pool["pool_name"],
+                "agents": pool["agents"],
+                "samples": pool["samples"],
+                "online_avg": round(pool["online_sum"] / pool["samples"], 2),
+                "busy_avg": round(pool["busy_sum"] / pool["samples"], 2),
+                "utilization": round(pool["busy_sum"] / pool["online_sum"], 3) if pool["online_sum"] else None,
+                "series": pool["series"],
+            }
+            for pool_id, pool in usage.items()
+        }
@@ -0,0 +1,203 @@
+from __future__ import annotations
+
+import asyncio
+import heapq
+import logging
+import time
+from collections import Counter
+from collections.abc import Callable
+from contextlib import AbstractAsyncContextManager
+from typing import Any
+
+from .azure_devops import AzureDevOpsClient
+
+logger = logging.getLogger(__name__)
+
+
+def trigrams(text: str) -> set[str]:
+    # Leading padding makes the first one or two characters their own grams, so short
+    # queries still match on prefixes.
+    padded = f"  {text.lower()} "
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+class CatalogIndex:
+    """In-memory trigram index over catalog entries, patched entry by entry."""
+
+    def __init__(self) -> None:
+        self.entries: dict[tuple, dict[str, Any]] = {}
+        self._grams: dict[tuple, set[str]] = {}
+        self._postings: dict[str, set[tuple]] = {}
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def upsert(self, key: tuple, entry: dict[str, Any]) -> None:
+        if self.entries.get(key) == entry:
+            return
+        self.remove(key)
+        grams = trigrams(entry["name"])
+        self.entries[key] = entry
+        self._grams[key] = grams
+        for gram in grams:
+            self._postings.setdefault(gram, set()).add(key)
+
+    def remove(self, key: tuple) -> None:
+        if key not in self.entries:
+            return
+        del self.entries[key]
+        for gram in self._grams.pop(key):
+            postings = self._postings[gram]
+            postings.discard(key)
+            if not postings:
+                del self._postings[gram]
+
+    def search(self, query: str, limit: int = 20, kind: str | None = None) -> list[dict[str, Any]]:
+        needle = query.strip().lower()
+        if not needle:
+            return []
+        query_grams = trigrams(needle)
+        overlap: Counter[tuple] = Counter()
+        for gram in query_grams:
+            overlap.update(self._postings.get(gram, ()))
+
+        scored = []
+        for key, shared in overlap.items():
+            entry = self.entries[key]
+            if kind and entry["kind"] != kind:
+                continue
+            # Jaccard similarity of the gram sets, lifted for prefix and substring hits.
+            score = shared / (len(query_grams) + len(self._grams[key]) - shared)
+            name = entry["name"].lower()
+            if name.startswith(needle):
+                score += 1.0
+            elif needle in name:
+                score += 0.5
+            if score >= 0.2:
+                scored.append((score, entry))
+
+        best = heapq.nsmallest(limit, scored, key=lambda item: (-item[0], len(item[1]["name"]), item[1]["name"].lower()))
+        return [{**entry, "score": round(score, 3)} for score, entry in best]
+
+
+class Catalog:
+    """Projects and pipelines visible to one organization/PAT, refreshed incrementally.
+
+    The project list is re-read every ``refresh_seconds``; a project's pipelines are only
+    re-listed when the project is new, its revision changed, or its listing is older than
+    ``pipeline_refresh_seconds``.
+    """
+
+    def __init__(self, refresh_seconds: int = 300, pipeline_refresh_seconds: int = 3600, concurrency: int = 8) -> None:
+        self.refresh_seconds = refresh_seconds
+        self.pipeline_refresh_seconds = pipeline_refresh_seconds
+        self.concurrency = concurrency
+        self.index = CatalogIndex()
+        self.refreshed_at: float | None = None
+        self._projects: dict[str, dict[str, Any]] = {}
+        self._lock = asyncio.Lock()
+        self._refresh_task: asyncio.Task | None = None
+
+    @property
+    def project_count(self) -> int | None:
+        """Projects seen at the last refresh; ``None`` before the first one."""
+        return len(self._projects) if self.refreshed_at is not None else None
+
+    def is_stale(self) -> bool:
+        return self.refreshed_at is None or time.time() - self.refreshed_at > self.refresh_seconds
+
+    async def refresh(self, client: AzureDevOpsClient) -> None:
+        async with self._lock:
+            if not self.is_stale():
+                return
+            await self._refresh(client)
+
+    def refresh_in_background(
+        self,
+        client_factory: Callable[[], AbstractAsyncContextManager[AzureDevOpsClient]],
+    ) -> None:
+        if self._refresh_task and not self._refresh_task.done():
+            return
+
+        async def run() -> None:
+            try:
+                async with client_factory() as client:
+                    await self.refresh(client)
+            except Exception:
+                logger.exception("Catalog refresh failed")
+
+        self._refresh_task = asyncio.create_task(run())
+
+    async def _refresh(self, client: AzureDevOpsClient) -> None:
+        now = time.time()
+        projects = {p["id"]: p for p in await client.list_projects() if p.get("id")}
+
+        for project_id in set(self._projects) - set(projects):
+            self._drop_project(project_id)
+
+        due = []
+        for project_id, project in projects.items():
+            self.index.upsert(
+                ("project", project_id),
+                {"kind": "project", "id": project_id, "name": project["name"], "project": project["name"]},
+            )
+            known = self._projects.get(project_id)
+            if (
+                known is None
+                or known.get("revision") != project.get("revision")
+                or known.get("name") != project["name"]
+                or now - known["pipelines_at"] > self.pipeline_refresh_seconds
+            ):
+                due.append(project)
+            else:
+                self._projects[project_id] = {**known, "revision": project.get("revision")}
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def list_pipelines(project: dict[str, Any]) -> None:
+            async with semaphore:
+                pipelines = await client.list_pipelines(project["name"])
+            self._index_pipelines(project, pipelines, now)
+
+        results = await asyncio.gather(*(list_pipelines(p) for p in due), return_exceptions=True)
+        for project, result in zip(due, results):
+            if isinstance(result, Exception):
+                # Keep the previous pipelines for this project and retry it on the next refresh.
+                logger.warning("Catalog: listing pipelines for %s failed: %s", project["name"], result)
+                known = self._projects.get(project["id"]) or {"pipeline_ids": set()}
+                self._projects[project["id"]] = {**known, "name": project["name"], "revision": None, "pipelines_at": 0.0}
+        self.refreshed_at = now
+
+    def _index_pipelines(self, project: dict[str, Any], pipelines: list[dict[str, Any]], now: float) -> None:
+        project_id = project["id"]
+        previous = (self._projects.get(project_id) or {}).get("pipeline_ids", set())
+        current = set()
+        for pipe in pipelines:
+            current.add(pipe["id"])
+            self.index.upsert(
+                ("pipeline", project_id, pipe["id"]),
+                {
+                    "kind": "pipeline",
+                    "id": pipe["id"],
+                    "name": pipe["name"],
+                    "project": project["name"],
+                    "folder": pipe.get("folder"),
+                },
+            )
+        for pipeline_id in previous - current:
+            self.index.remove(("pipeline", project_id, pipeline_id))
+        self._projects[project_id] = {
+            "name": project["name"],
+            "revision": project.get("revision"),
+            "pipelines_at": now,
+            "pipeline_ids": current,
+        }
+
+    def _drop_project(self, project_id: str) -> None:
+        known = self._projects.pop(project_id, {})
+        self.index.remove(("project", project_id))
+        for pipeline_id in known.get("pipeline_ids", ()):
+            self.index.remove(("pipeline", project_id, pipeline_id))
+
+    def search(self, query: str, limit: int = 20, kind: str | None = None) -> list[dict[str, Any]]:
+        return self.index.search(query, limit, kind)
@@ -6,6 +6,62 @@ class Settings(BaseSettings):
     app_encryption_key: str = ""
     session_ttl_minutes: int = 30
     cache_ttl_seconds: int = 120
+    credential_check_ttl_seconds: int = 900
+    build_log_tail_lines: int = 400
+    immutable_cache_path: str | None = ".cache/immutable.sqlite3"
+    immutable_cache_max_mb: int = 256
+
+    fast_json_responses: bool = False
+    gzip_minimum_size: int = 0
+
+    build_sync_seconds: int = 120
+    webhook_secret: str | None = None
+    webhook_resync_seconds: int = 21600
+    pipeline_runs_concurrency: int = 4
+
+    push_sync_seconds: int = 300
+    push_history_days: int = 90
+    push_window_days: int = 30
+    push_sync_concurrency: int = 8
+
+    test_sync_seconds: int = 300
+    test_ingest_batch: int = 20
+    test_ingest_concurrency: int = 4
+
+    pr_sync_seconds: int = 600
+    pr_history_days: int = 90
+    pr_sync_concurrency: int = 4
+    pr_page_concurrency: int = 4
+    pr_thread_concurrency: int = 8
+
+    dora_sync_seconds: int = 300
+    dora_history_days: int = 90
+    dora_sync_concurrency: int = 4
+    dora_pending_run_hours: int = 24
+
+    pool_sample_seconds: int = 120
+    pool_sample_concurrency: int = 8
+
+    job_workers: int = 2
+    job_result_ttl_seconds: int = 300
+
+    admission_user_concurrency: int = 4
+    admission_org_concurrency: int = 16
+    admission_queue_budget_seconds: float = 5.0
+    admission_max_queue: int = 200
+
+    catalog_refresh_seconds: int = 300
+    catalog_pipeline_refresh_seconds: int = 3600
+
+    resource_probe_ttl_seconds: int = 60
+    resource_probe_concurrency: int = 20
+    resource_probe_per_host: int = 4
+    resource_probe_timeout_seconds: float = 5.0
+    resource_probe_allowed_hosts: str = ""
+
+    server_timing_enabled: bool = True
+    profiling_sample_rate: float = 1.0
+    profiling_max_profiles: int = 20
 
     mongodb_uri: str | None = None
     mongodb_database: str = "devops_ease_access"
@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+import logging
+import threading
+
+from pymongo import MongoClient
+from pymongo.database import Database
+from pymongo.errors import PyMongoError
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+_lock = threading.Lock()
+_client: MongoClient | None = None
+_database: Database | None = None
+_resolved = False
+
+
+def get_database() -> Database | None:
+    """Return the shared Mongo database, connecting on first use.
+
+    Returns ``None`` when Mongo is not configured or unreachable so stores fall back to memory.
+    """
+    global _client, _database, _resolved
+
+    if _resolved:
+        return _database
+
+    with _lock:
+        if _resolved:
+            return _database
+        if settings.mongodb_uri:
+            client = None
+            try:
+                client = MongoClient(settings.mongodb_uri, serverSelectionTimeoutMS=1500)
+                client.admin.command("ping")
+                database = client[settings.mongodb_database]
+                # Stores resolve the database before their first write, so compare-and-set
+                # paths never run without the unique indexes they depend on.
+                from .migrations import ensure_unique_indexes
+
+                ensure_unique_indexes(database)
+                _client = client
+                _database = database
+            except PyMongoError:
+                logger.exception("MongoDB unavailable or its unique indexes could not be created; using memory")
+                if client is not None:
+                    client.close()
+                _client = None
+                _database = None
+        _resolved = True
+    return _database
+
+
+def close_database() -> None:
+    global _client, _database, _resolved
+
+    with _lock:
+        if _client is not None:
+            _client.close()
+        _client = None
+        _database = None
+        _resolved = False
@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Any
+
+from .config import settings
+
+
+class DiskCache:
+    """Size-bounded SQLite cache for upstream objects that never change once written.
+
+    WAL mode lets every worker process on the node share the same file. Async code uses
+    ``aget``/``aset``, which run the SQLite calls (and WAL syncs) on a worker thread.
+    """
+
+    def __init__(self, path: str | None, max_bytes: int):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._conn: sqlite3.Connection | None = None
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.path) and self.max_bytes > 0
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "key TEXT PRIMARY KEY, value BLOB NOT NULL, size INTEGER NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed_at)")
+            self._conn = conn
+        return self._conn
+
+    @staticmethod
+    def key(organization: str, project: str, kind: str, object_id: int | str) -> str:
+        return f"{organization.lower()}/{project}/{kind}/{object_id}"
+
+    def get(self, key: str) -> Any | None:
+        if not self.enabled:
+            return None
+        try:
+            with self._lock:
+                conn = self._connect()
+                row = conn.execute("SELECT value FROM entries WHERE key = ?", (key,)).fetchone()
+                if row is None:
+                    return None
+                conn.execute("UPDATE entries SET accessed_at = ? WHERE key = ?", (time.time(), key))
+            return json.loads(zlib.decompress(row[0]))
+        except (sqlite3.Error, zlib.error, ValueError):
+            return None
+
+    def set(self, key: str, payload: Any) -> None:
+        if not self.enabled:
+            return
+        blob = zlib.compress(json.dumps(payload, separators=(",", ":")).encode("utf-8"))
+        if len(blob) > self.max_bytes:
+            return
+        try:
+            with self._lock:
+                conn = self._connect()
+                conn.execute(
+                    "INSERT OR REPLACE INTO entries (key, value, size, accessed_at) VALUES (?, ?, ?, ?)",
+                    (key, blob, len(blob), time.time()),
+                )
+                self._evict(conn)
+        except sqlite3.Error:
+            pass
+
+    async def aget(self, key: str) -> Any | None:
+        if not self.enabled:
+            return None
+        return await asyncio.to_thread(self.get, key)
+
+    async def aset(self, key: str, payload: Any) -> None:
+        if self.enabled:
+            await asyncio.to_thread(self.set, key, payload)
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # Trim to 90% so a full cache does not evict on every insert.
+        excess = total - int(self.max_bytes * 0.9)
+        freed = 0
+        stale: list[str] = []
+        for key, size in conn.execute("SELECT key, size FROM entries ORDER BY accessed_at"):
+            stale.append(key)
+            freed += size
+            if freed >= excess:
+                break
+        conn.executemany("DELETE FROM entries WHERE key = ?", [(k,) for k in stale])
+
+
+immutable_cache = DiskCache(settings.immutable_cache_path, settings.immutable_cache_max_mb * 1024 * 1024)
@@ -0,0 +1,226 @@
+from __future__ import annotations
+
+import threading
+from collections import Counter
+from datetime import datetime
+from typing import Any
+
+from .db import get_database
+from .profiling import timed_methods
+from .rollup_store import sketch_bucket, sketch_quantile
+
+# Deployment results that count towards frequency; "failed" also counts as a change failure.
+COUNTED_RESULTS = {"succeeded", "succeededWithIssues", "failed"}
+RECENT_RUNS = 200
+
+
+@timed_methods("store")
+class DoraStore:
+    """Per-day DORA counters per environment, plus a per-environment ingestion cursor.
+
+    Deployments are folded in once as they are ingested: daily rows keep deployment and
+    failure counts, lead time sums and sketches and restore times, so metrics for a window
+    sum one row per environment and day.
+    """
+
+    def __init__(self) -> None:
+        self._daily_mem: dict[tuple[str, str, int, str], dict[str, Any]] = {}
+        self._state_mem: dict[tuple[str, str, int], dict[str, Any]] = {}
+        self._daily_ref = None
+        self._state_ref = None
+        self._ready = False
+        self._ready_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+
+    def ensure_ready(self) -> None:
+        if self._ready:
+            return
+        with self._ready_lock:
+            if self._ready:
+                return
+            db = get_database()
+            if db is not None:
+                self._daily_ref = db["dora_daily"]
+                self._state_ref = db["dora_environments"]
+            self._ready = True
+
+    @property
+    def _daily_collection(self):
+        self.ensure_ready()
+        return self._daily_ref
+
+    @property
+    def _state_collection(self):
+        self.ensure_ready()
+        return self._state_ref
+
+    def _org(self, organization: str) -> str:
+        return organization.strip().lower()
+
+    def get_states(self, organization: str, projects: list[str]) -> list[dict[str, Any]]:
+        org = self._org(organization)
+        if self._state_collection is not None:
+            return list(self._state_collection.find({"organization": org, "project": {"$in": projects}}, {"_id": 0}))
+        return [
+            dict(state)
+            for (s_org, s_project, _), state in self._state_mem.items()
+            if s_org == org and s_project in projects
+        ]
+
+    def record_deployments(
+        self,
+        organization: str,
+        project: str,
+        environment: dict[str, Any],
+        state: dict[str, Any] | None,
+        deployments: list[dict[str, Any]],
+        last_record_id: int,
+    ) -> int:
+        """Fold deployments (oldest first) into the daily rows and advance the cursor.
+
+        Each deployment is ``{"run_id", "result", "finished_at", "lead_seconds"}``. The cursor
+        moves with a compare-and-set on the previous ``last_record_id``, so a concurrent
+        ingester that already advanced it wins and nothing is counted twice.
+        """
+        org = self._org(organization)
+        previous_record_id = (state or {}).get("last_record_id")
+        counted_runs = list((state or {}).get("counted_runs") or [])
+        open_failure_at = (state or {}).get("open_failure_at")
+        last = {}
+        increments: dict[str, Counter[str]] = {}
+
+        for deployment in deployments:
+            if deployment["run_id"] in counted_runs or deployment["result"] not in COUNTED_RESULTS:
+                continue
+            counted_runs.append(deployment["run_id"])
+            finished_at = deployment["finished_at"]
+            counts = increments.setdefault(finished_at.strftime("%Y-%m-%d"), Counter())
+            counts["deployments"] += 1
+            if deployment["lead_seconds"] is not None:
+                counts["lead_count"] += 1
+                counts["lead_sum"] += deployment["lead_seconds"]
+                counts[f"lead_sketch.{sketch_bucket(deployment['lead_seconds'])}"] += 1
+            if deployment["result"] == "failed":
+                counts["failures"] += 1
+                open_failure_at = open_failure_at or finished_at
+            elif open_failure_at:
+                # Time to restore: first failure of a streak until the next good deployment.
+                counts["restore_count"] += 1
+                counts["restore_sum"] += max(0.0, (finished_at - open_failure_at).total_seconds())
+                open_failure_at = None
+            last = {"last_deployment_at": finished_at, "last_result": deployment["result"]}
+
+        new_state = {
+            **(state or {}),
+            "organization": org,
+            "project": project,
+            "environment_id": environment["id"],
+            "environment": environment.get("name"),
+            "last_record_id": last_record_id,
+            "counted_runs": counted_runs[-RECENT_RUNS:],
+            "open_failure_at": open_failure_at,
+            **last,
+            "updated_at": datetime.utcnow(),
+        }
+
+        if self._state_collection is not None:
+            from pymongo import UpdateOne
+            from pymongo.errors import DuplicateKeyError
+
+            key = {"organization": org, "project": project, "environment_id": environment["id"]}
+            if previous_record_id is None:
+                try:
+                    self._state_collection.insert_one(dict(new_state))
+                except DuplicateKeyError:
+                    return 0
+            elif not self._state_collection.update_one(
+                {**key, "last_record_id": previous_record_id}, {"$set": new_state}
+            ).modified_count:
+                return 0
+            if increments:
+                self._daily_collection.bulk_write(
+                    [
+                        UpdateOne(
+                            {**key, "day": day},
+                            {"$inc": dict(counts), "$set": {"environment": environment.get("name")}},
+                            upsert=True,
+                        )
+                        for day, counts in increments.items()
+                    ],
+                    ordered=False,
+                )
+            return sum(c["deployments"] for c in increments.values())
+
+        with self._write_lock:
+            key = (org, project, environment["id"])
+            if (self._state_mem.get(key) or {}).get("last_record_id") != previous_record_id:
+                return 0
+            self._state_mem[key] = new_state
+            for day, counts in increments.items():
+                row = self._daily_mem.setdefault(
+                    (*key, day),
+                    {"organization": org, "project": project, "environment_id": environment["id"], "day": day},
+                )
+                row["environment"] = environment.get("name")
+                for field, value in counts.items():
+                    if "." in field:
+                        group, name = field.split(".", 1)
+                        row.setdefault(group, {})
+                        row[group][name] = row[group].get(name, 0) + value
+                    else:
+                        row[field] = row.get(field, 0) + value
+        return sum(c["deployments"] for c in increments.values())
+
+    def metrics(self, organization: str, projects: list[str], since_day: str, days: int) -> list[dict[str, Any]]:
+        """DORA metrics per environment of ``projects`` over the days since ``since_day``."""
+        org = self._org(organization)
+        if self._daily_collection is not None:
+            rows = self._daily_collection.find(
+                {"organization": org, "project": {"$in": projects}, "day": {"$gte": since_day}}, {"_id": 0}
+            )
+        else:
+            rows = (
+                row
+                for (r_org, r_project, _, day), row in self._daily_mem.items()
+                if r_org == org and r_project in projects and day >= since_day
+            )
+
+        counters: dict[tuple[str, int], Counter[str]] = {}
+        sketches: dict[tuple[str, int], Counter[str]] = {}
+        for row in rows:
+            key = (row["project"], row["environment_id"])
+            counters.setdefault(key, Counter()).update(
+                {k: v for k, v in row.items() if isinstance(v, (int, float)) and k != "environment_id"}
+            )
+            sketches.setdefault(key, Counter()).update(row.get("lead_sketch") or {})
+
+        result = []
+        for state in self.get_states(organization, projects):
+            key = (state["project"], state["environment_id"])
+            counts = counters.get(key) or Counter()
+            sketch = sketches.get(key) or Counter()
+            deployments = counts["deployments"]
+            result.append(
+                {
+                    "project": state["project"],
+                    "environment": state.get("environment"),
+                    "environment_id": state["environment_id"],
+                    "deployments": deployments,
+                    "failures": counts["failures"],
+                    "deployment_frequency_per_day": round(deployments / days, 3),
+                    "change_failure_rate": round(counts["failures"] / deployments, 3) if deployments else None,
+                    "lead_time_seconds": {
+                        "avg": round(counts["lead_sum"] / counts["lead_count"], 1) if counts["lead_count"] else None,
+                        "p50": sketch_quantile(sketch, 0.5),
+                        "p90": sketch_quantile(sketch, 0.9),
+                    },
+                    "mttr_seconds": (
+                        round(counts["restore_sum"] / counts["restore_count"], 1) if counts["restore_count"] else None
+                    ),
+                    "restores": counts["restore_count"],
+                    "last_deployment_at": state.get("last_deployment_at"),
+                    "last_result": state.get("last_result"),
+                    "failing_since": state.get("open_failure_at"),
+                }
+            )
+        return result
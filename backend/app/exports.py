@@ -0,0 +1,217 @@
+from __future__ import annotations
+
+import csv
+import io
+from collections.abc import Callable, Iterable, Iterator
+from datetime import datetime
+from typing import Any
+from urllib.parse import quote
+
+from .azure_devops import parse_ado_time
+from .rollup_store import sketch_quantile
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - pyarrow is optional
+    pa = None
+    pq = None
+
+FORMATS = {
+    "csv": ("text/csv; charset=utf-8", "csv"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+CSV_CHUNK_ROWS = 500
+PARQUET_ROW_GROUP_ROWS = 5000
+
+# (column, kind) pairs; kind picks the Parquet type and the CSV rendering.
+Column = tuple[str, str]
+
+
+def _seconds_between(start: Any, end: Any) -> float | None:
+    started, finished = parse_ado_time(start), parse_ado_time(end)
+    if not started or not finished or finished < started:
+        return None
+    return round((finished - started).total_seconds(), 1)
+
+
+BUILD_COLUMNS: list[Column] = [
+    ("id", "int"),
+    ("build_number", "str"),
+    ("definition_id", "int"),
+    ("definition_name", "str"),
+    ("status", "str"),
+    ("result", "str"),
+    ("reason", "str"),
+    ("source_branch", "str"),
+    ("source_version", "str"),
+    ("requested_for", "str"),
+    ("pool_name", "str"),
+    ("queue_time", "time"),
+    ("start_time", "time"),
+    ("finish_time", "time"),
+    ("queue_wait_seconds", "float"),
+    ("duration_seconds", "float"),
+]
+
+
+def build_record(build: dict[str, Any]) -> dict[str, Any]:
+    definition = build.get("definition") or {}
+    return {
+        "id": build.get("id"),
+        "build_number": build.get("buildNumber"),
+        "definition_id": definition.get("id"),
+        "definition_name": definition.get("name"),
+        "status": build.get("status"),
+        "result": build.get("result"),
+        "reason": build.get("reason"),
+        "source_branch": build.get("sourceBranch"),
+        "source_version": build.get("sourceVersion"),
+        "requested_for": (build.get("requestedFor") or {}).get("uniqueName"),
+        "pool_name": ((build.get("queue") or {}).get("pool") or {}).get("name"),
+        "queue_time": parse_ado_time(build.get("queueTime")),
+        "start_time": parse_ado_time(build.get("startTime")),
+        "finish_time": parse_ado_time(build.get("finishTime")),
+        "queue_wait_seconds": _seconds_between(build.get("queueTime"), build.get("startTime")),
+        "duration_seconds": _seconds_between(build.get("startTime"), build.get("finishTime")),
+    }
+
+
+ROLLUP_COLUMNS: list[Column] = [
+    ("bucket", "str"),
+    ("definition_id", "int"),
+    ("definition_name", "str"),
+    ("total", "int"),
+    ("succeeded", "int"),
+    ("failed", "int"),
+    ("partially_succeeded", "int"),
+    ("canceled", "int"),
+    ("duration_avg_seconds", "float"),
+    ("duration_p50_seconds", "float"),
+    ("duration_p90_seconds", "float"),
+    ("duration_max_seconds", "float"),
+]
+
+
+def rollup_record(row: dict[str, Any]) -> dict[str, Any]:
+    results = row.get("results") or {}
+    sketch = row.get("sketch") or {}
+    duration_count = row.get("duration_count", 0)
+    return {
+        "bucket": row["bucket"],
+        "definition_id": row.get("definition_id"),
+        "definition_name": row.get("definition_name"),
+        "total": row.get("total", 0),
+        "succeeded": results.get("succeeded", 0),
+        "failed": results.get("failed", 0),
+        "partially_succeeded": results.get("partiallySucceeded", 0),
+        "canceled": results.get("canceled", 0),
+        "duration_avg_seconds": round(row.get("duration_sum", 0.0) / duration_count, 1) if duration_count else None,
+        "duration_p50_seconds": sketch_quantile(sketch, 0.5),
+        "duration_p90_seconds": sketch_quantile(sketch, 0.9),
+        "duration_max_seconds": round(row.get("duration_max", 0.0), 1) if duration_count else None,
+    }
+
+
+def _csv_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat() + "Z"
+    return "" if value is None else value
+
+
+def csv_chunks(records: Iterable[dict[str, Any]], columns: list[Column]) -> Iterator[bytes]:
+    names = [name for name, _ in columns]
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(names)
+    pending = 0
+    for record in records:
+        writer.writerow([_csv_value(record.get(name)) for name in names])
+        pending += 1
+        if pending >= CSV_CHUNK_ROWS:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+    yield buffer.getvalue().encode("utf-8")
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file that hands written bytes back to the caller instead of keeping them."""
+
+    def __init__(self) -> None:
+        self._chunks: list[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data: Any) -> int:
+        chunk = bytes(data)
+        self._chunks.append(chunk)
+        self._position += len(chunk)
+        return len(chunk)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def _parquet_schema(columns: list[Column]) -> Any:
+    types = {"int": pa.int64(), "float": pa.float64(), "str": pa.string(), "time": pa.timestamp("us")}
+    return pa.schema([(name, types[kind]) for name, kind in columns])
+
+
+def parquet_chunks(records: Iterable[dict[str, Any]], columns: list[Column]) -> Iterator[bytes]:
+    # Rows are written one row group at a time and each group's bytes are sent as soon as
+    # they are encoded, so memory stays bounded by PARQUET_ROW_GROUP_ROWS.
+    schema = _parquet_schema(columns)
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema, compression="snappy")
+    batch: list[dict[str, Any]] = []
+
+    def flush() -> bytes:
+        writer.write_table(pa.Table.from_pylist(batch, schema=schema))
+        batch.clear()
+        return sink.drain()
+
+    try:
+        for record in records:
+            batch.append(record)
+            if len(batch) >= PARQUET_ROW_GROUP_ROWS:
+                yield flush()
+        if batch:
+            yield flush()
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+def export_chunks(
+    fmt: str,
+    rows: Iterable[dict[str, Any]],
+    to_record: Callable[[dict[str, Any]], dict[str, Any]],
+    columns: list[Column],
+) -> Iterator[bytes]:
+    records = (to_record(row) for row in rows)
+    if fmt == "parquet":
+        return parquet_chunks(records, columns)
+    return csv_chunks(records, columns)
+
+
+def parquet_available() -> bool:
+    return pa is not None
+
+
+def attachment_disposition(filename: str) -> str:
+    """``Content-Disposition`` for a download whose name may fall outside latin-1.
+
+    Headers go out as latin-1, so ``filename`` carries an ASCII stand-in for old clients and
+    ``filename*`` the RFC 5987 UTF-8 form that current browsers prefer.
+    """
+    fallback = "".join(c if c.isascii() and c.isprintable() and c not in '"\\' else "_" for c in filename)
+    return f"attachment; filename=\"{fallback}\"; filename*=UTF-8''{quote(filename, safe='')}"
@@ -0,0 +1,201 @@
+from __future__ import annotations
+
+import asyncio
+import ipaddress
+import socket
+import time
+from collections.abc import Callable, Iterable
+from datetime import datetime
+from typing import Any
+from urllib.parse import urlsplit
+
+import httpx
+
+
+def address_allowed(address: str) -> bool:
+    """Whether a probe may reach ``address``: public unicast only (no loopback, private,
+    link-local, metadata, shared or reserved ranges)."""
+    try:
+        ip = ipaddress.ip_address(address.split("%", 1)[0])
+    except ValueError:
+        return False
+    if ip.version == 6 and ip.ipv4_mapped:
+        ip = ip.ipv4_mapped
+    return ip.is_global and not ip.is_multicast
+
+
+class ResourceProber:
+    """Probes resource card URLs in the background and caches status and latency per URL.
+
+    Callers read cached results with ``status`` and ask for a refresh with ``schedule``, which
+    never waits on the network. Probes share one pooled client, limited overall by
+    ``concurrency`` and per host by ``per_host``.
+
+    Card URLs are user input, so probes only reach public addresses: the host is resolved
+    and checked before the request, the connected peer is checked again before any result is
+    kept, and redirects are not followed (a redirect already means something answers). Hosts
+    in ``allowed_hosts`` (exact or parent domain) are trusted as-is; when it is set, no other
+    host is probed.
+
+    The prober also keeps each dashboard's card URLs (``watch``), so a conditional listing can
+    schedule probes without reading the cards, and calls ``on_change`` with a dashboard id when
+    one of its URLs changes status.
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: int = 60,
+        concurrency: int = 20,
+        per_host: int = 4,
+        timeout_seconds: float = 5.0,
+        allowed_hosts: tuple[str, ...] = (),
+        on_change: Callable[[str], Any] | None = None,
+    ) -> None:
+        self.ttl_seconds = ttl_seconds
+        self.concurrency = concurrency
+        self.per_host = per_host
+        self.timeout_seconds = timeout_seconds
+        self.allowed_hosts = tuple(host.strip().lower().strip(".") for host in allowed_hosts if host.strip())
+        self._client: httpx.AsyncClient | None = None
+        self._semaphore: asyncio.Semaphore | None = None
+        self._host_semaphores: dict[str, asyncio.Semaphore] = {}
+        self._results: dict[str, dict[str, Any]] = {}
+        self._in_flight: dict[str, asyncio.Task] = {}
+        self._dashboards: dict[str, frozenset[str]] = {}
+        self.on_change = on_change
+
+    def start(self) -> None:
+        if self._client is not None:
+            return
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        self._client = httpx.AsyncClient(
+            timeout=self.timeout_seconds,
+            follow_redirects=False,
+            # Proxies from the environment would hide the peer address checked below.
+            trust_env=False,
+            limits=httpx.Limits(max_connections=self.concurrency, max_keepalive_connections=self.concurrency),
+        )
+
+    async def stop(self) -> None:
+        tasks = list(self._in_flight.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if self._client is not None:
+            await self._client.aclose()
+        self._client = None
+        self._semaphore = None
+        self._host_semaphores = {}
+
+    def status(self, url: str) -> dict[str, Any] | None:
+        return self._results.get(url)
+
+    def schedule(self, urls: Iterable[str]) -> int:
+        self.start()
+        now = datetime.utcnow()
+        # Forget URLs nobody has listed for a while (cards edited or deleted).
+        expired = [u for u, r in self._results.items() if (now - r["checked_at"]).total_seconds() > 10 * self.ttl_seconds]
+        for url in expired:
+            del self._results[url]
+
+        scheduled = 0
+        for url in set(urls):
+            result = self._results.get(url)
+            if url in self._in_flight or (result and (now - result["checked_at"]).total_seconds() < self.ttl_seconds):
+                continue
+            if urlsplit(url).scheme not in ("http", "https"):
+                continue
+            task = asyncio.create_task(self._probe(url))
+            self._in_flight[url] = task
+            task.add_done_callback(lambda _, url=url: self._in_flight.pop(url, None))
+            scheduled += 1
+        return scheduled
+
+    def watch(self, dashboard_id: str, urls: Iterable[str]) -> None:
+        """Replace the card URLs known for ``dashboard_id``."""
+        self._dashboards[dashboard_id] = frozenset(url for url in urls if url)
+
+    def schedule_dashboard(self, dashboard_id: str) -> bool:
+        """Schedule the known URLs of ``dashboard_id``; ``False`` when it has not been watched yet."""
+        urls = self._dashboards.get(dashboard_id)
+        if urls is None:
+            return False
+        self.schedule(urls)
+        return True
+
+    def _trusted(self, host: str) -> bool:
+        return any(host == allowed or host.endswith("." + allowed) for allowed in self.allowed_hosts)
+
+    async def _destination_error(self, host: str, port: int) -> str | None:
+        """Why ``host`` may not be probed, or ``None`` when every address it resolves to is public."""
+        if self._trusted(host):
+            return None
+        if self.allowed_hosts:
+            return "Host not in the probe allowlist"
+        try:
+            infos = await asyncio.get_running_loop().getaddrinfo(host, port, type=socket.SOCK_STREAM)
+        except (socket.gaierror, UnicodeError):
+            return "Host does not resolve"
+        if not infos or not all(address_allowed(info[4][0]) for info in infos):
+            return "Destination address not allowed"
+        return None
+
+    def _peer_allowed(self, host: str, response: httpx.Response) -> bool:
+        # Re-checked on the live connection, so a DNS answer that changed since the
+        # resolution above cannot turn the probe into a private-network oracle.
+        if self._trusted(host):
+            return True
+        stream = response.extensions.get("network_stream")
+        peer = stream.get_extra_info("server_addr") if stream is not None else None
+        return bool(peer) and address_allowed(peer[0])
+
+    def _record(self, url: str, status: str, http_status: int | None, latency: float | None, error: str | None) -> None:
+        previous = self._results.get(url)
+        if self.on_change is not None and (previous is None or previous["status"] != status):
+            for dashboard_id, urls in list(self._dashboards.items()):
+                if url in urls:
+                    self.on_change(dashboard_id)
+        self._results[url] = {
+            "status": status,
+            "http_status": http_status,
+            "latency_ms": round(latency * 1000, 1) if latency is not None else None,
+            "error": error,
+            "checked_at": datetime.utcnow(),
+        }
+
+    async def _probe(self, url: str) -> None:
+        parts = urlsplit(url)
+        host = (parts.hostname or "").lower()
+        try:
+            port = parts.port or (443 if parts.scheme == "https" else 80)
+        except ValueError:
+            port = None
+        refused = "Invalid URL" if not host or port is None else await self._destination_error(host, port)
+        if refused:
+            self._record(url, "skipped", None, None, refused)
+            return
+
+        host_semaphore = self._host_semaphores.setdefault(host, asyncio.Semaphore(self.per_host))
+        async with self._semaphore, host_semaphore:
+            started = time.perf_counter()
+            http_status = None
+            error = None
+            try:
+                async with self._client.stream("HEAD", url) as response:
+                    peer_allowed = self._peer_allowed(host, response)
+                    http_status = response.status_code
+                if peer_allowed and http_status in (405, 501):
+                    # Some servers reject HEAD; a streamed GET reads only the headers.
+                    async with self._client.stream("GET", url) as response:
+                        peer_allowed = self._peer_allowed(host, response)
+                        http_status = response.status_code
+                if not peer_allowed:
+                    self._record(url, "skipped", None, None, "Destination address not allowed")
+                    return
+            except (httpx.HTTPError, httpx.InvalidURL) as ex:
+                error = type(ex).__name__
+            latency = time.perf_counter() - started
+
+        # Auth challenges, redirects and client errors still mean something is answering.
+        status = "up" if http_status is not None and http_status < 500 else "down"
+        self._record(url, status, http_status, latency, error)
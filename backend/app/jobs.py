@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from collections.abc import Awaitable, Callable
+from datetime import datetime
+from typing import Any
+from uuid import uuid4
+
+from .cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+JobFn = Callable[[], Awaitable[Any]]
+
+
+class JobQueue:
+    """In-process queue running heavy aggregations on a small pool of asyncio workers.
+
+    Identical submissions (same ``key``) share the pending job, and finished results are
+    reused for ``result_ttl_seconds``.
+    """
+
+    def __init__(self, workers: int = 2, result_ttl_seconds: int = 300, max_pending: int = 100):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._queue: asyncio.Queue[tuple[str, JobFn]] | None = None
+        self._tasks: list[asyncio.Task] = []
+        self._jobs: dict[str, dict[str, Any]] = {}
+        self._pending_by_key: dict[str, str] = {}
+        self._finished_by_key = TTLCache(result_ttl_seconds)
+
+    def start(self) -> None:
+        if self._tasks:
+            return
+        self._queue = asyncio.Queue()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._queue = None
+
+    def submit(self, kind: str, key: str, fn: JobFn, owner: str) -> dict[str, Any]:
+        self.start()
+        self._prune()
+
+        job_id = self._pending_by_key.get(key) or self._finished_by_key.get(key)
+        if job_id and job_id in self._jobs:
+            return self._jobs[job_id]
+
+        if len(self._pending_by_key) >= self.max_pending:
+            raise OverflowError("Job queue is full")
+
+        job_id = uuid4().hex
+        job = {
+            "id": job_id,
+            "kind": kind,
+            "key": key,
+            "owner": owner,
+            "status": "queued",
+            "created_at": datetime.utcnow(),
+            "started_at": None,
+            "finished_at": None,
+            "result": None,
+            "error": None,
+        }
+        self._jobs[job_id] = job
+        self._pending_by_key[key] = job_id
+        self._queue.put_nowait((job_id, fn))
+        return job
+
+    def get(self, job_id: str) -> dict[str, Any] | None:
+        return self._jobs.get(job_id)
+
+    async def _worker(self) -> None:
+        while True:
+            job_id, fn = await self._queue.get()
+            job = self._jobs.get(job_id)
+            if job is None:
+                self._queue.task_done()
+                continue
+
+            job["status"] = "running"
+            job["started_at"] = datetime.utcnow()
+            try:
+                job["result"] = await fn()
+                job["status"] = "succeeded"
+            except asyncio.CancelledError:
+                job["status"] = "failed"
+                job["error"] = "Cancelled"
+                raise
+            except Exception as ex:
+                logger.exception("Job %s (%s) failed", job_id, job["kind"])
+                job["status"] = "failed"
+                job["error"] = str(getattr(ex, "detail", None) or ex)
+            finally:
+                job["finished_at"] = datetime.utcnow()
+                self._pending_by_key.pop(job["key"], None)
+                if job["status"] == "succeeded":
+                    self._finished_by_key.set(job["key"], job_id)
+                self._queue.task_done()
+
+    def _prune(self) -> None:
+        # Finished jobs stay readable for the result TTL, then are dropped.
+        ttl = self._finished_by_key.ttl_seconds
+        now = datetime.utcnow()
+        expired = [
+            job_id
+            for job_id, job in self._jobs.items()
+            if job["finished_at"] and (now - job["finished_at"]).total_seconds() > ttl
+        ]
+        for job_id in expired:
+            self._jobs.pop(job_id, None)
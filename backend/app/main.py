@@ -1,14 +1,46 @@
-from collections import Counter
-from datetime import datetime, timedelta
+import asyncio
+import base64
+import cProfile
+import hashlib
+import json
+import logging
+import random
+import time
+from collections import Counter, OrderedDict
+from collections.abc import AsyncIterator, Awaitable, Callable
+from contextlib import AsyncExitStack, asynccontextmanager
+from datetime import datetime, timedelta, timezone
+from typing import Any
 from uuid import uuid4
 
-from fastapi import FastAPI, HTTPException
+import httpx
+from fastapi import Depends, FastAPI, HTTPException, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-
-from .ai import summarize_failures
-from .azure_devops import AzureDevOpsClient
+from fastapi.responses import StreamingResponse
+
+from .admission import AdmissionController, AdmissionRejected
+from .ai import stream_failure_summary, summarize_failures
+from .azure_devops import AzureDevOpsClient, parse_ado_time
+from .build_store import BuildStore
+from .capacity_store import CapacityStore
+from .catalog import Catalog
 from .cache import TTLCache
 from .config import settings
+from .db import close_database
+from .dora_store import DoraStore
+from .exports import (
+    BUILD_COLUMNS,
+    FORMATS,
+    ROLLUP_COLUMNS,
+    attachment_disposition,
+    build_record,
+    export_chunks,
+    parquet_available,
+    rollup_record,
+)
+from .health_probe import ResourceProber
+from .disk_cache import immutable_cache
+from .jobs import JobQueue
 from .models import (
     AuthResponse,
     ConnectRequest,
@@ -20,32 +52,120 @@ from .models import (
     DashboardResourceCreateRequest,
     DashboardResourceItem,
     DashboardResourceUpdateRequest,
+    JobStatus,
     LoginRequest,
     PendingUserItem,
     RegisterRequest,
     ResourceCreateRequest,
     ResourceItem,
 )
+from .pr_store import PullRequestStore, compact_pull_request, week_key
+from .profiling import ProfileStore, server_timing_header, start_request_timing
+from .push_store import PushStore
 from .resources_store import ResourceStore
+from .revisions import RevisionStore
+from .rollup_store import RollupStore, bucket_key
+from .responses import (
+    EventStreamAwareGZipMiddleware,
+    FastJSONResponse,
+    ReleasingStreamingResponse,
+    TimedJSONResponse,
+    etag_for,
+    etag_matches,
+    fast_json,
+    model_row,
+    model_rows,
+    not_modified,
+    project_rows,
+    with_etag,
+)
 from .security import decrypt_secret, encrypt_secret
+from .test_store import TestResultStore
 from .user_store import UserStore
+from .webhooks import parse_service_hook, verify_service_hook_secret
+
+
+logger = logging.getLogger(__name__)
+
+session_store: dict[str, dict] = {}
+auth_sessions: dict[str, dict] = {}
+cache = TTLCache(settings.cache_ttl_seconds)
+credential_checks = TTLCache(settings.credential_check_ttl_seconds)
+revision_store = RevisionStore()
+resource_store = ResourceStore(revision_store)
+user_store = UserStore(revision_store)
+rollup_store = RollupStore()
+capacity_store = CapacityStore()
+build_store = BuildStore(rollup_store, capacity_store)
+push_store = PushStore()
+test_store = TestResultStore()
+dora_store = DoraStore()
+pr_store = PullRequestStore()
+profile_store = ProfileStore(settings.profiling_max_profiles)
+job_queue = JobQueue(settings.job_workers, settings.job_result_ttl_seconds)
+admission = AdmissionController(
+    settings.admission_user_concurrency,
+    settings.admission_org_concurrency,
+    settings.admission_queue_budget_seconds,
+    settings.admission_max_queue,
+)
+resource_prober = ResourceProber(
+    settings.resource_probe_ttl_seconds,
+    settings.resource_probe_concurrency,
+    settings.resource_probe_per_host,
+    settings.resource_probe_timeout_seconds,
+    tuple(settings.resource_probe_allowed_hosts.split(",")),
+    # Listings carry a revision per dashboard that moves when a card's status changes.
+    on_change=lambda dashboard_id: revision_store.bump(f"dashboard-health:{dashboard_id}"),
+)
 
 
-app = FastAPI(title=settings.app_name)
+def _warm_up_stores() -> None:
+    revision_store.ensure_ready()
+    resource_store.ensure_ready()
+    user_store.ensure_ready()
+    build_store.ensure_ready()
+    rollup_store.ensure_ready()
+    capacity_store.ensure_ready()
+    push_store.ensure_ready()
+    test_store.ensure_ready()
+    dora_store.ensure_ready()
+    pr_store.ensure_ready()
+
+
+@asynccontextmanager
+async def lifespan(_: FastAPI):
+    # Connecting to Mongo and seeding the default admin (a PBKDF2 hash) run off the event loop,
+    # so the worker accepts requests immediately; early requests finish the same init lazily.
+    warm_up = asyncio.create_task(asyncio.to_thread(_warm_up_stores))
+    job_queue.start()
+    resource_prober.start()
+    yield
+    await job_queue.stop()
+    await resource_prober.stop()
+    for task in list(_background_tasks.values()):
+        task.cancel()
+    if not warm_up.done():
+        await asyncio.wait({warm_up}, timeout=5)
+    close_database()
+
+
+app = FastAPI(
+    title=settings.app_name,
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse if settings.fast_json_responses else TimedJSONResponse,
+)
+if settings.gzip_minimum_size > 0:
+    app.add_middleware(EventStreamAwareGZipMiddleware, minimum_size=settings.gzip_minimum_size)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing", "X-Profile-Id", "ETag"],
 )
 
-session_store: dict[str, dict] = {}
-auth_sessions: dict[str, dict] = {}
-cache = TTLCache(settings.cache_ttl_seconds)
-resource_store = ResourceStore()
-user_store = UserStore()
-
 
 def _get_auth_user(auth_token: str) -> dict:
     auth = auth_sessions.get(auth_token)
@@ -75,7 +195,72 @@ def _require_admin(auth_token: str) -> dict:
     return user
 
 
-def _get_session(session_id: str) -> dict:
+def _is_admin_token(auth_token: str | None) -> bool:
+    auth = auth_sessions.get(auth_token or "")
+    if not auth or auth["expires_at"] < datetime.utcnow():
+        return False
+    user = user_store.find_user(auth["email"])
+    return bool(user and user.get("is_admin"))
+
+
+_profiling_active = False
+
+
+def _start_profiler() -> cProfile.Profile | None:
+    """Enable a profiler unless one is already running.
+
+    cProfile hooks the whole interpreter, so it sees every coroutine on the event loop;
+    only one sampled request is profiled at a time and the others run unprofiled.
+    """
+    global _profiling_active
+    if _profiling_active:
+        return None
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:
+        # Python 3.12+ refuses a second active profiler (e.g. one started by a debugger).
+        return None
+    _profiling_active = True
+    return profiler
+
+
+def _stop_profiler(profiler: cProfile.Profile) -> None:
+    global _profiling_active
+    profiler.disable()
+    _profiling_active = False
+
+
+@app.middleware("http")
+async def server_timing(request: Request, call_next):
+    timings = start_request_timing()
+    profiler = None
+    # Profiling is opt-in per request: an admin sends their auth token in X-Profile-Token.
+    profile_token = request.headers.get("x-profile-token")
+    if (
+        profile_token
+        and random.random() < settings.profiling_sample_rate
+        and _is_admin_token(profile_token)
+    ):
+        profiler = _start_profiler()
+
+    started = time.perf_counter()
+    try:
+        response = await call_next(request)
+    finally:
+        if profiler:
+            _stop_profiler(profiler)
+    elapsed = time.perf_counter() - started
+
+    if settings.server_timing_enabled:
+        response.headers["Server-Timing"] = server_timing_header(timings, elapsed)
+        response.headers["Timing-Allow-Origin"] = "*"
+    if profiler:
+        response.headers["X-Profile-Id"] = profile_store.add(profiler, request.method, request.url.path, elapsed)
+    return response
+
+
+def _live_session(session_id: str) -> dict:
     session = session_store.get(session_id)
     if not session:
         raise HTTPException(401, "Invalid session")
@@ -85,11 +270,210 @@ def _get_session(session_id: str) -> dict:
     return session
 
 
+def _session_organizations(session: dict) -> dict[str, dict]:
+    return session.get("organizations") or {
+        session["organization"].strip().lower(): {
+            "organization": session["organization"],
+            "encrypted_pat": session["encrypted_pat"],
+        }
+    }
+
+
+def _session_view(session_id: str, session: dict, org_key: str) -> dict:
+    # A view looks like a single-organization session, so per-project code stays unchanged;
+    # ``scope`` keys per-session caches by organization as well.
+    return {
+        **session,
+        **_session_organizations(session)[org_key],
+        "session_id": session_id,
+        "scope": f"{session_id}:{org_key}",
+    }
+
+
+def _get_session(session_id: str, organization: str | None = None) -> dict:
+    session = _live_session(session_id)
+    org_key = (organization or session["organization"]).strip().lower()
+    if org_key not in _session_organizations(session):
+        raise HTTPException(404, f"Organization '{organization}' is not connected in this session")
+    return _session_view(session_id, session, org_key)
+
+
+def _session_views(session_id: str) -> list[dict]:
+    session = _live_session(session_id)
+    return [_session_view(session_id, session, org_key) for org_key in _session_organizations(session)]
+
+
+def _new_session(owner_email: str, credentials: list[tuple[str, str]]) -> str:
+    """Create a session for ``(organization, encrypted_pat)`` pairs; the first is the default."""
+    session_id = str(uuid4())
+    session_store[session_id] = {
+        "organization": credentials[0][0],
+        "encrypted_pat": credentials[0][1],
+        "organizations": {
+            org.strip().lower(): {"organization": org, "encrypted_pat": encrypted_pat}
+            for org, encrypted_pat in credentials
+        },
+        "owner_email": owner_email,
+        "expires_at": datetime.utcnow() + timedelta(minutes=settings.session_ttl_minutes),
+    }
+    return session_id
+
+
+def _credential_key(organization: str, pat: str) -> str:
+    return hashlib.sha256(f"{organization.strip().lower()}:{pat}".encode("utf-8")).hexdigest()
+
+
+async def _validate_credentials(organization: str, pat: str) -> None:
+    # Successful checks are remembered, so reconnecting does not hit Azure DevOps again.
+    key = _credential_key(organization, pat)
+    if credential_checks.get(key):
+        return
+    try:
+        await AzureDevOpsClient(organization, pat).validate()
+    except httpx.HTTPError as ex:
+        raise HTTPException(401, f"Authentication/connectivity failed for {organization}: {ex}") from ex
+    credential_checks.set(key, True)
+
+
+async def _authorize_project(session: dict, project: str) -> None:
+    """Check the session's PAT can read ``project`` before serving it from the shared stores.
+
+    Stores are shared per organization, so a fresh store alone says nothing about the
+    caller's access; successful checks are remembered per credential and project.
+    """
+    pat = decrypt_secret(session["encrypted_pat"])
+    key = f"{_credential_key(session['organization'], pat)}:project:{project}"
+    if credential_checks.get(key):
+        return
+    try:
+        await AzureDevOpsClient(session["organization"], pat).check_project_access(project)
+    except httpx.HTTPStatusError as ex:
+        if ex.response.status_code in (203, 401, 403, 404):
+            raise HTTPException(403, f"No access to project '{project}'") from ex
+        raise HTTPException(502, f"Could not verify access to project '{project}': {ex}") from ex
+    except httpx.HTTPError as ex:
+        raise HTTPException(502, f"Could not verify access to project '{project}': {ex}") from ex
+    credential_checks.set(key, True)
+
+
+def _session_client(session: dict, http: httpx.AsyncClient | None = None) -> AzureDevOpsClient:
+    return AzureDevOpsClient(session["organization"], decrypt_secret(session["encrypted_pat"]), http=http)
+
+
+@asynccontextmanager
+async def _pooled_client(session: dict) -> AsyncIterator[AzureDevOpsClient]:
+    async with httpx.AsyncClient(timeout=20) as http:
+        yield _session_client(session, http)
+
+
+def _too_many_requests(ex: AdmissionRejected) -> HTTPException:
+    return HTTPException(
+        429,
+        "Too many concurrent Azure DevOps requests; retry shortly.",
+        headers={"Retry-After": str(ex.retry_after)},
+    )
+
+
+async def _admit_upstream(session_id: str, organization: str | None = None) -> AsyncIterator[None]:
+    # Quotas follow the signed-in user across their sessions; PAT-only sessions count alone.
+    session = _get_session(session_id, organization)
+    try:
+        async with admission.slot(session["organization"], session.get("owner_email") or session_id):
+            yield
+    except AdmissionRejected as ex:
+        raise _too_many_requests(ex) from ex
+
+
+async def _admit_streaming(session_id: str, organization: str | None = None) -> AsyncIterator[AsyncExitStack]:
+    """Admission for endpoints that stream: the slot outlives the dependency.
+
+    Yield dependencies exit before a streaming body runs, so the endpoint hands the yielded
+    stack to a ``ReleasingStreamingResponse``, which releases the slot once the body is sent.
+    It is released here only when the endpoint fails.
+    """
+    session = _get_session(session_id, organization)
+    slot = AsyncExitStack()
+    try:
+        await slot.enter_async_context(
+            admission.slot(session["organization"], session.get("owner_email") or session_id)
+        )
+    except AdmissionRejected as ex:
+        raise _too_many_requests(ex) from ex
+    try:
+        yield slot
+    except BaseException:
+        await slot.aclose()
+        raise
+
+
+upstream_admission = [Depends(_admit_upstream)]
+
+
+# Catalogs by credential scope, least recently used first, with their last use.
+catalogs: OrderedDict[str, tuple[float, Catalog]] = OrderedDict()
+CATALOG_IDLE_REFRESHES = 6
+
+
+def _known_project_count(organization: str, encrypted_pat: str) -> int | None:
+    # Connect only validates credentials, so the count comes from a catalog that already
+    # indexed this PAT; it is never listed just for the response.
+    entry = catalogs.get(_credential_key(organization, decrypt_secret(encrypted_pat)))
+    return entry[1].project_count if entry else None
+
+
+def _session_catalog(session: dict) -> Catalog:
+    # Catalogs are shared by sessions using the same PAT, never across PATs, so search only
+    # returns projects the caller's PAT can see.
+    scope = _credential_key(session["organization"], decrypt_secret(session["encrypted_pat"]))
+    now = time.monotonic()
+    # PATs rotate and sessions end, so indexes nobody searched for several refreshes are dropped.
+    idle_before = now - CATALOG_IDLE_REFRESHES * settings.catalog_refresh_seconds
+    while catalogs and next(iter(catalogs.values()))[0] < idle_before:
+        catalogs.popitem(last=False)
+    entry = catalogs.pop(scope, None)
+    if entry:
+        catalog = entry[1]
+    else:
+        catalog = Catalog(settings.catalog_refresh_seconds, settings.catalog_pipeline_refresh_seconds)
+    catalogs[scope] = (now, catalog)
+    return catalog
+
+
 @app.get("/health")
 async def health() -> dict:
     return {"status": "ok"}
 
 
+@app.post("/api/webhooks/azure-devops")
+async def azure_devops_webhook(request: Request) -> dict:
+    if not verify_service_hook_secret(
+        settings.webhook_secret or "",
+        request.headers.get("authorization"),
+        request.headers.get("x-webhook-secret"),
+    ):
+        raise HTTPException(401, "Invalid webhook secret")
+
+    try:
+        payload = await request.json()
+    except ValueError as ex:
+        raise HTTPException(400, "Invalid JSON payload") from ex
+
+    event = parse_service_hook(payload)
+    if not event:
+        return {"accepted": False, "reason": f"Ignored event type {payload.get('eventType')}"}
+    if not event["organization"]:
+        return {"accepted": False, "reason": "Organization not found in payload"}
+
+    project = event["project"] or (
+        event["project_id"] and build_store.project_name_for_id(event["organization"], event["project_id"])
+    )
+    if not project:
+        return {"accepted": False, "reason": "Unknown project; it is learned from the first build sync"}
+
+    build_store.upsert_builds(event["organization"], project, [event["build"]])
+    return {"accepted": True, "organization": event["organization"], "project": project, "build_id": event["build"].get("id")}
+
+
 @app.post("/api/auth/register")
 async def register_user(payload: RegisterRequest) -> dict:
     try:
@@ -174,10 +558,36 @@ async def approve_user(user_id: str, auth_token: str) -> dict:
     }
 
 
+@app.get("/api/admin/profiles")
+async def list_profiles(auth_token: str) -> list[dict]:
+    _require_admin(auth_token)
+    return profile_store.list()
+
+
+@app.get("/api/admin/admission")
+async def admission_metrics(auth_token: str) -> dict:
+    _require_admin(auth_token)
+    return admission.snapshot()
+
+
+@app.get("/api/admin/profiles/{profile_id}")
+async def get_profile(profile_id: str, auth_token: str) -> dict:
+    _require_admin(auth_token)
+    profile = profile_store.get(profile_id)
+    if not profile:
+        raise HTTPException(404, "Profile not found")
+    return profile
+
+
 @app.get("/api/dashboards", response_model=list[DashboardItem])
-async def list_dashboards(auth_token: str) -> list[DashboardItem]:
+async def list_dashboards(request: Request, response: Response, auth_token: str) -> list[DashboardItem]:
     _require_approved_user(auth_token)
-    return [DashboardItem(**item) for item in user_store.list_dashboards()]
+    # The revision is read before the data, so a write racing this request yields a stale
+    # ETag (forcing a refetch next time) rather than a fresh ETag on stale data.
+    etag = etag_for("dashboards", revision_store.get("dashboards"))
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    return with_etag(model_rows(DashboardItem, user_store.list_dashboards()), response, etag)
 
 
 @app.post("/api/dashboards", response_model=DashboardItem)
@@ -189,21 +599,43 @@ async def create_dashboard(payload: DashboardCreateRequest, auth_token: str) ->
 
 @app.get("/api/dashboards/{dashboard_id}/resources", response_model=list[DashboardResourceItem])
 async def list_dashboard_resources(
+    request: Request,
+    response: Response,
     dashboard_id: str,
     auth_token: str,
     project: str | None = None,
     environment: str | None = None,
 ) -> list[DashboardResourceItem]:
     _require_approved_user(auth_token)
+    # Cards and their probe results each version the ETag through a revision, so a conditional
+    # GET costs two revision lookups. Probes run in the background from the prober's own list
+    # of the dashboard's URLs and are scheduled even when the answer is a 304, so clients that
+    # always revalidate still get fresh health.
+    etag = etag_for(
+        "dashboard",
+        dashboard_id,
+        revision_store.get(f"dashboard:{dashboard_id}"),
+        revision_store.get(f"dashboard-health:{dashboard_id}"),
+        project,
+        environment,
+    )
+    if etag_matches(request, etag) and resource_prober.schedule_dashboard(dashboard_id):
+        return not_modified(etag)
     if not user_store.get_dashboard(dashboard_id):
         raise HTTPException(404, "Dashboard not found")
     # Dashboard resource cards are shared for all approved users on the same dashboard.
-    rows = resource_store.list_resources(
-        dashboard_id=dashboard_id,
-        project=project,
-        environment=environment,
-    )
-    return [DashboardResourceItem(**row) for row in rows]
+    cards = resource_store.list_resources(dashboard_id=dashboard_id)
+    resource_prober.watch(dashboard_id, (row.get("url") for row in cards))
+    resource_prober.schedule_dashboard(dashboard_id)
+    if etag_matches(request, etag):
+        # First listing of this dashboard since the process started.
+        return not_modified(etag)
+    rows = [
+        {**row, "health": resource_prober.status(row.get("url") or "")}
+        for row in cards
+        if (not project or row.get("project") == project) and (not environment or row.get("environment") == environment)
+    ]
+    return with_etag(model_rows(DashboardResourceItem, rows), response, etag)
 
 
 @app.post("/api/dashboards/{dashboard_id}/resources", response_model=DashboardResourceItem)
@@ -228,7 +660,7 @@ async def create_dashboard_resource(
             "notes": payload.notes.strip() if payload.notes else None,
         }
     )
-    return DashboardResourceItem(**created)
+    return model_row(DashboardResourceItem, created)
 
 
 @app.put("/api/dashboards/{dashboard_id}/resources/{resource_id}", response_model=DashboardResourceItem)
@@ -264,20 +696,87 @@ async def update_dashboard_resource(
     if not updated:
         raise HTTPException(404, "Resource card not found")
 
-    return DashboardResourceItem(**updated)
+    return model_row(DashboardResourceItem, updated)
+
+
+@app.get("/api/dashboards/{dashboard_id}/dora", dependencies=upstream_admission)
+async def dashboard_dora(
+    request: Request,
+    response: Response,
+    dashboard_id: str,
+    auth_token: str,
+    session_id: str,
+    days: int = Query(30, ge=1, le=365),
+    organization: str | None = None,
+) -> dict:
+    _require_approved_user(auth_token)
+    session = _get_session(session_id, organization)
+    organization = session["organization"]
+    if not user_store.get_dashboard(dashboard_id):
+        raise HTTPException(404, "Dashboard not found")
+    days = _dora_days(days)
+
+    cards: Counter[tuple[str, str]] = Counter(
+        (row.get("project") or "", row.get("environment") or "")
+        for row in resource_store.list_resources(dashboard_id=dashboard_id)
+    )
+    # Cards may name projects this PAT cannot read; those keep their cards but get no metrics.
+    listed = sorted({project for project, _ in cards if project})
+    checks = await asyncio.gather(*(_authorize_project(session, p) for p in listed), return_exceptions=True)
+    for check in checks:
+        if isinstance(check, BaseException) and not isinstance(check, HTTPException):
+            raise check
+    projects = [p for p, check in zip(listed, checks) if check is None]
+    # Ingestion runs in the background; this view only reads the precomputed daily rows.
+    for project in projects:
+        _run_in_background(
+            f"dora:{session['scope']}:{project}",
+            session,
+            lambda project=project: _dora_sync_in_background(session, project),
+        )
+
+    since_day = _dora_since_day(days)
+    etag = etag_for(
+        "dora",
+        dashboard_id,
+        revision_store.get(f"dashboard:{dashboard_id}"),
+        days,
+        since_day,
+        *projects,
+        *(revision_store.get(f"dora:{organization.lower()}:{project}") for project in projects),
+    )
+    if etag_matches(request, etag):
+        return not_modified(etag)
+
+    metrics = {
+        (m["project"], (m.get("environment") or "").lower()): m
+        for m in dora_store.metrics(organization, projects, since_day, days)
+    }
+    environments = [
+        {
+            "project": project,
+            "environment": environment,
+            "resource_cards": count,
+            "metrics": metrics.get((project, environment.lower())),
+        }
+        for (project, environment), count in sorted(cards.items())
+    ]
+    return with_etag(fast_json({"days": days, "environments": environments}), response, etag)
+
+
+def _credential_info(user: dict) -> DevOpsCredentialInfo:
+    return DevOpsCredentialInfo(
+        organization=user.get("devops_org"),
+        has_pat=bool(user.get("devops_pat_encrypted")),
+        updated_at=user.get("devops_updated_at"),
+        organizations=[c["organization"] for c in user_store.list_devops_credentials(user["email"])],
+    )
 
 
 @app.get("/api/devops/credentials", response_model=DevOpsCredentialInfo)
 async def get_devops_credentials(auth_token: str) -> DevOpsCredentialInfo:
     user = _require_approved_user(auth_token)
-    creds = user_store.get_devops_credentials(user["email"])
-    if not creds:
-        return DevOpsCredentialInfo()
-    return DevOpsCredentialInfo(
-        organization=creds.get("organization"),
-        has_pat=bool(creds.get("encrypted_pat")),
-        updated_at=creds.get("updated_at"),
-    )
+    return _credential_info(user)
 
 
 @app.post("/api/devops/credentials", response_model=DevOpsCredentialInfo)
@@ -285,105 +784,733 @@ async def set_devops_credentials(payload: DevOpsCredentialRequest, auth_token: s
     user = _require_approved_user(auth_token)
 
     # Validate credentials before saving.
-    client = AzureDevOpsClient(payload.organization, payload.pat)
-    try:
-        await client.list_projects()
-    except Exception as ex:
-        raise HTTPException(status_code=401, detail=f"Authentication/connectivity failed: {ex}") from ex
+    await _validate_credentials(payload.organization, payload.pat)
 
     updated = user_store.set_devops_credentials(user["email"], payload.organization, encrypt_secret(payload.pat))
     if not updated:
         raise HTTPException(404, "User not found")
+    return _credential_info(updated)
 
-    return DevOpsCredentialInfo(
-        organization=updated.get("devops_org"),
-        has_pat=bool(updated.get("devops_pat_encrypted")),
-        updated_at=updated.get("devops_updated_at"),
-    )
+
+@app.delete("/api/devops/credentials/{organization}", response_model=DevOpsCredentialInfo)
+async def delete_devops_credentials(organization: str, auth_token: str) -> DevOpsCredentialInfo:
+    user = _require_approved_user(auth_token)
+    updated = user_store.remove_devops_credentials(user["email"], organization)
+    if not updated:
+        raise HTTPException(404, "User not found")
+    return _credential_info(updated)
 
 
 @app.post("/api/devops/connect", response_model=ConnectResponse)
 async def connect_devops(auth_token: str) -> ConnectResponse:
     user = _require_approved_user(auth_token)
-    creds = user_store.get_devops_credentials(user["email"])
-    if not creds or not creds.get("organization") or not creds.get("encrypted_pat"):
+    # Most recently saved first: it becomes the session's default organization.
+    credentials = list(reversed(user_store.list_devops_credentials(user["email"])))
+    if not credentials:
         raise HTTPException(400, "DevOps credentials not configured. Please save org and PAT first.")
 
-    organization = creds["organization"]
-    decrypted_pat = decrypt_secret(creds["encrypted_pat"])
+    checks = await asyncio.gather(
+        *(_validate_credentials(c["organization"], decrypt_secret(c["encrypted_pat"])) for c in credentials),
+        return_exceptions=True,
+    )
+    connected = []
+    failed = {}
+    for credential, check in zip(credentials, checks):
+        if isinstance(check, HTTPException):
+            failed[credential["organization"]] = check.detail
+        elif isinstance(check, BaseException):
+            logger.error("Validating credentials for %s failed", credential["organization"], exc_info=check)
+            failed[credential["organization"]] = f"Could not validate credentials: {type(check).__name__}"
+        else:
+            connected.append(credential)
+    if not connected:
+        raise HTTPException(401, "; ".join(failed.values()) or "Authentication/connectivity failed")
+
+    session_id = _new_session(user["email"], [(c["organization"], c["encrypted_pat"]) for c in connected])
+    return ConnectResponse(
+        session_id=session_id,
+        organization=connected[0]["organization"],
+        project_count=_known_project_count(connected[0]["organization"], connected[0]["encrypted_pat"]),
+        organizations=[c["organization"] for c in connected],
+        failed_organizations=failed,
+    )
 
-    client = AzureDevOpsClient(organization, decrypted_pat)
-    try:
-        projects = await client.list_projects()
-    except Exception as ex:
-        raise HTTPException(status_code=401, detail=f"Authentication/connectivity failed: {ex}") from ex
 
-    session_id = str(uuid4())
-    session_store[session_id] = {
-        "organization": organization,
-        "encrypted_pat": creds["encrypted_pat"],
-        "expires_at": datetime.utcnow() + timedelta(minutes=settings.session_ttl_minutes),
+@app.post("/api/connect", response_model=ConnectResponse)
+async def connect(payload: ConnectRequest, auth_token: str, session_id: str | None = None) -> ConnectResponse:
+    user = _require_approved_user(auth_token)
+    await _validate_credentials(payload.organization, payload.pat)
+    encrypted_pat = encrypt_secret(payload.pat)
+
+    if session_id:
+        # Adds another organization to a session the same user already holds.
+        session = _live_session(session_id)
+        if session.get("owner_email") != user["email"]:
+            raise HTTPException(403, "Session belongs to another user")
+        organizations = _session_organizations(session)
+        organizations[payload.organization.strip().lower()] = {
+            "organization": payload.organization,
+            "encrypted_pat": encrypted_pat,
+        }
+        session["organizations"] = organizations
+    else:
+        session_id = _new_session(user["email"], [(payload.organization, encrypted_pat)])
+        session = session_store[session_id]
+
+    return ConnectResponse(
+        session_id=session_id,
+        organization=session["organization"],
+        project_count=_known_project_count(session["organization"], session["encrypted_pat"]),
+        organizations=[o["organization"] for o in _session_organizations(session).values()],
+    )
+
+
+async def _cached_projects(session: dict) -> tuple[str, list[dict]]:
+    cache_key = f"projects:{session['scope']}"
+    cached = cache.get(cache_key)
+    if cached is None:
+        rows = await _session_client(session).list_projects()
+        # Every Azure DevOps project carries a revision that increases on each change.
+        versions = sorted(f"{p.get('id')}@{p.get('revision')}" for p in rows)
+        cached = (etag_for("projects", session["organization"].lower(), *versions), rows)
+        cache.set(cache_key, cached)
+    return cached
+
+
+@app.get("/api/projects", dependencies=upstream_admission)
+async def projects(
+    request: Request,
+    response: Response,
+    session_id: str,
+    organization: str | None = None,
+) -> list[dict]:
+    session = _get_session(session_id, organization)
+    etag, rows = await _cached_projects(session)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    return with_etag(fast_json(rows), response, etag)
+
+
+@app.get("/api/orgs/projects", dependencies=upstream_admission)
+async def projects_across_organizations(session_id: str) -> dict:
+    views = _session_views(session_id)
+    results = await asyncio.gather(*(_cached_projects(view) for view in views), return_exceptions=True)
+
+    organizations = []
+    merged = []
+    for view, result in zip(views, results):
+        if isinstance(result, httpx.HTTPError):
+            # One unreachable organization should not hide the others.
+            organizations.append({"organization": view["organization"], "project_count": 0, "error": str(result)})
+            continue
+        if isinstance(result, BaseException):
+            raise result
+        _, rows = result
+        organizations.append({"organization": view["organization"], "project_count": len(rows), "error": None})
+        merged.extend({**row, "organization": view["organization"]} for row in rows)
+    merged.sort(key=lambda p: ((p.get("name") or "").lower(), p["organization"].lower()))
+    return fast_json({"organizations": organizations, "projects": merged})
+
+
+@app.get("/api/catalog/search", dependencies=upstream_admission)
+async def catalog_search(
+    session_id: str,
+    q: str = Query(..., min_length=1, max_length=100),
+    kind: str | None = Query(None, pattern="^(project|pipeline)$"),
+    limit: int = Query(20, ge=1, le=100),
+    organization: str | None = None,
+) -> dict:
+    # Without an organization, every organization in the session is searched and merged.
+    views = [_get_session(session_id, organization)] if organization else _session_views(session_id)
+
+    async def search(session: dict) -> tuple[Catalog, list[dict]]:
+        catalog = _session_catalog(session)
+        if catalog.refreshed_at is None:
+            async with _pooled_client(session) as client:
+                await catalog.refresh(client)
+        elif catalog.is_stale():
+            # Serve the current index and catch up in the background.
+            catalog.refresh_in_background(lambda: _pooled_client(session))
+        return catalog, [{**hit, "organization": session["organization"]} for hit in catalog.search(q, limit, kind)]
+
+    outcomes = await asyncio.gather(*(search(view) for view in views), return_exceptions=True)
+    searched = []
+    errors = []
+    for view, outcome in zip(views, outcomes):
+        if isinstance(outcome, Exception):
+            # One organization failing (e.g. an expired PAT) leaves the others searchable.
+            if not isinstance(outcome, (HTTPException, httpx.HTTPError)):
+                logger.error("Catalog search in %s failed", view["organization"], exc_info=outcome)
+            if isinstance(outcome, HTTPException):
+                detail = outcome.detail
+            else:
+                detail = (str(outcome).splitlines() or [type(outcome).__name__])[0]
+            errors.append({"organization": view["organization"], "detail": detail})
+        elif isinstance(outcome, BaseException):
+            raise outcome
+        else:
+            searched.append(outcome)
+    results = [hit for _, hits in searched for hit in hits]
+    results.sort(key=lambda hit: (-hit["score"], len(hit["name"]), hit["name"].lower()))
+    refreshed = [catalog.refreshed_at for catalog, _ in searched if catalog.refreshed_at is not None]
+    return {
+        "query": q,
+        "indexed": sum(len(catalog.index) for catalog, _ in searched),
+        "refreshed_at": datetime.utcfromtimestamp(min(refreshed)) if refreshed else None,
+        "results": results[:limit],
+        "errors": errors,
     }
-    return ConnectResponse(session_id=session_id, organization=organization, project_count=len(projects))
 
 
-@app.post("/api/connect", response_model=ConnectResponse)
-async def connect(payload: ConnectRequest, auth_token: str) -> ConnectResponse:
-    _require_approved_user(auth_token)
+def _pipeline_summary(pipe: dict, latest: dict) -> dict:
+    return {
+        "id": pipe["id"],
+        "name": pipe["name"],
+        "latest_status": latest.get("state", "unknown"),
+        "latest_result": latest.get("result", "unknown"),
+    }
 
-    client = AzureDevOpsClient(payload.organization, payload.pat)
+
+async def _pipeline_summaries(
+    client: AzureDevOpsClient,
+    project: str,
+    builds: Awaitable[list[dict]] | None = None,
+    cache_scope: str | None = None,
+) -> list[dict]:
+    # The pipeline list and the runs of pipelines absent from recent builds change rarely;
+    # caching them per session keeps repeat views down to local reads.
+    list_key = f"pipelines:{cache_scope}:{project}"
+    pipeline_list = cache.get(list_key) if cache_scope else None
+    if pipeline_list is None:
+        pipeline_list = await client.list_pipelines(project)
+        if cache_scope:
+            cache.set(list_key, pipeline_list)
+
+    # Recent builds already carry the latest state of their definitions (pipeline ids are
+    # build definition ids), so only pipelines missing from them need a runs call.
+    latest_by_pipeline: dict[int, dict] = {}
+    for build in (await builds if builds is not None else []):
+        definition_id = (build.get("definition") or {}).get("id")
+        if definition_id is not None and definition_id not in latest_by_pipeline:
+            latest = {"state": build.get("status"), "result": build.get("result")}
+            latest_by_pipeline[definition_id] = {k: v for k, v in latest.items() if v}
+
+    semaphore = asyncio.Semaphore(settings.pipeline_runs_concurrency)
+
+    async def latest_run(pipe: dict) -> dict:
+        if pipe["id"] in latest_by_pipeline:
+            return latest_by_pipeline[pipe["id"]]
+        run_key = f"latest-run:{cache_scope}:{project}:{pipe['id']}"
+        latest = cache.get(run_key) if cache_scope else None
+        if latest is None:
+            async with semaphore:
+                runs = await client.list_pipeline_runs(project, pipe["id"])
+            latest = runs[0] if runs else {}
+            if cache_scope:
+                cache.set(run_key, latest)
+        return latest
+
+    latest_runs = await asyncio.gather(*(latest_run(pipe) for pipe in pipeline_list))
+    return [_pipeline_summary(pipe, run) for pipe, run in zip(pipeline_list, latest_runs)]
+
+
+async def _refresh_builds(
+    client: AzureDevOpsClient,
+    organization: str,
+    project: str,
+    force: bool = False,
+) -> None:
+    # With service hooks configured the store is kept current by /api/webhooks/azure-devops,
+    # so upstream is only polled as a slow safety resync.
+    max_age = settings.webhook_resync_seconds if settings.webhook_secret else settings.build_sync_seconds
+    state = build_store.get_sync_state(organization, project)
+    synced_at = (state or {}).get("synced_at")
+    if force or not synced_at or (datetime.utcnow() - synced_at).total_seconds() > max_age:
+        build_store.upsert_builds(organization, project, await client.list_builds(project))
+        build_store.mark_synced(organization, project)
+
+
+async def _project_builds(
+    client: AzureDevOpsClient,
+    organization: str,
+    project: str,
+    force: bool = False,
+) -> list[dict]:
+    await _refresh_builds(client, organization, project, force)
+    return build_store.list_builds(organization, project, limit=ANALYTICS_BUILD_WINDOW)
+
+
+# Per sync key: its lock, callers holding or awaiting it, and when the sync last completed.
+_sync_states: dict[str, dict[str, Any]] = {}
+
+
+async def _throttled_sync(key: str, interval: float, sync: Callable[[], Awaitable[bool]], force: bool = False) -> None:
+    """Run ``sync()`` for ``key`` unless it completed within the last ``interval`` seconds.
+
+    Callers of one key are serialized, so one that waited sees the sync that just finished and
+    returns. ``sync`` returns whether the key counts as synced: ``False`` lets the next request
+    retry at once, so it is for work left over, while a PAT lacking the scope returns ``True``
+    and waits out the interval. States are dropped once idle and past their interval.
+    """
+    now = time.monotonic()
+    for idle_key, idle in list(_sync_states.items()):
+        if not idle["callers"] and (idle["synced_at"] is None or now - idle["synced_at"] > idle["interval"]):
+            del _sync_states[idle_key]
+    state = _sync_states.setdefault(key, {"lock": asyncio.Lock(), "callers": 0, "synced_at": None, "interval": interval})
+    state["callers"] += 1
     try:
-        projects = await client.list_projects()
-    except Exception as ex:
-        raise HTTPException(status_code=401, detail=f"Authentication/connectivity failed: {ex}") from ex
+        async with state["lock"]:
+            synced_at = state["synced_at"]
+            if not force and synced_at is not None and time.monotonic() - synced_at <= interval:
+                return
+            if await sync():
+                state["synced_at"] = time.monotonic()
+    finally:
+        state["callers"] -= 1
 
-    session_id = str(uuid4())
-    session_store[session_id] = {
-        "organization": payload.organization,
-        "encrypted_pat": encrypt_secret(payload.pat),
-        "expires_at": datetime.utcnow() + timedelta(minutes=settings.session_ttl_minutes),
-    }
-    return ConnectResponse(session_id=session_id, organization=payload.organization, project_count=len(projects))
 
+# Halvings of the push window before a listing that is still truncated is given up on.
+PUSH_WINDOW_SPLITS = 12
 
-@app.get("/api/projects")
-async def projects(session_id: str) -> list[dict]:
-    session = _get_session(session_id)
-    client = AzureDevOpsClient(session["organization"], decrypt_secret(session["encrypted_pat"]))
-    return await client.list_projects()
 
+def _ado_date(moment: datetime) -> str:
+    return moment.strftime("%Y-%m-%dT%H:%M:%SZ")
 
-@app.get("/api/projects/{project}/pipelines")
-async def pipelines(project: str, session_id: str) -> list[dict]:
-    session = _get_session(session_id)
-    client = AzureDevOpsClient(session["organization"], decrypt_secret(session["encrypted_pat"]))
-    pipeline_list = await client.list_pipelines(project)
 
-    enriched = []
-    for pipe in pipeline_list:
-        runs = await client.list_pipeline_runs(project, pipe["id"])
-        latest = runs[0] if runs else {}
-        enriched.append(
+async def _sync_pushes(client: AzureDevOpsClient, organization: str, project: str, force: bool = False) -> None:
+    async def sync() -> bool:
+        # The store's stamp is shared by all workers, so another worker's sync counts too.
+        synced_at = push_store.synced_at(organization, project)
+        if not force and synced_at and (datetime.utcnow() - synced_at).total_seconds() <= settings.push_sync_seconds:
+            return True
+
+        try:
+            repositories = await client.list_repositories(project)
+        except httpx.HTTPError:
+            return True  # No Code (read) scope: build analytics only.
+        cursors = push_store.get_cursors(organization, project)
+        now = datetime.utcnow()
+        history_start = datetime.combine((now - timedelta(days=settings.push_history_days)).date(), datetime.min.time())
+        semaphore = asyncio.Semaphore(settings.push_sync_concurrency)
+
+        async def ingest(repo: dict) -> int:
+            if repo.get("isDisabled"):
+                return 0
+            cursor = cursors.get(repo["id"]) or {}
+            last_push_id = cursor.get("last_push_id")
+            window_start = parse_ado_time(cursor.get("last_push_date")) or history_start
+            recorded = 0
+            while True:
+                # A listing holds at most max_pages of pushes, newest first. When more are new,
+                # the window is halved and walked oldest first, so the cursor never skips a gap.
+                window_end = None
+                async with semaphore:
+                    for _ in range(PUSH_WINDOW_SPLITS):
+                        pushes, truncated = await client.list_pushes(
+                            project,
+                            repo["id"],
+                            since_push_id=last_push_id,
+                            from_date=_ado_date(window_start),
+                            to_date=_ado_date(window_end) if window_end else None,
+                        )
+                        if not truncated:
+                            break
+                        window_end = window_start + ((window_end or now) - window_start) / 2
+                    else:
+                        raise RuntimeError(f"Too many pushes to list in repository {repo.get('name') or repo['id']}")
+                added = push_store.record_pushes(
+                    organization, project, repo["id"], repo.get("name") or repo["id"], pushes, last_push_id
+                )
+                recorded += added
+                if window_end is None or (pushes and not added):
+                    # Done, or a concurrent ingester advanced the cursor first.
+                    return recorded
+                if pushes:
+                    last_push_id = max(p["pushId"] for p in pushes if p.get("pushId"))
+                window_start = window_end
+
+        results = await asyncio.gather(*(ingest(repo) for repo in repositories), return_exceptions=True)
+        for repo, result in zip(repositories, results):
+            if isinstance(result, Exception):
+                logger.warning("Push sync of repository %s failed: %s", repo.get("name") or repo["id"], result)
+        if any(isinstance(r, int) and r for r in results):
+            revision_store.bump(f"pushes:{organization.lower()}:{project}")
+        # A failed repository is retried at the next interval rather than on every request,
+        # so one unreadable repository does not turn each view into a full fan-out.
+        push_store.mark_synced(organization, project)
+        return True
+
+    await _throttled_sync(f"pushes:{organization.lower()}:{project}", settings.push_sync_seconds, sync, force)
+
+
+TEST_INGEST_RESULTS = ("failed", "partiallySucceeded")
+
+
+async def _sync_test_results(client: AzureDevOpsClient, organization: str, project: str) -> None:
+    async def sync() -> bool:
+        # Only builds never ingested before are fetched; each is claimed so it is counted once.
+        pending = build_store.list_unflagged(
+            organization, project, "tests_ingested", TEST_INGEST_RESULTS, settings.test_ingest_batch
+        )
+        claimed = build_store.claim_builds(organization, project, [b["id"] for b in pending], "tests_ingested")
+        semaphore = asyncio.Semaphore(settings.test_ingest_concurrency)
+
+        async def fetch(build: dict) -> list[dict]:
+            async with semaphore:
+                runs = await client.list_test_runs(project, build["id"])
+                results: list[dict] = []
+                for run in runs:
+                    results.extend(await client.list_test_results(project, run["id"]))
+                return results
+
+        recorded: set[int] = set()
+        failed = False
+        try:
+            fetched = await asyncio.gather(*(fetch(b) for b in claimed), return_exceptions=True)
+            # History is folded oldest build first so flips are counted in order.
+            for build, results in sorted(zip(claimed, fetched), key=lambda pair: pair[0]["id"]):
+                if isinstance(results, Exception):
+                    failed = True
+                    continue
+                test_store.record_build(organization, project, build, results)
+                recorded.add(build["id"])
+        finally:
+            # Claims not followed by a recorded build (upstream or store errors, cancellation)
+            # are handed back so a later sync picks those builds up again.
+            unrecorded = [b["id"] for b in claimed if b["id"] not in recorded]
+            if unrecorded:
+                build_store.release_builds(organization, project, unrecorded, "tests_ingested")
+        # A full batch likely left more builds pending, so the next request continues at once.
+        return failed or len(pending) < settings.test_ingest_batch
+
+    await _throttled_sync(f"tests:{organization.lower()}:{project}", settings.test_sync_seconds, sync)
+
+
+async def _test_sync_in_background(session: dict, project: str) -> None:
+    async with _pooled_client(session) as client:
+        await _refresh_builds(client, session["organization"], project)
+        await _sync_test_results(client, session["organization"], project)
+
+
+_background_tasks: dict[str, asyncio.Task] = {}
+_pools_sampled_at: dict[str, datetime] = {}
+
+
+def _run_in_background(key: str, session: dict, make: Callable[[], Awaitable[None]]) -> None:
+    """Start ``make()`` unless a task under ``key`` is still running; failures are only logged.
+
+    The task takes an admission slot for the session's user and organization like a request
+    would; when admission rejects it, it is dropped and the next view schedules it again.
+    """
+    task = _background_tasks.get(key)
+    if task and not task.done():
+        return
+
+    async def run() -> None:
+        try:
+            async with admission.slot(session["organization"], session.get("owner_email") or session["session_id"]):
+                await make()
+        except AdmissionRejected:
+            logger.info("Background task %s not admitted", key)
+        except Exception:
+            logger.exception("Background task %s failed", key)
+
+    def forget(done: asyncio.Task) -> None:
+        # Keys carry project names, so finished tasks are dropped rather than kept per key.
+        if _background_tasks.get(key) is done:
+            del _background_tasks[key]
+
+    task = asyncio.create_task(run())
+    task.add_done_callback(forget)
+    _background_tasks[key] = task
+
+
+async def _sample_agent_pools(client: AzureDevOpsClient, organization: str) -> None:
+    try:
+        pools = [p for p in await client.list_agent_pools() if not p.get("isHosted")]
+    except httpx.HTTPError:
+        # PATs without the Agent Pools (read) scope still get queue wait analytics from builds.
+        return
+    semaphore = asyncio.Semaphore(settings.pool_sample_concurrency)
+
+    async def sample(pool: dict) -> dict:
+        async with semaphore:
+            agents = [a for a in await client.list_pool_agents(pool["id"]) if a.get("enabled", True)]
+        online = [a for a in agents if a.get("status") == "online"]
+        return {
+            "pool_id": pool["id"],
+            "pool_name": pool.get("name"),
+            "agents": len(agents),
+            "online": len(online),
+            "busy": sum(1 for a in online if a.get("assignedRequest")),
+        }
+
+    results = await asyncio.gather(*(sample(pool) for pool in pools), return_exceptions=True)
+    capacity_store.record_pool_sample(organization, [r for r in results if not isinstance(r, Exception)])
+
+
+async def _can_read_pools(session: dict) -> bool:
+    """Whether the session's PAT may list agent pools; cached per credential like project checks.
+
+    Pool usage is sampled organization-wide, so it is only shown to callers whose own PAT
+    could read the pools.
+    """
+    pat = decrypt_secret(session["encrypted_pat"])
+    key = f"{_credential_key(session['organization'], pat)}:pools"
+    allowed = credential_checks.get(key)
+    if allowed is None:
+        try:
+            await AzureDevOpsClient(session["organization"], pat).list_agent_pools()
+            allowed = True
+        except httpx.HTTPStatusError as ex:
+            if ex.response.status_code not in (401, 403):
+                return False
+            allowed = False
+        except httpx.HTTPError:
+            # Unknown rather than denied: hide usage this time and ask again next view.
+            return False
+        credential_checks.set(key, allowed)
+    return allowed
+
+
+def _schedule_pool_sample(session: dict) -> None:
+    """Sample agent pools in the background when the last sample is older than POOL_SAMPLE_SECONDS."""
+    org = session["organization"].strip().lower()
+    sampled_at = _pools_sampled_at.get(org)
+    if sampled_at and (datetime.utcnow() - sampled_at).total_seconds() <= settings.pool_sample_seconds:
+        return
+
+    async def sample() -> None:
+        async with _pooled_client(session) as client:
+            await _sample_agent_pools(client, session["organization"])
+        # Stamped only once a sample is stored, so a rejected or failed run is retried on the
+        # next view; a run still in flight is not started twice (same background key).
+        _pools_sampled_at[org] = datetime.utcnow()
+
+    _run_in_background(f"pools:{org}", session, sample)
+
+
+PR_WINDOW_SPLITS = 12
+
+
+async def _sync_pull_requests(client: AzureDevOpsClient, organization: str, project: str) -> None:
+    async def sync() -> bool:
+        try:
+            repositories = await client.list_repositories(project)
+        except httpx.HTTPError:
+            return True  # No Code (read) scope: no pull request analytics.
+        cursors = pr_store.get_cursors(organization, project)
+        now = datetime.utcnow()
+        history_start = now - timedelta(days=settings.pr_history_days)
+        repo_semaphore = asyncio.Semaphore(settings.pr_sync_concurrency)
+        thread_semaphore = asyncio.Semaphore(settings.pr_thread_concurrency)
+
+        async def compact(repo: dict, pr: dict) -> dict | None:
+            async with thread_semaphore:
+                threads = await client.list_pull_request_threads(project, repo["id"], pr["pullRequestId"])
+            return compact_pull_request(pr, threads)
+
+        async def ingest(repo: dict) -> None:
+            if repo.get("isDisabled"):
+                return
+            async with repo_semaphore:
+                await ingest_windows(repo)
+
+        async def ingest_windows(repo: dict) -> None:
+            window_start = (cursors.get(repo["id"]) or {}).get("last_closed") or history_start
+            width = now - window_start
+            while window_start < now:
+                # Listings are not ordered by closing date, so the cursor only moves to the end of
+                # a window that was listed completely; a truncated window is halved and walked
+                # oldest first, and the next window starts at the width that last fit. The fixed
+                # end also keeps $skip pages from shifting while pull requests complete during
+                # the listing.
+                window_end = min(now, window_start + width)
+                for _ in range(PR_WINDOW_SPLITS):
+                    listed, truncated = await client.list_completed_pull_requests(
+                        project,
+                        repo["id"],
+                        closed_since=_ado_date(window_start),
+                        closed_until=_ado_date(window_end),
+                        concurrency=settings.pr_page_concurrency,
+                    )
+                    if not truncated:
+                        break
+                    window_end = window_start + (window_end - window_start) / 2
+                else:
+                    raise RuntimeError(f"Too many pull requests to list in repository {repo.get('name') or repo['id']}")
+                by_id = {pr["pullRequestId"]: pr for pr in listed if pr.get("pullRequestId")}
+                # Pull requests already stored are complete and immutable; only new ones need threads.
+                known = pr_store.known_ids(organization, project, repo["id"], list(by_id))
+                compacted = await asyncio.gather(
+                    *(compact(repo, pr) for pr_id, pr in by_id.items() if pr_id not in known)
+                )
+                pr_store.record_pull_requests(
+                    organization,
+                    project,
+                    repo["id"],
+                    repo.get("name") or repo["id"],
+                    [pr for pr in compacted if pr],
+                    window_end,
+                )
+                width = window_end - window_start
+                window_start = window_end
+
+        results = await asyncio.gather(*(ingest(repo) for repo in repositories), return_exceptions=True)
+        # A repository that failed is retried on the next request; the others have advanced.
+        return not any(isinstance(r, Exception) for r in results)
+
+    await _throttled_sync(f"prs:{organization.lower()}:{project}", settings.pr_sync_seconds, sync)
+
+
+async def _pr_sync_in_background(session: dict, project: str) -> None:
+    async with _pooled_client(session) as client:
+        await _sync_pull_requests(client, session["organization"], project)
+
+
+def _deployment_runs(
+    records: list[dict],
+    builds: dict[int, dict],
+    stale_before: datetime,
+) -> tuple[list[dict], int | None]:
+    """Group deployment records (one per job) by pipeline run, oldest first.
+
+    Returns the completed runs and the record id the cursor may advance to: just before the
+    first run that still has a job in progress. A run whose jobs were last queued or started
+    before ``stale_before`` is treated as abandoned and skipped, so it cannot hold the cursor
+    back forever.
+    """
+    runs: dict[int, list[dict]] = {}
+    for record in sorted(records, key=lambda r: r["id"]):
+        run_id = (record.get("owner") or {}).get("id") or -record["id"]
+        runs.setdefault(run_id, []).append(record)
+
+    deployments = []
+    cursor = max((r["id"] for r in records), default=None)
+    for run_id, run_records in runs.items():
+        if any(not r.get("finishTime") or not r.get("result") for r in run_records):
+            moments = [parse_ado_time(r.get("startTime") or r.get("queueTime")) for r in run_records]
+            last_activity = max((m for m in moments if m), default=None)
+            if last_activity and last_activity < stale_before:
+                logger.warning("Skipping deployment run %s, in progress since %s", run_id, last_activity)
+                continue
+            cursor = min(r["id"] for r in run_records) - 1
+            break
+        results = {r["result"] for r in run_records}
+        finished_at = max(parse_ado_time(r["finishTime"]) for r in run_records)
+        queued_at = parse_ado_time((builds.get(run_id) or {}).get("queueTime"))
+        lead = (finished_at - queued_at).total_seconds() if queued_at and finished_at >= queued_at else None
+        deployments.append(
             {
-                "id": pipe["id"],
-                "name": pipe["name"],
-                "latest_status": latest.get("state", "unknown"),
-                "latest_result": latest.get("result", "unknown"),
+                "run_id": run_id,
+                "result": "failed" if "failed" in results else "succeeded" if "succeeded" in results else min(results),
+                "finished_at": finished_at,
+                # Lead time runs from the queueing of the run that carried the change.
+                "lead_seconds": lead,
             }
         )
-    return enriched
+    return deployments, cursor
 
 
-@app.get("/api/projects/{project}/analytics")
-async def analytics(project: str, session_id: str) -> dict:
-    session = _get_session(session_id)
-    cache_key = f"analytics:{session_id}:{project}"
+async def _sync_deployments(client: AzureDevOpsClient, organization: str, project: str) -> None:
+    async def sync() -> bool:
+        try:
+            environments = await client.list_environments(project)
+        except httpx.HTTPError:
+            return True  # No Environment (read) scope: no DORA metrics.
+        # Lead times join deployments to their runs in the build store.
+        await _refresh_builds(client, organization, project)
+        states = {s["environment_id"]: s for s in dora_store.get_states(organization, [project])}
+        history_start = (datetime.utcnow() - timedelta(days=settings.dora_history_days)).strftime("%Y-%m-%dT00:00:00Z")
+        semaphore = asyncio.Semaphore(settings.dora_sync_concurrency)
+
+        async def ingest(environment: dict) -> bool:
+            state = states.get(environment["id"])
+            previous = (state or {}).get("last_record_id")
+            records: list[dict] = []
+            token = None
+            async with semaphore:
+                # Records are only listed newest first, so a truncated listing is continued down
+                # to the cursor before anything is folded; the history window bounds the walk.
+                while True:
+                    page, token = await client.list_environment_deployments(
+                        project,
+                        environment["id"],
+                        since_record_id=previous,
+                        min_finish_time=history_start,
+                        continuation_token=token,
+                    )
+                    records.extend(page)
+                    if not token:
+                        break
+            run_ids = [(r.get("owner") or {}).get("id") for r in records]
+            builds = build_store.get_builds(organization, project, [i for i in set(run_ids) if i])
+            stale_before = datetime.utcnow() - timedelta(hours=settings.dora_pending_run_hours)
+            deployments, cursor = _deployment_runs(records, builds, stale_before)
+            cursor = cursor if cursor is not None else previous
+            if state is not None and cursor == previous and state.get("environment") == environment.get("name"):
+                return False
+            dora_store.record_deployments(
+                organization, project, environment, state, deployments, cursor if cursor is not None else 0
+            )
+            return True
+
+        results = await asyncio.gather(*(ingest(env) for env in environments), return_exceptions=True)
+        if any(r is True for r in results):
+            revision_store.bump(f"dora:{organization.lower()}:{project}")
+        # An unreadable environment is retried on the next request rather than after the interval.
+        return not any(isinstance(r, Exception) for r in results)
+
+    await _throttled_sync(f"dora:{organization.lower()}:{project}", settings.dora_sync_seconds, sync)
+
+
+async def _dora_sync_in_background(session: dict, project: str) -> None:
+    async with _pooled_client(session) as client:
+        await _sync_deployments(client, session["organization"], project)
+
+
+def _dora_days(days: int) -> int:
+    # Deployments are only ingested DORA_HISTORY_DAYS back; a longer window would count the
+    # days before that as days without deployments.
+    return min(days, settings.dora_history_days)
+
+
+def _dora_since_day(days: int) -> str:
+    return (datetime.utcnow() - timedelta(days=days - 1)).strftime("%Y-%m-%d")
+
+
+def _push_frequency(organization: str, project: str, days: int) -> dict[str, dict[str, int]]:
+    since_day = (datetime.utcnow() - timedelta(days=days)).strftime("%Y-%m-%d")
+    return push_store.aggregate(organization, project, since_day)
+
+
+def _analytics_version(organization: str, project: str) -> str:
+    # Push counts change only when pushes are recorded; the date moves their window forward.
+    pushes = revision_store.get(f"pushes:{organization.lower()}:{project}")
+    return f"{build_store.version(organization, project)}:{pushes}:{datetime.utcnow():%Y-%m-%d}"
+
+
+def _project_analytics(
+    scope: str,
+    organization: str,
+    project: str,
+    builds: list[dict] | None = None,
+    version: str | None = None,
+) -> dict:
+    version = version or _analytics_version(organization, project)
+    cache_key = f"analytics:{scope}:{project}:{version}"
     if cached := cache.get(cache_key):
         return cached
+    if builds is None:
+        builds = build_store.list_builds(organization, project, limit=ANALYTICS_BUILD_WINDOW)
+    payload = _analytics_payload(builds)
+    payload["code_push_frequency"] = _push_frequency(organization, project, settings.push_window_days)["by_day"]
+    cache.set(cache_key, payload)
+    return payload
+
 
-    client = AzureDevOpsClient(session["organization"], decrypt_secret(session["encrypted_pat"]))
-    builds = await client.list_builds(project)
-    trends = client.summarize_build_trends(builds)
+def _analytics_payload(builds: list[dict]) -> dict:
+    trends = AzureDevOpsClient.summarize_build_trends(builds)
 
     failures_by_definition: Counter[str] = Counter()
     for build in builds:
@@ -391,36 +1518,375 @@ async def analytics(project: str, session_id: str) -> dict:
             definition = (build.get("definition") or {}).get("name", "Unknown")
             failures_by_definition[definition] += 1
 
-    payload = {
+    return {
         **trends,
         "failure_distribution": dict(failures_by_definition),
-        "code_push_frequency": trends["build_trend"],
     }
-    cache.set(cache_key, payload)
-    return payload
 
 
-@app.get("/api/projects/{project}/pipelines/{pipeline_id}/runs")
-async def pipeline_runs(project: str, pipeline_id: int, session_id: str) -> list[dict]:
-    session = _get_session(session_id)
-    client = AzureDevOpsClient(session["organization"], decrypt_secret(session["encrypted_pat"]))
-    return await client.list_pipeline_runs(project, pipeline_id)
+@app.get("/api/projects/{project}/pipelines", dependencies=upstream_admission)
+async def pipelines(project: str, session_id: str, organization: str | None = None) -> list[dict]:
+    session = _get_session(session_id, organization)
+    await _authorize_project(session, project)
+    async with httpx.AsyncClient(timeout=20) as http:
+        client = _session_client(session, http)
+        builds = _project_builds(client, session["organization"], project)
+        return await _pipeline_summaries(client, project, builds, cache_scope=session["scope"])
+
+
+@app.get("/api/projects/{project}/analytics", dependencies=upstream_admission)
+async def analytics(
+    request: Request,
+    response: Response,
+    project: str,
+    session_id: str,
+    organization: str | None = None,
+) -> dict:
+    session = _get_session(session_id, organization)
+    await _authorize_project(session, project)
+    organization = session["organization"]
+    client = _session_client(session)
+    await asyncio.gather(
+        _refresh_builds(client, organization, project),
+        _sync_pushes(client, organization, project),
+    )
+    version = _analytics_version(organization, project)
+    etag = etag_for("analytics", organization.lower(), project, version)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    return with_etag(_project_analytics(session["scope"], organization, project, version=version), response, etag)
+
+
+@app.get("/api/projects/{project}/analytics/range", dependencies=upstream_admission)
+async def analytics_range(
+    project: str,
+    session_id: str,
+    since: datetime,
+    until: datetime | None = None,
+    definition_id: int | None = None,
+    granularity: str | None = Query(None, pattern="^(hour|day)$"),
+    organization: str | None = None,
+) -> dict:
+    session = _get_session(session_id, organization)
+    await _authorize_project(session, project)
+    organization = session["organization"]
+    start = _naive_utc(since)
+    end = _naive_utc(until) if until else datetime.utcnow()
+    if end <= start:
+        raise HTTPException(400, "until must be after since")
+    # Refreshes the store (and so the rollups) only when stale; the query itself reads rollups.
+    await _project_builds(_session_client(session), organization, project)
+    return rollup_store.summarize(organization, project, start, end, definition_id, granularity)
+
+
+@app.get("/api/projects/{project}/capacity", dependencies=upstream_admission)
+async def capacity(
+    project: str,
+    session_id: str,
+    days: int = Query(7, ge=1, le=90),
+    definition_id: int | None = None,
+    granularity: str | None = Query(None, pattern="^(hour|day)$"),
+    organization: str | None = None,
+) -> dict:
+    session = _get_session(session_id, organization)
+    await _authorize_project(session, project)
+    organization = session["organization"]
+    # Builds refresh only when stale and pool usage is sampled in the background; the
+    # response itself is read from rollups.
+    await _refresh_builds(_session_client(session), organization, project)
+    pool_usage = await _can_read_pools(session)
+    if pool_usage:
+        _schedule_pool_sample(session)
+    end = datetime.utcnow()
+    start = end - timedelta(days=days)
+    return fast_json(
+        capacity_store.summarize(organization, project, start, end, definition_id, granularity, pool_usage)
+    )
+
+
+@app.get("/api/projects/{project}/export/{dataset}")
+async def export_analytics(
+    project: str,
+    dataset: str,
+    session_id: str,
+    slot: AsyncExitStack = Depends(_admit_streaming),
+    format: str = Query("csv", pattern="^(csv|parquet)$"),
+    since: datetime | None = None,
+    until: datetime | None = None,
+    definition_id: int | None = None,
+    granularity: str = Query("day", pattern="^(hour|day)$"),
+    organization: str | None = None,
+) -> StreamingResponse:
+    session = _get_session(session_id, organization)
+    await _authorize_project(session, project)
+    organization = session["organization"]
+    if dataset not in ("builds", "rollups"):
+        raise HTTPException(404, "Unknown export; use 'builds' or 'rollups'")
+    if format == "parquet" and not parquet_available():
+        raise HTTPException(501, "Parquet export requires pyarrow on the server")
+    start = _naive_utc(since) if since else None
+    end = _naive_utc(until) if until else datetime.utcnow()
+
+    # Exports read the build store and rollups; upstream is only polled when the store is stale.
+    await _refresh_builds(_session_client(session), organization, project)
+    if dataset == "builds":
+        rows = build_store.iter_builds(
+            organization,
+            project,
+            definition_id,
+            since=start.isoformat() if start else None,
+            until=end.isoformat() if until else None,
+        )
+        chunks = export_chunks(format, rows, build_record, BUILD_COLUMNS)
+    else:
+        rows = rollup_store.list_rows(
+            organization,
+            project,
+            granularity,
+            bucket_key(start, granularity) if start else "",
+            bucket_key(end, granularity),
+            definition_id,
+        )
+        rows.sort(key=lambda row: (row["bucket"], row.get("definition_id") or 0))
+        chunks = export_chunks(format, rows, rollup_record, ROLLUP_COLUMNS)
+
+    media_type, extension = FORMATS[format]
+    return ReleasingStreamingResponse(
+        chunks,
+        slot.aclose,
+        media_type=media_type,
+        headers={
+            "Content-Disposition": attachment_disposition(f"{project}-{dataset}.{extension}"),
+            "Cache-Control": "no-store",
+        },
+    )
+
+
+@app.get("/api/projects/{project}/dora", dependencies=upstream_admission)
+async def project_dora(
+    project: str,
+    session_id: str,
+    days: int = Query(30, ge=1, le=365),
+    organization: str | None = None,
+) -> dict:
+    session = _get_session(session_id, organization)
+    await _authorize_project(session, project)
+    organization = session["organization"]
+    days = _dora_days(days)
+    async with _pooled_client(session) as client:
+        await _sync_deployments(client, organization, project)
+    environments = dora_store.metrics(organization, [project], _dora_since_day(days), days)
+    environments.sort(key=lambda e: (e.get("environment") or "").lower())
+    return fast_json({"days": days, "environments": environments})
+
+
+@app.get("/api/projects/{project}/pull-requests/cycle-time", dependencies=upstream_admission)
+async def pull_request_cycle_time(
+    project: str,
+    session_id: str,
+    weeks: int = Query(12, ge=1, le=52),
+    group_by: str = Query("repository", pattern="^(repository|team)$"),
+    repository_id: str | None = None,
+    organization: str | None = None,
+) -> dict:
+    session = _get_session(session_id, organization)
+    await _authorize_project(session, project)
+    organization = session["organization"]
+    # Ingestion (listing pages and review threads) runs in the background; this only reads
+    # the weekly aggregates.
+    _run_in_background(
+        f"prs:{session['scope']}:{project}", session, lambda: _pr_sync_in_background(session, project)
+    )
+    since_week = week_key(datetime.utcnow() - timedelta(weeks=weeks - 1))
+    cursors = pr_store.get_cursors(organization, project).values()
+    return fast_json(
+        {
+            "weeks": weeks,
+            "group_by": group_by,
+            "synced_at": max((c["synced_at"] for c in cursors if c.get("synced_at")), default=None),
+            "series": pr_store.weekly(organization, project, group_by, since_week, repository_id),
+        }
+    )
+
+
+@app.get("/api/projects/{project}/pushes", dependencies=upstream_admission)
+async def push_frequency(
+    project: str,
+    session_id: str,
+    days: int = Query(30, ge=1, le=365),
+    organization: str | None = None,
+) -> dict:
+    session = _get_session(session_id, organization)
+    await _authorize_project(session, project)
+    organization = session["organization"]
+    await _sync_pushes(_session_client(session), organization, project)
+    return {"days": days, **_push_frequency(organization, project, days)}
+
+
+@app.get("/api/projects/{project}/tests/insights", dependencies=upstream_admission)
+async def test_insights(
+    project: str,
+    session_id: str,
+    definition_id: int | None = None,
+    limit: int = Query(20, ge=1, le=100),
+    organization: str | None = None,
+) -> dict:
+    session = _get_session(session_id, organization)
+    await _authorize_project(session, project)
+    organization = session["organization"]
+    # Failed builds are ingested in the background; this only reads the test history.
+    _run_in_background(
+        f"tests:{session['scope']}:{project}", session, lambda: _test_sync_in_background(session, project)
+    )
+    return fast_json(
+        {
+            "flaky_tests": test_store.flaky_tests(organization, project, definition_id, limit),
+            "top_failing_tests": test_store.top_failing_tests(organization, project, definition_id, limit),
+        }
+    )
+
+
+ANALYTICS_BUILD_WINDOW = 100
+OVERVIEW_FIELDS = {"pipelines", "analytics", "resources"}
+
+
+@app.get("/api/projects/{project}/overview", dependencies=upstream_admission)
+async def project_overview(
+    project: str,
+    session_id: str,
+    fields: str | None = None,
+    organization: str | None = None,
+) -> dict:
+    session = _get_session(session_id, organization)
+    await _authorize_project(session, project)
+    wanted = {f.strip() for f in fields.split(",") if f.strip()} if fields else set(OVERVIEW_FIELDS)
+    unknown = wanted - OVERVIEW_FIELDS
+    if unknown:
+        raise HTTPException(400, f"Unknown overview fields: {', '.join(sorted(unknown))}")
+
+    payload: dict = {}
+    if "resources" in wanted:
+        rows = resource_store.list_resources(organization=session["organization"], project=project)
+        payload["resources"] = project_rows(ResourceItem, rows)
+
+    organization = session["organization"]
+    async with httpx.AsyncClient(timeout=20) as http:
+        client = _session_client(session, http)
+        # Builds come from the local build store (synced only when stale) and are shared by
+        # the pipeline latest-state lookup and the analytics aggregation.
+        builds_task = asyncio.create_task(_project_builds(client, organization, project))
+        pushes_task = asyncio.create_task(_sync_pushes(client, organization, project)) if "analytics" in wanted else None
+        try:
+            if "pipelines" in wanted:
+                payload["pipelines"] = await _pipeline_summaries(client, project, builds_task, cache_scope=session["scope"])
+            if "analytics" in wanted:
+                builds = await builds_task
+                await pushes_task
+                payload["analytics"] = _project_analytics(session["scope"], organization, project, builds)
+        finally:
+            for task in (builds_task, pushes_task):
+                if task is not None and not task.done():
+                    task.cancel()
+
+    return fast_json(payload)
+
+
+@app.get("/api/projects/{project}/pipelines/{pipeline_id}/runs", dependencies=upstream_admission)
+async def pipeline_runs(
+    project: str,
+    pipeline_id: int,
+    session_id: str,
+    organization: str | None = None,
+) -> list[dict]:
+    session = _get_session(session_id, organization)
+    client = _session_client(session)
+    return fast_json(await client.list_pipeline_runs(project, pipeline_id))
+
+
+def _naive_utc(value: datetime) -> datetime:
+    return value.astimezone(timezone.utc).replace(tzinfo=None) if value.tzinfo else value
+
+
+def _encode_history_token(upstream_token: str, filters: list) -> str:
+    raw = json.dumps({"t": upstream_token, "f": filters}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+
+def _decode_history_token(token: str, filters: list) -> str:
+    try:
+        data = json.loads(base64.urlsafe_b64decode(token.encode("ascii")))
+    except (ValueError, UnicodeDecodeError) as ex:
+        raise HTTPException(400, "Invalid continuation token") from ex
+    if not isinstance(data, dict) or not isinstance(data.get("t"), str):
+        raise HTTPException(400, "Invalid continuation token")
+    if data.get("f") != filters:
+        raise HTTPException(400, "Continuation token does not match the requested filters")
+    return data["t"]
+
+
+@app.get("/api/projects/{project}/pipelines/{pipeline_id}/runs/history", dependencies=upstream_admission)
+async def pipeline_run_history(
+    project: str,
+    pipeline_id: int,
+    session_id: str,
+    since: datetime | None = None,
+    until: datetime | None = None,
+    page_size: int = Query(50, ge=1, le=200),
+    continuation_token: str | None = None,
+    organization: str | None = None,
+) -> dict:
+    session = _get_session(session_id, organization)
+    await _authorize_project(session, project)
+    min_time = since.isoformat() if since else None
+    max_time = until.isoformat() if until else None
+    filters = [pipeline_id, min_time, max_time, page_size]
+    upstream_token = _decode_history_token(continuation_token, filters) if continuation_token else None
+
+    # A page is immutable once all its runs completed and newer runs cannot land on it:
+    # either it continues from a token or its window ended in the past.
+    until_utc = _naive_utc(until) if until else None
+    window_closed = upstream_token is not None or (until_utc is not None and until_utc < datetime.utcnow())
+    page_id = hashlib.sha1(json.dumps([*filters, upstream_token]).encode("utf-8")).hexdigest()
+    cache_key = immutable_cache.key(session["organization"], project, "runs-page", page_id)
+    if window_closed and (cached := await immutable_cache.aget(cache_key)):
+        return fast_json(cached)
+
+    client = _session_client(session)
+    builds, next_token = await client.list_builds_page(
+        project, pipeline_id, min_time, max_time, top=page_size, continuation_token=upstream_token
+    )
+    page = {
+        "runs": [client.slim_run(b) for b in builds],
+        "continuation_token": _encode_history_token(next_token, filters) if next_token else None,
+    }
+    if window_closed and all(run["state"] == "completed" for run in page["runs"]):
+        await immutable_cache.aset(cache_key, page)
+    return fast_json(page)
 
 
 @app.get("/api/resources", response_model=list[ResourceItem])
-async def list_resources(session_id: str, project: str | None = None, environment: str | None = None) -> list[ResourceItem]:
-    session = _get_session(session_id)
+async def list_resources(
+    session_id: str,
+    project: str | None = None,
+    environment: str | None = None,
+    organization: str | None = None,
+) -> list[ResourceItem]:
+    session = _get_session(session_id, organization)
     rows = resource_store.list_resources(
         organization=session["organization"],
         project=project,
         environment=environment,
     )
-    return [ResourceItem(**row) for row in rows]
+    return model_rows(ResourceItem, rows)
 
 
 @app.post("/api/resources", response_model=ResourceItem)
-async def create_resource(payload: ResourceCreateRequest, session_id: str) -> ResourceItem:
-    session = _get_session(session_id)
+async def create_resource(
+    payload: ResourceCreateRequest,
+    session_id: str,
+    organization: str | None = None,
+) -> ResourceItem:
+    session = _get_session(session_id, organization)
 
     created = resource_store.add_resource(
         {
@@ -433,19 +1899,35 @@ async def create_resource(payload: ResourceCreateRequest, session_id: str) -> Re
             "notes": payload.notes.strip() if payload.notes else None,
         }
     )
-    return ResourceItem(**created)
-
+    return model_row(ResourceItem, created)
 
-@app.get("/api/projects/{project}/pipelines/{pipeline_id}/error-intelligence")
-async def error_intelligence(project: str, pipeline_id: int, session_id: str, run_id: int | None = None) -> dict:
-    session = _get_session(session_id)
-    client = AzureDevOpsClient(session["organization"], decrypt_secret(session["encrypted_pat"]))
 
+async def _error_intelligence(
+    client: AzureDevOpsClient,
+    project: str,
+    pipeline_id: int,
+    run_id: int | None = None,
+    summarize: bool = True,
+) -> dict:
     runs = await client.list_pipeline_runs(project, pipeline_id)
     failed_runs = [r for r in runs if r.get("result") == "failed"]
 
     if run_id is not None:
         target = next((r for r in runs if r.get("id") == run_id), None)
+        if not target:
+            # Older than the recent run window: pipeline runs share ids with builds.
+            try:
+                build = await client.get_build(project, run_id)
+            except Exception:
+                build = None
+            if build and (build.get("definition") or {}).get("id") == pipeline_id:
+                target = {
+                    "id": build.get("id"),
+                    "result": build.get("result"),
+                    "state": build.get("status"),
+                    "createdDate": build.get("queueTime"),
+                    "pipeline": {"id": pipeline_id, "name": (build.get("definition") or {}).get("name")},
+                }
         if not target:
             raise HTTPException(status_code=404, detail=f"Run {run_id} not found")
         if target.get("result") != "failed":
@@ -476,6 +1958,7 @@ async def error_intelligence(project: str, pipeline_id: int, session_id: str, ru
         build_id = run.get("id")
         failed_task = "Unknown Task"
         message = "No error detail available"
+        log_errors: list[str] = []
 
         try:
             timeline = await client.timeline(project, build_id)
@@ -505,6 +1988,21 @@ async def error_intelligence(project: str, pipeline_id: int, session_id: str, ru
                     message = issues[0].get("message", message)
                 else:
                     message = best.get("resultCode") or best.get("currentOperation") or display_name or message
+
+                log_id = (best.get("log") or {}).get("id")
+                if log_id is not None:
+                    try:
+                        log_errors = await client.build_log_errors(
+                            project,
+                            build_id,
+                            log_id,
+                            tail_lines=settings.build_log_tail_lines,
+                            completed=best.get("state") == "completed",
+                        )
+                    except Exception:
+                        log_errors = []
+                    if log_errors and not error_issues:
+                        message = log_errors[-1]
         except Exception:
             pass
 
@@ -515,11 +2013,11 @@ async def error_intelligence(project: str, pipeline_id: int, session_id: str, ru
                 "failed_task": failed_task,
                 "error_message": message,
                 "timestamp": run.get("createdDate"),
-                "logs_summary": message[:180],
+                "logs_summary": ("\n".join(log_errors) if log_errors else message)[:180],
             }
         )
 
-    ai_summary = await summarize_failures([f["error_message"] for f in collected])
+    ai_summary = await summarize_failures([f["error_message"] for f in collected]) if summarize else None
 
     return {
         "pipeline_id": pipeline_id,
@@ -529,3 +2027,108 @@ async def error_intelligence(project: str, pipeline_id: int, session_id: str, ru
         "failed_runs": collected,
         "ai_summary": ai_summary,
     }
+
+
+@app.get("/api/projects/{project}/pipelines/{pipeline_id}/error-intelligence", dependencies=upstream_admission)
+async def error_intelligence(
+    project: str,
+    pipeline_id: int,
+    session_id: str,
+    run_id: int | None = None,
+    organization: str | None = None,
+) -> dict:
+    session = _get_session(session_id, organization)
+    return await _error_intelligence(_session_client(session), project, pipeline_id, run_id)
+
+
+def _sse(event: str, data: object) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+@app.get("/api/projects/{project}/pipelines/{pipeline_id}/error-intelligence/stream")
+async def error_intelligence_stream(
+    request: Request,
+    project: str,
+    pipeline_id: int,
+    session_id: str,
+    slot: AsyncExitStack = Depends(_admit_streaming),
+    run_id: int | None = None,
+    organization: str | None = None,
+) -> StreamingResponse:
+    session = _get_session(session_id, organization)
+    insight = await _error_intelligence(_session_client(session), project, pipeline_id, run_id, summarize=False)
+
+    async def events() -> AsyncIterator[str]:
+        yield _sse("insight", insight)
+        tokens = stream_failure_summary([f["error_message"] for f in insight["failed_runs"]])
+        try:
+            async for token in tokens:
+                # Starlette cancels this generator on disconnect; the explicit check also
+                # catches proxies that keep the socket open.
+                if await request.is_disconnected():
+                    break
+                yield _sse("token", token)
+        except httpx.HTTPError as ex:
+            yield _sse("error", f"AI summary unavailable: {ex}")
+        finally:
+            await tokens.aclose()
+        yield _sse("done", None)
+
+    return ReleasingStreamingResponse(
+        events(),
+        slot.aclose,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def _submit_job(session: dict, kind: str, key: str, fn: Callable[[], Awaitable[Any]]) -> JobStatus:
+    try:
+        job = job_queue.submit(kind, f"{session['scope']}:{key}", fn, owner=session["session_id"])
+    except OverflowError as ex:
+        raise HTTPException(503, str(ex)) from ex
+    return JobStatus(**job)
+
+
+@app.post("/api/projects/{project}/pipelines/{pipeline_id}/error-intelligence/jobs", response_model=JobStatus)
+async def submit_error_intelligence_job(
+    project: str,
+    pipeline_id: int,
+    session_id: str,
+    run_id: int | None = None,
+    organization: str | None = None,
+) -> JobStatus:
+    session = _get_session(session_id, organization)
+    client = _session_client(session)
+    return _submit_job(
+        session,
+        "error-intelligence",
+        f"error-intelligence:{project}:{pipeline_id}:{run_id}",
+        lambda: _error_intelligence(client, project, pipeline_id, run_id),
+    )
+
+
+@app.post("/api/projects/{project}/analytics/jobs", response_model=JobStatus)
+async def submit_analytics_job(project: str, session_id: str, organization: str | None = None) -> JobStatus:
+    session = _get_session(session_id, organization)
+    await _authorize_project(session, project)
+    client = _session_client(session)
+    organization = session["organization"]
+
+    async def recompute() -> dict:
+        builds, _ = await asyncio.gather(
+            _project_builds(client, organization, project, force=True),
+            _sync_pushes(client, organization, project, force=True),
+        )
+        return _project_analytics(session["scope"], organization, project, builds)
+
+    return _submit_job(session, "analytics", f"analytics:{project}", recompute)
+
+
+@app.get("/api/jobs/{job_id}", response_model=JobStatus)
+async def get_job(job_id: str, session_id: str) -> JobStatus:
+    _live_session(session_id)
+    job = job_queue.get(job_id)
+    if not job or job["owner"] != session_id:
+        raise HTTPException(404, "Job not found")
+    return JobStatus(**job)
@@ -0,0 +1,133 @@
+"""One-off Mongo migrations (index creation, rollup backfill).
+
+Run once per deployment from ``backend/``: ``python -m app.migrations``. Unique indexes are
+also ensured whenever the app connects (see ``app.db``); the other indexes and the backfill
+only run here.
+"""
+from __future__ import annotations
+
+from typing import Any
+
+from pymongo.database import Database
+
+from .build_store import BuildStore
+from .capacity_store import CapacityStore
+from .config import settings
+from .db import close_database, get_database
+from .rollup_store import RollupStore
+
+
+def index_plan() -> dict[str, list[tuple[Any, dict[str, Any]]]]:
+    return {
+        settings.mongodb_collection: [
+            ([("organization", 1), ("project", 1), ("environment", 1), ("name", 1)], {}),
+            ([("owner_email", 1), ("dashboard_id", 1), ("project", 1), ("environment", 1), ("name", 1)], {}),
+        ],
+        "users": [
+            ("email", {"unique": True}),
+            ("username", {"unique": True}),
+        ],
+        "dashboards": [
+            ("name", {}),
+        ],
+        "builds": [
+            ([("organization", 1), ("project_name", 1), ("id", 1)], {"unique": True}),
+            ([("organization", 1), ("project_name", 1), ("queueTime", -1)], {}),
+            ([("organization", 1), ("project_name", 1), ("definition.id", 1), ("queueTime", -1)], {}),
+        ],
+        "push_counts": [
+            ([("organization", 1), ("project", 1), ("repository_id", 1), ("day", 1), ("author", 1)], {"unique": True}),
+            ([("organization", 1), ("project", 1), ("day", 1)], {}),
+        ],
+        "push_cursors": [
+            ([("organization", 1), ("project", 1), ("repository_id", 1)], {"unique": True}),
+        ],
+        "build_rollups": [
+            (
+                [("organization", 1), ("project", 1), ("granularity", 1), ("bucket", 1), ("definition_id", 1)],
+                {"unique": True},
+            ),
+        ],
+        "capacity_rollups": [
+            (
+                [
+                    ("organization", 1),
+                    ("project", 1),
+                    ("granularity", 1),
+                    ("bucket", 1),
+                    ("definition_id", 1),
+                    ("pool_id", 1),
+                ],
+                {"unique": True},
+            ),
+        ],
+        "pool_usage": [
+            ([("organization", 1), ("granularity", 1), ("bucket", 1), ("pool_id", 1)], {"unique": True}),
+        ],
+        "pull_requests": [
+            ([("organization", 1), ("project", 1), ("repository_id", 1), ("id", 1)], {"unique": True}),
+        ],
+        "pr_weekly": [
+            (
+                [("organization", 1), ("project", 1), ("group", 1), ("week", 1), ("repository_id", 1), ("name", 1)],
+                {"unique": True},
+            ),
+        ],
+        "pr_cursors": [
+            ([("organization", 1), ("project", 1), ("repository_id", 1)], {"unique": True}),
+        ],
+        "dora_daily": [
+            ([("organization", 1), ("project", 1), ("environment_id", 1), ("day", 1)], {"unique": True}),
+            ([("organization", 1), ("project", 1), ("day", 1)], {}),
+        ],
+        "dora_environments": [
+            ([("organization", 1), ("project", 1), ("environment_id", 1)], {"unique": True}),
+        ],
+        "test_history": [
+            ([("organization", 1), ("project", 1), ("definition_id", 1), ("test", 1)], {"unique": True}),
+            ([("organization", 1), ("project", 1), ("flakiness", -1)], {}),
+            ([("organization", 1), ("project", 1), ("recent_failures", -1)], {}),
+        ],
+        "build_sync": [
+            ([("organization", 1), ("project_name", 1)], {"unique": True}),
+            ([("organization", 1), ("project_id", 1)], {}),
+        ],
+    }
+
+
+def ensure_unique_indexes(db: Database) -> list[str]:
+    """Create the unique indexes that compare-and-set writes rely on; idempotent.
+
+    Cursor inserts and upserts (DORA, pushes, pull requests, test histories) treat a duplicate
+    key as a lost race, which only holds once these exist.
+    """
+    created = []
+    for collection, indexes in index_plan().items():
+        for keys, options in indexes:
+            if options.get("unique"):
+                created.append(f"{collection}.{db[collection].create_index(keys, **options)}")
+    return created
+
+
+def ensure_indexes(db: Database) -> list[str]:
+    created = []
+    for collection, indexes in index_plan().items():
+        for keys, options in indexes:
+            created.append(f"{collection}.{db[collection].create_index(keys, **options)}")
+    return created
+
+
+def main() -> None:
+    db = get_database()
+    if db is None:
+        raise SystemExit("MongoDB is not configured or unreachable; nothing to migrate.")
+    try:
+        for name in ensure_indexes(db):
+            print(f"ensured index {name}")
+        print(f"rolled up {BuildStore(RollupStore(), CapacityStore()).roll_up_pending()} stored builds")
+    finally:
+        close_database()
+
+
+if __name__ == "__main__":
+    main()
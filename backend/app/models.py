@@ -1,4 +1,6 @@
 from datetime import datetime
+from typing import Any
+
 from pydantic import BaseModel, Field
 
 
@@ -10,7 +12,11 @@ class ConnectRequest(BaseModel):
 class ConnectResponse(BaseModel):
     session_id: str
     organization: str
-    project_count: int
+    # Projects in the default organization when already known; validation itself lists none.
+    project_count: int | None = None
+    organizations: list[str] = Field(default_factory=list)
+    # Saved organizations whose credentials failed validation, with the reason.
+    failed_organizations: dict[str, str] = Field(default_factory=dict)
 
 
 class PipelineSummary(BaseModel):
@@ -37,6 +43,17 @@ class ErrorIntelligence(BaseModel):
     ai_summary: str | None = None
 
 
+class JobStatus(BaseModel):
+    id: str
+    kind: str
+    status: str
+    created_at: datetime
+    started_at: datetime | None = None
+    finished_at: datetime | None = None
+    result: Any = None
+    error: str | None = None
+
+
 class ResourceCreateRequest(BaseModel):
     project: str = Field(..., min_length=1)
     environment: str = Field(..., min_length=1)
@@ -108,6 +125,7 @@ class DevOpsCredentialInfo(BaseModel):
     organization: str | None = None
     has_pat: bool = False
     updated_at: datetime | None = None
+    organizations: list[str] = Field(default_factory=list)
 
 
 class DashboardResourceCreateRequest(BaseModel):
@@ -119,6 +137,14 @@ class DashboardResourceCreateRequest(BaseModel):
     notes: str | None = None
 
 
+class ResourceHealth(BaseModel):
+    status: str
+    http_status: int | None = None
+    latency_ms: float | None = None
+    error: str | None = None
+    checked_at: datetime
+
+
 class DashboardResourceItem(BaseModel):
     id: str
     dashboard_id: str
@@ -130,6 +156,7 @@ class DashboardResourceItem(BaseModel):
     resource_type: str | None = None
     notes: str | None = None
     created_at: datetime
+    health: ResourceHealth | None = None
 
 
 class DashboardResourceUpdateRequest(BaseModel):
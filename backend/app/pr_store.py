@@ -0,0 +1,286 @@
+from __future__ import annotations
+
+import threading
+from collections import Counter
+from datetime import datetime
+from typing import Any
+
+from .azure_devops import parse_ado_time
+from .db import get_database
+from .profiling import timed_methods
+from .rollup_store import sketch_bucket, sketch_quantile
+
+NO_TEAM = "unassigned"
+SYSTEM_AUTHOR = "Microsoft.VisualStudio.Services.TFS"
+# Cycle-time stages kept per weekly row: created -> first review -> completed.
+STAGES = ("cycle", "first_review", "review_to_merge")
+
+
+def week_key(moment: datetime) -> str:
+    year, week, _ = moment.isocalendar()
+    return f"{year}-W{week:02d}"
+
+
+def first_review_at(pull_request: dict[str, Any], threads: list[dict[str, Any]]) -> datetime | None:
+    """Earliest vote or human comment by someone other than the author."""
+    author_id = (pull_request.get("createdBy") or {}).get("id")
+    moments = []
+    for thread in threads:
+        properties = thread.get("properties") or {}
+        kind = (properties.get("CodeReviewThreadType") or {}).get("$value")
+        comment = (thread.get("comments") or [{}])[0]
+        commenter = comment.get("author") or {}
+        if kind == "VoteUpdate":
+            voter = (properties.get("CodeReviewVotedByIdentity") or {}).get("$value")
+            if voter != author_id:
+                moments.append(thread.get("publishedDate"))
+        elif comment.get("commentType") != "system" and commenter.get("uniqueName") != SYSTEM_AUTHOR:
+            if commenter.get("id") and commenter["id"] != author_id:
+                moments.append(comment.get("publishedDate") or thread.get("publishedDate"))
+    parsed = [m for m in (parse_ado_time(value) for value in moments) if m]
+    return min(parsed) if parsed else None
+
+
+def compact_pull_request(pull_request: dict[str, Any], threads: list[dict[str, Any]]) -> dict[str, Any] | None:
+    created = parse_ado_time(pull_request.get("creationDate"))
+    closed = parse_ado_time(pull_request.get("closedDate"))
+    if not created or not closed:
+        return None
+    reviewed = first_review_at(pull_request, threads)
+    # Reviewer groups (e.g. "[Project]\\Team") stand in for the owning teams.
+    teams = sorted(
+        {
+            reviewer["displayName"].rsplit("\\", 1)[-1]
+            for reviewer in pull_request.get("reviewers") or []
+            if reviewer.get("isContainer") and reviewer.get("displayName")
+        }
+    )
+    return {
+        "id": pull_request["pullRequestId"],
+        "author": ((pull_request.get("createdBy") or {}).get("uniqueName") or "").lower() or None,
+        "target": pull_request.get("targetRefName"),
+        "teams": teams or [NO_TEAM],
+        "created": created,
+        "first_review": reviewed if reviewed and reviewed <= closed else None,
+        "closed": closed,
+    }
+
+
+@timed_methods("store")
+class PullRequestStore:
+    """Completed pull requests per repository in compact form, plus weekly cycle-time aggregates.
+
+    A pull request is counted into the repository and team rows of its completion week the
+    first time it is stored, so re-reading an overlapping page never counts it twice.
+    """
+
+    def __init__(self) -> None:
+        self._prs_mem: dict[tuple[str, str, str, int], dict[str, Any]] = {}
+        self._weekly_mem: dict[tuple[str, str, str, str, str, str], dict[str, Any]] = {}
+        self._cursors_mem: dict[tuple[str, str, str], dict[str, Any]] = {}
+        self._prs_ref = None
+        self._weekly_ref = None
+        self._cursors_ref = None
+        self._ready = False
+        self._ready_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+
+    def ensure_ready(self) -> None:
+        if self._ready:
+            return
+        with self._ready_lock:
+            if self._ready:
+                return
+            db = get_database()
+            if db is not None:
+                self._prs_ref = db["pull_requests"]
+                self._weekly_ref = db["pr_weekly"]
+                self._cursors_ref = db["pr_cursors"]
+            self._ready = True
+
+    @property
+    def _prs_collection(self):
+        self.ensure_ready()
+        return self._prs_ref
+
+    @property
+    def _weekly_collection(self):
+        self.ensure_ready()
+        return self._weekly_ref
+
+    @property
+    def _cursors_collection(self):
+        self.ensure_ready()
+        return self._cursors_ref
+
+    def _org(self, organization: str) -> str:
+        return organization.strip().lower()
+
+    def get_cursors(self, organization: str, project: str) -> dict[str, dict[str, Any]]:
+        org = self._org(organization)
+        if self._cursors_collection is not None:
+            rows = self._cursors_collection.find({"organization": org, "project": project}, {"_id": 0})
+            return {row["repository_id"]: row for row in rows}
+        return {
+            repo_id: cursor
+            for (c_org, c_project, repo_id), cursor in self._cursors_mem.items()
+            if c_org == org and c_project == project
+        }
+
+    def known_ids(self, organization: str, project: str, repository_id: str, ids: list[int]) -> set[int]:
+        org = self._org(organization)
+        if self._prs_collection is not None:
+            rows = self._prs_collection.find(
+                {"organization": org, "project": project, "repository_id": repository_id, "id": {"$in": ids}},
+                {"id": 1},
+            )
+            return {row["id"] for row in rows}
+        return {i for i in ids if (org, project, repository_id, i) in self._prs_mem}
+
+    def record_pull_requests(
+        self,
+        organization: str,
+        project: str,
+        repository_id: str,
+        repository_name: str,
+        pull_requests: list[dict[str, Any]],
+        closed_until: datetime,
+    ) -> int:
+        """Store compact pull requests, count new ones into the weekly rows and advance the cursor.
+
+        ``closed_until`` is the end of the listed window; the cursor only moves forward to it.
+        """
+        org = self._org(organization)
+        scope = {"organization": org, "project": project, "repository_id": repository_id}
+        docs = [{**scope, **pr} for pr in pull_requests]
+
+        if self._prs_collection is not None:
+            from pymongo import UpdateOne
+
+            inserted: list[dict[str, Any]] = []
+            if docs:
+                result = self._prs_collection.bulk_write(
+                    [UpdateOne({**scope, "id": doc["id"]}, {"$setOnInsert": doc}, upsert=True) for doc in docs],
+                    ordered=False,
+                )
+                # Only upserts that inserted count; pull requests already stored were counted before.
+                inserted = [docs[index] for index in result.upserted_ids]
+            increments = self._increments(inserted)
+            if increments:
+                self._weekly_collection.bulk_write(
+                    [
+                        UpdateOne(
+                            {**scope, "group": group, "name": name, "week": week},
+                            {"$inc": dict(counts), "$set": {"repository_name": repository_name}},
+                            upsert=True,
+                        )
+                        for (group, name, week), counts in increments.items()
+                    ],
+                    ordered=False,
+                )
+            self._cursors_collection.update_one(
+                scope,
+                {
+                    "$set": {"repository_name": repository_name, "synced_at": datetime.utcnow()},
+                    "$max": {"last_closed": closed_until},
+                },
+                upsert=True,
+            )
+            return len(inserted)
+
+        with self._write_lock:
+            inserted = []
+            for doc in docs:
+                key = (org, project, repository_id, doc["id"])
+                if key not in self._prs_mem:
+                    self._prs_mem[key] = doc
+                    inserted.append(doc)
+            for (group, name, week), counts in self._increments(inserted).items():
+                row = self._weekly_mem.setdefault(
+                    (org, project, repository_id, group, name, week),
+                    {**scope, "group": group, "name": name, "week": week},
+                )
+                row["repository_name"] = repository_name
+                for field, value in counts.items():
+                    if "." in field:
+                        stage, bucket = field.split(".", 1)
+                        row.setdefault(stage, {})
+                        row[stage][bucket] = row[stage].get(bucket, 0) + value
+                    else:
+                        row[field] = row.get(field, 0) + value
+            cursor = self._cursors_mem.setdefault((org, project, repository_id), dict(scope))
+            cursor["repository_name"] = repository_name
+            cursor["synced_at"] = datetime.utcnow()
+            cursor["last_closed"] = max(closed_until, cursor.get("last_closed") or datetime.min)
+        return len(inserted)
+
+    def _increments(self, docs: list[dict[str, Any]]) -> dict[tuple[str, str, str], Counter[str]]:
+        increments: dict[tuple[str, str, str], Counter[str]] = {}
+        for doc in docs:
+            reviewed = doc["first_review"]
+            durations = {
+                "cycle": (doc["closed"] - doc["created"]).total_seconds(),
+                "first_review": (reviewed - doc["created"]).total_seconds() if reviewed else None,
+                "review_to_merge": (doc["closed"] - reviewed).total_seconds() if reviewed else None,
+            }
+            week = week_key(doc["closed"])
+            # Repository rows carry the repository itself as the name; team rows one per team.
+            for group, name in [("repository", "")] + [("team", team) for team in doc["teams"]]:
+                counts = increments.setdefault((group, name, week), Counter())
+                counts["prs"] += 1
+                for stage, seconds in durations.items():
+                    if seconds is None:
+                        continue
+                    counts[f"{stage}_count"] += 1
+                    counts[f"{stage}_sum"] += max(0.0, seconds)
+                    counts[f"{stage}_sketch.{sketch_bucket(seconds)}"] += 1
+        return increments
+
+    def weekly(
+        self,
+        organization: str,
+        project: str,
+        group: str,
+        since_week: str,
+        repository_id: str | None = None,
+    ) -> list[dict[str, Any]]:
+        """Cycle-time percentiles per repository (``group="repository"``) or team, per week."""
+        org = self._org(organization)
+        query: dict[str, Any] = {"organization": org, "project": project, "group": group}
+        if repository_id:
+            query["repository_id"] = repository_id
+        if self._weekly_collection is not None:
+            rows = self._weekly_collection.find({**query, "week": {"$gte": since_week}}, {"_id": 0})
+        else:
+            rows = (
+                row
+                for row in self._weekly_mem.values()
+                if row["week"] >= since_week and all(row.get(field) == value for field, value in query.items())
+            )
+
+        merged: dict[tuple[str, str], dict[str, Any]] = {}
+        for row in rows:
+            # Teams span repositories, so their rows merge across repositories.
+            name = row["repository_name"] if group == "repository" else row["name"]
+            target = merged.setdefault(
+                (name, row["week"]), {"counts": Counter(), "sketches": {stage: Counter() for stage in STAGES}}
+            )
+            for field, value in row.items():
+                if isinstance(value, (int, float)) and field.endswith(("_count", "_sum", "prs")):
+                    target["counts"][field] += value
+            for stage in STAGES:
+                target["sketches"][stage].update(row.get(f"{stage}_sketch") or {})
+
+        result = []
+        for (name, week), target in sorted(merged.items(), key=lambda item: (item[0][0].lower(), item[0][1])):
+            counts = target["counts"]
+            stages = {}
+            for stage in STAGES:
+                count = counts[f"{stage}_count"]
+                stages[f"{stage}_seconds"] = {
+                    "avg": round(counts[f"{stage}_sum"] / count, 1) if count else None,
+                    "p50": sketch_quantile(target["sketches"][stage], 0.5),
+                    "p90": sketch_quantile(target["sketches"][stage], 0.9),
+                }
+            result.append({"name": name, "week": week, "pull_requests": counts["prs"], **stages})
+        return result
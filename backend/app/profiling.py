@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+import cProfile
+import functools
+import inspect
+import io
+import pstats
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Iterator
+from uuid import uuid4
+
+# Per-request timing buckets: category -> [total seconds, call count].
+_timings: ContextVar[dict[str, list] | None] = ContextVar("request_timings", default=None)
+_active: ContextVar[frozenset[str]] = ContextVar("active_timings", default=frozenset())
+
+TIMING_LABELS = {
+    "ado": "Azure DevOps",
+    "store": "Store",
+    "decrypt": "Decrypt",
+    "ai": "Azure OpenAI",
+    "serialize": "Serialize",
+    "queue": "Admission queue",
+}
+
+
+def start_request_timing() -> dict[str, list]:
+    timings: dict[str, list] = {}
+    _timings.set(timings)
+    return timings
+
+
+def record(category: str, elapsed: float) -> None:
+    timings = _timings.get()
+    if timings is None:
+        return
+    bucket = timings.setdefault(category, [0.0, 0])
+    bucket[0] += elapsed
+    bucket[1] += 1
+
+
+@contextmanager
+def timed(category: str) -> Iterator[None]:
+    active = _active.get()
+    # Store methods call each other; only the outermost call counts.
+    if category in active:
+        yield
+        return
+    token = _active.set(active | {category})
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(category, time.perf_counter() - started)
+        _active.reset(token)
+
+
+def timed_call(category: str) -> Callable:
+    def decorator(fn: Callable) -> Callable:
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args: Any, **kwargs: Any) -> Any:
+                with timed(category):
+                    return await fn(*args, **kwargs)
+
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            with timed(category):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def timed_methods(category: str) -> Callable[[type], type]:
+    """Class decorator timing every public method under ``category``."""
+
+    def decorator(cls: type) -> type:
+        for name, member in list(vars(cls).items()):
+            if not name.startswith("_") and inspect.isfunction(member):
+                setattr(cls, name, timed_call(category)(member))
+        return cls
+
+    return decorator
+
+
+def server_timing_header(timings: dict[str, list], total: float) -> str:
+    parts = []
+    for category, (elapsed, count) in timings.items():
+        label = TIMING_LABELS.get(category, category)
+        parts.append(f'{category};dur={elapsed * 1000:.1f};desc="{label} x{count}"')
+    parts.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(parts)
+
+
+class ProfileStore:
+    def __init__(self, max_profiles: int = 20):
+        self.max_profiles = max_profiles
+        self._profiles: OrderedDict[str, dict[str, Any]] = OrderedDict()
+
+    def add(self, profiler: cProfile.Profile, method: str, path: str, duration: float) -> str:
+        buffer = io.StringIO()
+        pstats.Stats(profiler, stream=buffer).sort_stats("cumulative").print_stats(40)
+        profile_id = uuid4().hex
+        self._profiles[profile_id] = {
+            "id": profile_id,
+            "method": method,
+            "path": path,
+            "duration_ms": round(duration * 1000, 1),
+            "stats": buffer.getvalue(),
+        }
+        while len(self._profiles) > self.max_profiles:
+            self._profiles.popitem(last=False)
+        return profile_id
+
+    def get(self, profile_id: str) -> dict[str, Any] | None:
+        return self._profiles.get(profile_id)
+
+    def list(self) -> list[dict[str, Any]]:
+        return [{k: v for k, v in p.items() if k != "stats"} for p in reversed(self._profiles.values())]
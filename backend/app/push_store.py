@@ -0,0 +1,190 @@
+from __future__ import annotations
+
+import threading
+from collections import Counter
+from datetime import datetime
+from typing import Any
+
+from .db import get_database
+from .profiling import timed_methods
+
+
+@timed_methods("store")
+class PushStore:
+    """Per-day push counters by repository and author, plus a per-repository ingestion cursor."""
+
+    def __init__(self) -> None:
+        self._counts_mem: Counter[tuple[str, str, str, str, str]] = Counter()
+        self._repo_names_mem: dict[tuple[str, str, str], str] = {}
+        self._cursors_mem: dict[tuple[str, str, str], dict[str, Any]] = {}
+        self._sync_mem: dict[tuple[str, str], datetime] = {}
+        self._counts_ref = None
+        self._cursors_ref = None
+        self._ready = False
+        self._ready_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+
+    def ensure_ready(self) -> None:
+        if self._ready:
+            return
+        with self._ready_lock:
+            if self._ready:
+                return
+            db = get_database()
+            if db is not None:
+                self._counts_ref = db["push_counts"]
+                self._cursors_ref = db["push_cursors"]
+            self._ready = True
+
+    @property
+    def _counts_collection(self):
+        self.ensure_ready()
+        return self._counts_ref
+
+    @property
+    def _cursors_collection(self):
+        self.ensure_ready()
+        return self._cursors_ref
+
+    def _org(self, organization: str) -> str:
+        return organization.strip().lower()
+
+    def get_cursors(self, organization: str, project: str) -> dict[str, dict[str, Any]]:
+        org = self._org(organization)
+        if self._cursors_collection is not None:
+            rows = self._cursors_collection.find({"organization": org, "project": project}, {"_id": 0})
+            return {row["repository_id"]: row for row in rows if row.get("repository_id")}
+        return {
+            repo_id: cursor
+            for (c_org, c_project, repo_id), cursor in self._cursors_mem.items()
+            if c_org == org and c_project == project
+        }
+
+    def record_pushes(
+        self,
+        organization: str,
+        project: str,
+        repository_id: str,
+        repository_name: str,
+        pushes: list[dict[str, Any]],
+        previous_push_id: int | None,
+    ) -> int:
+        """Add pushes newer than ``previous_push_id`` to the counters and advance the cursor.
+
+        The cursor moves with a compare-and-set on ``previous_push_id``, so a concurrent ingester
+        that already advanced it wins and these pushes are not counted twice.
+        """
+        org = self._org(organization)
+        fresh = [p for p in pushes if p.get("pushId") and (previous_push_id is None or p["pushId"] > previous_push_id)]
+        if not fresh:
+            return 0
+
+        latest = max(fresh, key=lambda p: p["pushId"])
+        cursor = {
+            "organization": org,
+            "project": project,
+            "repository_id": repository_id,
+            "repository_name": repository_name,
+            "last_push_id": latest["pushId"],
+            "last_push_date": latest.get("date"),
+            "updated_at": datetime.utcnow(),
+        }
+        counts: Counter[tuple[str, str]] = Counter()
+        for push in fresh:
+            day = (push.get("date") or "")[:10]
+            author = (push.get("pushedBy") or {}).get("uniqueName") or "unknown"
+            if day:
+                counts[(day, author.lower())] += 1
+
+        if self._counts_collection is not None:
+            from pymongo import UpdateOne
+            from pymongo.errors import DuplicateKeyError
+
+            if previous_push_id is None:
+                try:
+                    self._cursors_collection.insert_one(cursor)
+                except DuplicateKeyError:
+                    return 0
+            else:
+                result = self._cursors_collection.update_one(
+                    {"organization": org, "project": project, "repository_id": repository_id, "last_push_id": previous_push_id},
+                    {"$set": cursor},
+                )
+                if result.modified_count == 0:
+                    return 0
+            self._counts_collection.bulk_write(
+                [
+                    UpdateOne(
+                        {"organization": org, "project": project, "repository_id": repository_id, "day": day, "author": author},
+                        {"$inc": {"pushes": count}, "$set": {"repository_name": repository_name}},
+                        upsert=True,
+                    )
+                    for (day, author), count in counts.items()
+                ],
+                ordered=False,
+            )
+            return len(fresh)
+
+        with self._write_lock:
+            key = (org, project, repository_id)
+            if (self._cursors_mem.get(key) or {}).get("last_push_id") != previous_push_id:
+                return 0
+            self._cursors_mem[key] = cursor
+            self._repo_names_mem[key] = repository_name
+            for (day, author), count in counts.items():
+                self._counts_mem[(org, project, repository_id, day, author)] += count
+        return len(fresh)
+
+    def aggregate(self, organization: str, project: str, since_day: str | None = None) -> dict[str, dict[str, int]]:
+        org = self._org(organization)
+        by_day: Counter[str] = Counter()
+        by_author: Counter[str] = Counter()
+        by_repository: Counter[str] = Counter()
+
+        if self._counts_collection is not None:
+            query: dict[str, Any] = {"organization": org, "project": project}
+            if since_day:
+                query["day"] = {"$gte": since_day}
+            rows = (
+                (row["day"], row["author"], row.get("repository_name") or row["repository_id"], row["pushes"])
+                for row in self._counts_collection.find(query, {"_id": 0})
+            )
+        else:
+            rows = (
+                (day, author, self._repo_names_mem.get((c_org, c_project, repo_id), repo_id), count)
+                for (c_org, c_project, repo_id, day, author), count in self._counts_mem.items()
+                if c_org == org and c_project == project and (not since_day or day >= since_day)
+            )
+
+        for day, author, repository, count in rows:
+            by_day[day] += count
+            by_author[author] += count
+            by_repository[repository] += count
+
+        return {
+            "by_day": dict(sorted(by_day.items())),
+            "by_author": dict(by_author.most_common()),
+            "by_repository": dict(by_repository.most_common()),
+        }
+
+    def synced_at(self, organization: str, project: str) -> datetime | None:
+        org = self._org(organization)
+        if self._cursors_collection is not None:
+            row = self._cursors_collection.find_one(
+                {"organization": org, "project": project, "repository_id": None}, {"synced_at": 1}
+            )
+            return (row or {}).get("synced_at")
+        return self._sync_mem.get((org, project))
+
+    def mark_synced(self, organization: str, project: str) -> None:
+        org = self._org(organization)
+        now = datetime.utcnow()
+        if self._cursors_collection is not None:
+            # The project-level marker shares the cursor collection with repository_id None.
+            self._cursors_collection.update_one(
+                {"organization": org, "project": project, "repository_id": None},
+                {"$set": {"synced_at": now}},
+                upsert=True,
+            )
+            return
+        self._sync_mem[(org, project)] = now
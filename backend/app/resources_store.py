@@ -1,34 +1,43 @@
 from __future__ import annotations
 
+import threading
 from datetime import datetime
 from typing import Any
 
-from pymongo import MongoClient
-from pymongo.errors import PyMongoError
-
 from .config import settings
+from .db import get_database
+from .profiling import timed_methods
+from .revisions import RevisionStore
 
 
+@timed_methods("store")
 class ResourceStore:
-    def __init__(self) -> None:
+    def __init__(self, revisions: RevisionStore | None = None) -> None:
+        self.revisions = revisions
         self._memory_resources: list[dict[str, Any]] = []
-        self._collection = None
+        self._collection_ref = None
+        self._ready = False
+        self._ready_lock = threading.Lock()
 
-        if not settings.mongodb_uri:
+    def ensure_ready(self) -> None:
+        if self._ready:
             return
-
-        try:
-            client = MongoClient(settings.mongodb_uri, serverSelectionTimeoutMS=1500)
-            db = client[settings.mongodb_database]
-            self._collection = db[settings.mongodb_collection]
-            self._collection.create_index(
-                [("organization", 1), ("project", 1), ("environment", 1), ("name", 1)]
-            )
-            self._collection.create_index(
-                [("owner_email", 1), ("dashboard_id", 1), ("project", 1), ("environment", 1), ("name", 1)]
-            )
-        except PyMongoError:
-            self._collection = None
+        with self._ready_lock:
+            if self._ready:
+                return
+            db = get_database()
+            if db is not None:
+                self._collection_ref = db[settings.mongodb_collection]
+            self._ready = True
+
+    @property
+    def _collection(self):
+        self.ensure_ready()
+        return self._collection_ref
+
+    def _touch(self, resource: dict[str, Any]) -> None:
+        if self.revisions is not None and resource.get("dashboard_id"):
+            self.revisions.bump(f"dashboard:{resource['dashboard_id']}")
 
     def add_resource(self, resource: dict[str, Any]) -> dict[str, Any]:
         payload = {**resource, "created_at": datetime.utcnow()}
@@ -36,10 +45,10 @@ class ResourceStore:
         if self._collection is not None:
             result = self._collection.insert_one(payload)
             payload["id"] = str(result.inserted_id)
-            return payload
-
-        payload["id"] = f"mem-{len(self._memory_resources) + 1}"
-        self._memory_resources.append(payload)
+        else:
+            payload["id"] = f"mem-{len(self._memory_resources) + 1}"
+            self._memory_resources.append(payload)
+        self._touch(payload)
         return payload
 
     def list_resources(
@@ -114,10 +123,12 @@ class ResourceStore:
             if not row:
                 return None
             row["id"] = str(row.pop("_id"))
+            self._touch(row)
             return row
 
         for row in self._memory_resources:
             if row.get("id") == resource_id:
                 row.update(payload)
+                self._touch(row)
                 return row
         return None
@@ -0,0 +1,140 @@
+from __future__ import annotations
+
+import hashlib
+import json
+from collections.abc import Awaitable, Callable
+from datetime import date, datetime
+from typing import Any
+
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi import Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel
+from pydantic.fields import FieldInfo
+from pydantic_core import PydanticUndefined
+from starlette.types import Receive, Scope, Send
+
+from .config import settings
+from .profiling import timed
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is optional
+    orjson = None
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    return str(value)
+
+
+def dumps(content: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, default=_default, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+class ReleasingStreamingResponse(StreamingResponse):
+    """Streaming response that calls ``release`` once the body has been sent or abandoned.
+
+    Yield dependencies exit before a streaming body runs, so resources the body needs (e.g.
+    an admission slot) are handed to the response instead.
+    """
+
+    def __init__(self, content: Any, release: Callable[[], Awaitable[Any]], **kwargs: Any) -> None:
+        super().__init__(content, **kwargs)
+        self.release = release
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            await self.release()
+
+
+class TimedJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        with timed("serialize"):
+            return super().render(content)
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        with timed("serialize"):
+            return dumps(content)
+
+
+def fast_json(content: Any) -> Any:
+    # Returning a Response directly skips FastAPI's jsonable_encoder pass over upstream payloads.
+    if settings.fast_json_responses:
+        return FastJSONResponse(content)
+    return content
+
+
+def _project(fields: dict[str, FieldInfo], row: dict[str, Any]) -> dict[str, Any]:
+    # Missing keys get the model default (e.g. ``[]`` or ``False``), as validation would give them.
+    return {name: row[name] if name in row else _field_default(field) for name, field in fields.items()}
+
+
+def _field_default(field: FieldInfo) -> Any:
+    value = field.get_default(call_default_factory=True)
+    return None if value is PydanticUndefined else value
+
+
+def project_rows(model: type[BaseModel], rows: list[dict[str, Any]]) -> list[dict[str, Any]]:
+    fields = model.model_fields
+    return [_project(fields, row) for row in rows]
+
+
+def model_rows(model: type[BaseModel], rows: list[dict[str, Any]]) -> Any:
+    # Store rows are already shaped by our own writes, so the fast path only projects
+    # them onto the model's fields instead of building and re-validating a model per row.
+    if settings.fast_json_responses:
+        return FastJSONResponse(project_rows(model, rows))
+    return [model(**row) for row in rows]
+
+
+def model_row(model: type[BaseModel], row: dict[str, Any]) -> Any:
+    if settings.fast_json_responses:
+        return FastJSONResponse(_project(model.model_fields, row))
+    return model(**row)
+
+
+def etag_for(*versions: Any) -> str:
+    digest = hashlib.blake2b("\x1f".join(map(str, versions)).encode("utf-8"), digest_size=12).hexdigest()
+    return f'"{digest}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = {tag.strip().removeprefix("W/") for tag in header.split(",")}
+    return "*" in candidates or etag in candidates
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "private, no-cache"})
+
+
+def with_etag(result: Any, response: Response, etag: str) -> Any:
+    # Endpoints on the fast path return a Response directly, which FastAPI does not merge
+    # the injected response's headers into.
+    target = result if isinstance(result, Response) else response
+    target.headers["ETag"] = etag
+    target.headers["Cache-Control"] = "private, no-cache"
+    return result
+
+
+class EventStreamAwareGZipMiddleware(GZipMiddleware):
+    # Gzip buffers small writes, which would hold back server-sent event tokens.
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "http":
+            accept = dict(scope.get("headers") or []).get(b"accept", b"")
+            if b"text/event-stream" in accept:
+                await self.app(scope, receive, send)
+                return
+        await super().__call__(scope, receive, send)
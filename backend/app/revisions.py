@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+import threading
+
+from .db import get_database
+from .profiling import timed_methods
+
+
+@timed_methods("store")
+class RevisionStore:
+    """Monotonic revision counters per scope (e.g. ``dashboard:<id>``), bumped on every write.
+
+    Reading one is a single ``_id`` lookup, which is what lets conditional GETs answer 304
+    without querying or serializing the data behind them.
+    """
+
+    def __init__(self) -> None:
+        self._revisions_mem: dict[str, int] = {}
+        self._revisions_ref = None
+        self._ready = False
+        self._ready_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+
+    def ensure_ready(self) -> None:
+        if self._ready:
+            return
+        with self._ready_lock:
+            if self._ready:
+                return
+            db = get_database()
+            if db is not None:
+                self._revisions_ref = db["revisions"]
+            self._ready = True
+
+    @property
+    def _revisions_collection(self):
+        self.ensure_ready()
+        return self._revisions_ref
+
+    def get(self, scope: str) -> int:
+        if self._revisions_collection is not None:
+            row = self._revisions_collection.find_one({"_id": scope}, {"revision": 1})
+            return int((row or {}).get("revision") or 0)
+        return self._revisions_mem.get(scope, 0)
+
+    def bump(self, scope: str) -> int:
+        if self._revisions_collection is not None:
+            from pymongo import ReturnDocument
+
+            row = self._revisions_collection.find_one_and_update(
+                {"_id": scope},
+                {"$inc": {"revision": 1}},
+                upsert=True,
+                return_document=ReturnDocument.AFTER,
+            )
+            return int(row["revision"])
+        with self._write_lock:
+            self._revisions_mem[scope] = self._revisions_mem.get(scope, 0) + 1
+            return self._revisions_mem[scope]
@@ -0,0 +1,291 @@
+from __future__ import annotations
+
+import math
+import threading
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Any
+
+from .azure_devops import parse_ado_time
+from .db import get_database
+from .profiling import timed_methods
+
+GRANULARITIES = ("hour", "day")
+
+# Durations go into log-spaced buckets (~11% relative error), so sketches from any number of
+# rollup rows merge by adding bucket counts.
+SKETCH_GAMMA = 1.25
+
+
+def sketch_bucket(seconds: float) -> int:
+    return max(0, math.ceil(math.log(max(seconds, 1.0), SKETCH_GAMMA)))
+
+
+def sketch_quantile(sketch: dict[str, int], q: float) -> float | None:
+    total = sum(sketch.values())
+    if not total:
+        return None
+    rank = q * (total - 1)
+    seen = 0
+    for bucket, count in sorted(((int(k), v) for k, v in sketch.items())):
+        seen += count
+        if seen > rank:
+            # Midpoint of the bucket (gamma^(i-1), gamma^i].
+            return round(SKETCH_GAMMA ** bucket * 2 / (1 + SKETCH_GAMMA), 1)
+    return None
+
+
+def bucket_key(moment: datetime, granularity: str) -> str:
+    return moment.strftime("%Y-%m-%dT%H") if granularity == "hour" else moment.strftime("%Y-%m-%d")
+
+
+def build_contribution(build: dict[str, Any]) -> dict[str, Any] | None:
+    queued = parse_ado_time(build.get("queueTime"))
+    if not queued:
+        return None
+    started = parse_ado_time(build.get("startTime"))
+    finished = parse_ado_time(build.get("finishTime"))
+    duration = (finished - started).total_seconds() if started and finished and finished >= started else None
+    definition = build.get("definition") or {}
+    return {
+        "queued": queued,
+        "definition_id": definition.get("id"),
+        "definition_name": definition.get("name"),
+        "result": build.get("result") or "none",
+        "duration": duration,
+    }
+
+
+@timed_methods("store")
+class RollupStore:
+    """Hourly and daily build rollups per organization/project/definition.
+
+    Each row holds counts by result, a duration sum and a mergeable duration sketch, so range
+    queries sum a few hundred rows instead of scanning builds.
+    """
+
+    def __init__(self) -> None:
+        self._rows_mem: dict[tuple, dict[str, Any]] = {}
+        self._rollups_ref = None
+        self._ready = False
+        self._ready_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+
+    def ensure_ready(self) -> None:
+        if self._ready:
+            return
+        with self._ready_lock:
+            if self._ready:
+                return
+            db = get_database()
+            if db is not None:
+                self._rollups_ref = db["build_rollups"]
+            self._ready = True
+
+    @property
+    def _rollups_collection(self):
+        self.ensure_ready()
+        return self._rollups_ref
+
+    def add_builds(self, organization: str, project: str, builds: list[dict[str, Any]]) -> int:
+        """Fold completed builds into the rollups. Callers guarantee each build is added once."""
+        org = organization.strip().lower()
+        increments: dict[tuple, dict[str, Any]] = {}
+        for build in builds:
+            contribution = build_contribution(build)
+            if not contribution:
+                continue
+            for granularity in GRANULARITIES:
+                key = (org, project, contribution["definition_id"], granularity, bucket_key(contribution["queued"], granularity))
+                inc = increments.setdefault(
+                    key,
+                    {"definition_name": contribution["definition_name"], "counts": Counter(), "max": 0.0},
+                )
+                counts = inc["counts"]
+                counts["total"] += 1
+                counts[f"results.{contribution['result']}"] += 1
+                if contribution["duration"] is not None:
+                    counts["duration_count"] += 1
+                    counts["duration_sum"] += contribution["duration"]
+                    counts[f"sketch.{sketch_bucket(contribution['duration'])}"] += 1
+                    inc["max"] = max(inc["max"], contribution["duration"])
+
+        if not increments:
+            return 0
+
+        if self._rollups_collection is not None:
+            from pymongo import UpdateOne
+
+            self._rollups_collection.bulk_write(
+                [
+                    UpdateOne(
+                        {
+                            "organization": org,
+                            "project": project,
+                            "definition_id": definition_id,
+                            "granularity": granularity,
+                            "bucket": bucket,
+                        },
+                        {
+                            "$inc": dict(inc["counts"]),
+                            "$max": {"duration_max": inc["max"]},
+                            "$set": {"definition_name": inc["definition_name"]},
+                        },
+                        upsert=True,
+                    )
+                    for (_, _, definition_id, granularity, bucket), inc in increments.items()
+                ],
+                ordered=False,
+            )
+            return len(increments)
+
+        with self._write_lock:
+            for key, inc in increments.items():
+                row = self._rows_mem.setdefault(
+                    key,
+                    {
+                        "organization": key[0],
+                        "project": key[1],
+                        "definition_id": key[2],
+                        "granularity": key[3],
+                        "bucket": key[4],
+                        "duration_max": 0.0,
+                    },
+                )
+                row["definition_name"] = inc["definition_name"]
+                row["duration_max"] = max(row["duration_max"], inc["max"])
+                for field, value in inc["counts"].items():
+                    if "." in field:
+                        group, name = field.split(".", 1)
+                        row.setdefault(group, {})
+                        row[group][name] = row[group].get(name, 0) + value
+                    else:
+                        row[field] = row.get(field, 0) + value
+        return len(increments)
+
+    def list_rows(
+        self,
+        organization: str,
+        project: str,
+        granularity: str,
+        start_bucket: str,
+        end_bucket: str,
+        definition_id: int | None = None,
+    ) -> list[dict[str, Any]]:
+        org = organization.strip().lower()
+        if self._rollups_collection is not None:
+            query: dict[str, Any] = {
+                "organization": org,
+                "project": project,
+                "granularity": granularity,
+                "bucket": {"$gte": start_bucket, "$lte": end_bucket},
+            }
+            if definition_id is not None:
+                query["definition_id"] = definition_id
+            return list(self._rollups_collection.find(query, {"_id": 0}))
+
+        return [
+            row
+            for (r_org, r_project, r_definition, r_granularity, bucket), row in self._rows_mem.items()
+            if r_org == org
+            and r_project == project
+            and r_granularity == granularity
+            and start_bucket <= bucket <= end_bucket
+            and (definition_id is None or r_definition == definition_id)
+        ]
+
+    def summarize(
+        self,
+        organization: str,
+        project: str,
+        start: datetime,
+        end: datetime,
+        definition_id: int | None = None,
+        granularity: str | None = None,
+    ) -> dict[str, Any]:
+        """Totals, duration percentiles and a series for builds queued in ``[start, end]``.
+
+        Rollups resolve to whole hours: the range is widened to the hours containing ``start``
+        and ``end`` (reported as ``covered_from``/``covered_until``). Daily series read day rows
+        only for days fully inside that range and hour rows for the partial days at its edges.
+        """
+        if granularity not in GRANULARITIES:
+            granularity = "hour" if (end - start).total_seconds() <= 2 * 86400 else "day"
+        covered_from = start.replace(minute=0, second=0, microsecond=0)
+        covered_until = end.replace(minute=0, second=0, microsecond=0) + timedelta(hours=1)
+
+        def hour_rows(first: datetime, until: datetime) -> list[dict[str, Any]]:
+            if first >= until:
+                return []
+            last = until - timedelta(hours=1)
+            return self.list_rows(
+                organization, project, "hour", bucket_key(first, "hour"), bucket_key(last, "hour"), definition_id
+            )
+
+        if granularity == "hour":
+            rows = hour_rows(covered_from, covered_until)
+        else:
+            first_day = datetime.combine(covered_from.date(), datetime.min.time())
+            if first_day < covered_from:
+                first_day += timedelta(days=1)
+            until_day = datetime.combine(covered_until.date(), datetime.min.time())
+            if first_day < until_day:
+                last_day = until_day - timedelta(days=1)
+                rows = [
+                    *hour_rows(covered_from, first_day),
+                    *self.list_rows(
+                        organization,
+                        project,
+                        "day",
+                        bucket_key(first_day, "day"),
+                        bucket_key(last_day, "day"),
+                        definition_id,
+                    ),
+                    *hour_rows(until_day, covered_until),
+                ]
+            else:
+                rows = hour_rows(covered_from, covered_until)
+
+        results: Counter[str] = Counter()
+        sketch: Counter[str] = Counter()
+        by_definition: Counter[str] = Counter()
+        failures_by_definition: Counter[str] = Counter()
+        series: dict[str, Counter[str]] = {}
+        total = duration_count = 0
+        duration_sum = duration_max = 0.0
+        for row in rows:
+            row_results = row.get("results") or {}
+            total += row.get("total", 0)
+            results.update(row_results)
+            sketch.update(row.get("sketch") or {})
+            duration_count += row.get("duration_count", 0)
+            duration_sum += row.get("duration_sum", 0.0)
+            duration_max = max(duration_max, row.get("duration_max", 0.0))
+            name = row.get("definition_name") or str(row.get("definition_id"))
+            by_definition[name] += row.get("total", 0)
+            failures_by_definition[name] += row_results.get("failed", 0)
+            # Edge hour rows fold into their day's point in a daily series.
+            point = series.setdefault(row["bucket"] if granularity == "hour" else row["bucket"][:10], Counter())
+            point["total"] += row.get("total", 0)
+            point["failed"] += row_results.get("failed", 0)
+            point["succeeded"] += row_results.get("succeeded", 0)
+
+        return {
+            "granularity": granularity,
+            "covered_from": covered_from,
+            "covered_until": covered_until,
+            "rollup_rows": len(rows),
+            "total_runs": total,
+            "results": dict(results),
+            "success_rate": round(results["succeeded"] / total * 100, 2) if total else 0,
+            "duration_seconds": {
+                "avg": round(duration_sum / duration_count, 1) if duration_count else None,
+                "p50": sketch_quantile(sketch, 0.5),
+                "p90": sketch_quantile(sketch, 0.9),
+                "p95": sketch_quantile(sketch, 0.95),
+                "max": round(duration_max, 1) if duration_count else None,
+            },
+            "runs_by_definition": dict(by_definition.most_common()),
+            "failure_distribution": {k: v for k, v in failures_by_definition.most_common() if v},
+            "series": {bucket: dict(point) for bucket, point in sorted(series.items())},
+        }
@@ -1,5 +1,6 @@
 from cryptography.fernet import Fernet
 from .config import settings
+from .profiling import timed_call
 
 
 def _load_key() -> bytes:
@@ -18,5 +19,6 @@ def encrypt_secret(secret: str) -> str:
     return FERNET.encrypt(secret.encode("utf-8")).decode("utf-8")
 
 
+@timed_call("decrypt")
 def decrypt_secret(encrypted_secret: str) -> str:
     return FERNET.decrypt(encrypted_secret.encode("utf-8")).decode("utf-8")
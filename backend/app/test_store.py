@@ -0,0 +1,257 @@
+from __future__ import annotations
+
+import threading
+from typing import Any
+
+from .db import get_database
+from .profiling import timed_methods
+
+FAIL_OUTCOMES = {"Failed", "Timeout", "Aborted", "Error"}
+# Per-build outcome codes kept in a test's recent history.
+PASSED, FAILED, RERUN_PASSED = 0, 1, 2
+HISTORY_LENGTH = 30
+ERROR_MAX_CHARS = 300
+# Compare-and-set rounds before a build's test results are given up on, and Mongo's
+# duplicate key error code, which signals a lost round.
+WRITE_ATTEMPTS = 5
+DUPLICATE_KEY = 11000
+
+
+def build_outcomes(results: list[dict[str, Any]]) -> dict[str, tuple[int, str | None]]:
+    """Collapse one build's test results (possibly several runs) to one outcome per test."""
+    seen: dict[str, set[bool]] = {}
+    errors: dict[str, str | None] = {}
+    for result in results:
+        name = result.get("automatedTestName") or result.get("testCaseTitle")
+        outcome = result.get("outcome")
+        if not name or (outcome != "Passed" and outcome not in FAIL_OUTCOMES):
+            continue
+        failed = outcome in FAIL_OUTCOMES
+        seen.setdefault(name, set()).add(failed)
+        if failed and not errors.get(name):
+            errors[name] = (result.get("errorMessage") or "").strip()[:ERROR_MAX_CHARS] or None
+
+    outcomes = {}
+    for name, failures in seen.items():
+        # Failed and passed in the same build means a rerun of the test went green.
+        code = RERUN_PASSED if failures == {True, False} else FAILED if True in failures else PASSED
+        outcomes[name] = (code, errors.get(name))
+    return outcomes
+
+
+def flakiness_score(recent: list[list[Any]]) -> float:
+    """Share of pass/fail flips across recent builds, raised when one commit both passed and failed."""
+    failed = [outcome != PASSED for _, outcome, _ in recent]
+    if not any(failed):
+        return 0.0
+    flips = sum(a != b for a, b in zip(failed, failed[1:]))
+    score = flips / max(1, len(failed) - 1)
+
+    by_commit: dict[str, set[bool]] = {}
+    for _, outcome, commit in recent:
+        if commit:
+            by_commit.setdefault(commit, set()).add(outcome != PASSED)
+    if any(outcome == RERUN_PASSED for _, outcome, _ in recent) or any(len(v) == 2 for v in by_commit.values()):
+        score += 0.5
+    return round(min(score, 1.0), 3)
+
+
+@timed_methods("store")
+class TestResultStore:
+    """Per-test outcome history per pipeline, kept for tests that have failed at least once.
+
+    Each document holds a short recent history plus precomputed flakiness and failure counts,
+    so flaky and top-failing lists are single indexed queries.
+    """
+
+    def __init__(self) -> None:
+        self._history_mem: dict[tuple[str, str, int, str], dict[str, Any]] = {}
+        self._history_ref = None
+        self._ready = False
+        self._ready_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+
+    def ensure_ready(self) -> None:
+        if self._ready:
+            return
+        with self._ready_lock:
+            if self._ready:
+                return
+            db = get_database()
+            if db is not None:
+                self._history_ref = db["test_history"]
+            self._ready = True
+
+    @property
+    def _history_collection(self):
+        self.ensure_ready()
+        return self._history_ref
+
+    def record_build(self, organization: str, project: str, build: dict[str, Any], results: list[dict[str, Any]]) -> int:
+        """Fold one build's test results in. Callers guarantee each build is recorded once.
+
+        Builds may arrive out of order: histories stay sorted by build id and the ``last_*``
+        fields only move forward. Each document is written with a compare-and-set on its
+        ``version``, and tests whose document changed concurrently are re-read and folded again.
+        """
+        org = organization.strip().lower()
+        definition = build.get("definition") or {}
+        definition_id = definition.get("id")
+        commit = (build.get("sourceVersion") or "")[:12] or None
+        pending = build_outcomes(results)
+        recorded = 0
+
+        for _ in range(WRITE_ATTEMPTS):
+            if not pending:
+                return recorded
+            with self._write_lock:
+                existing = self._load(org, project, definition_id, list(pending))
+                docs = []
+                for name, (outcome, error) in pending.items():
+                    doc = existing.get(name)
+                    if doc is None:
+                        if outcome == PASSED:
+                            # Tests that have never failed are not tracked.
+                            continue
+                        doc = {
+                            "organization": org,
+                            "project": project,
+                            "definition_id": definition_id,
+                            "test": name,
+                            "runs": 0,
+                            "failures": 0,
+                            "recent": [],
+                        }
+                    docs.append(self._fold(doc, definition, build, commit, outcome, error))
+                conflicts = self._save(docs)
+            recorded += len(docs) - len(conflicts)
+            pending = {name: pending[name] for name in conflicts}
+        if pending:
+            raise RuntimeError(f"Test history of {len(pending)} tests kept changing concurrently")
+        return recorded
+
+    @staticmethod
+    def _fold(
+        doc: dict[str, Any],
+        definition: dict[str, Any],
+        build: dict[str, Any],
+        commit: str | None,
+        outcome: int,
+        error: str | None,
+    ) -> dict[str, Any]:
+        build_id = build["id"]
+        doc["definition_name"] = definition.get("name")
+        doc["runs"] += 1
+        recent = sorted([*doc["recent"], [build_id, outcome, commit]], key=lambda entry: entry[0])
+        doc["recent"] = recent[-HISTORY_LENGTH:]
+        if build_id >= (doc.get("last_build_id") or 0):
+            doc["last_outcome"] = outcome
+            doc["last_build_id"] = build_id
+        if outcome != PASSED:
+            doc["failures"] += 1
+            if build_id >= (doc.get("last_failed_build_id") or 0):
+                doc["last_failed_build_id"] = build_id
+                doc["last_failed_at"] = build.get("finishTime")
+                doc["last_error"] = error or doc.get("last_error")
+        doc["recent_failures"] = sum(1 for _, o, _ in doc["recent"] if o != PASSED)
+        doc["flakiness"] = flakiness_score(doc["recent"])
+        return doc
+
+    def _load(self, org: str, project: str, definition_id: int | None, names: list[str]) -> dict[str, dict[str, Any]]:
+        if self._history_collection is not None:
+            rows = self._history_collection.find(
+                {"organization": org, "project": project, "definition_id": definition_id, "test": {"$in": names}},
+                {"_id": 0},
+            )
+            return {row["test"]: row for row in rows}
+        return {
+            name: dict(self._history_mem[(org, project, definition_id, name)])
+            for name in names
+            if (org, project, definition_id, name) in self._history_mem
+        }
+
+    def _save(self, docs: list[dict[str, Any]]) -> list[str]:
+        """Write folded documents; returns the tests whose document changed since it was loaded."""
+        if not docs:
+            return []
+        if self._history_collection is not None:
+            from pymongo import ReplaceOne
+            from pymongo.errors import BulkWriteError
+
+            operations = []
+            for doc in docs:
+                version = doc.get("version")
+                key = {
+                    "organization": doc["organization"],
+                    "project": doc["project"],
+                    "definition_id": doc["definition_id"],
+                    "test": doc["test"],
+                }
+                # A stale version (or a document created meanwhile) misses the filter, and the
+                # upsert then collides with the unique key instead of overwriting.
+                operations.append(
+                    ReplaceOne(
+                        {**key, "version": version if version is not None else {"$exists": False}},
+                        {**doc, "version": (version or 0) + 1},
+                        upsert=True,
+                    )
+                )
+            try:
+                self._history_collection.bulk_write(operations, ordered=False)
+            except BulkWriteError as ex:
+                errors = ex.details.get("writeErrors") or []
+                if any(error.get("code") != DUPLICATE_KEY for error in errors):
+                    raise
+                return [docs[error["index"]]["test"] for error in errors]
+            return []
+        for doc in docs:
+            doc["version"] = (doc.get("version") or 0) + 1
+            self._history_mem[(doc["organization"], doc["project"], doc["definition_id"], doc["test"])] = doc
+        return []
+
+    def _top(
+        self,
+        organization: str,
+        project: str,
+        field: str,
+        definition_id: int | None,
+        limit: int,
+    ) -> list[dict[str, Any]]:
+        org = organization.strip().lower()
+        if self._history_collection is not None:
+            query: dict[str, Any] = {"organization": org, "project": project, field: {"$gt": 0}}
+            if definition_id is not None:
+                query["definition_id"] = definition_id
+            cursor = self._history_collection.find(query, {"_id": 0, "recent": 0, "version": 0}).sort(
+                [(field, -1), ("last_failed_build_id", -1)]
+            )
+            return list(cursor.limit(limit))
+
+        rows = [
+            {k: v for k, v in doc.items() if k not in ("recent", "version")}
+            for (d_org, d_project, d_definition, _), doc in self._history_mem.items()
+            if d_org == org
+            and d_project == project
+            and (definition_id is None or d_definition == definition_id)
+            and doc.get(field, 0) > 0
+        ]
+        rows.sort(key=lambda d: (d[field], d.get("last_failed_build_id") or 0), reverse=True)
+        return rows[:limit]
+
+    def flaky_tests(
+        self,
+        organization: str,
+        project: str,
+        definition_id: int | None = None,
+        limit: int = 20,
+    ) -> list[dict[str, Any]]:
+        return self._top(organization, project, "flakiness", definition_id, limit)
+
+    def top_failing_tests(
+        self,
+        organization: str,
+        project: str,
+        definition_id: int | None = None,
+        limit: int = 20,
+    ) -> list[dict[str, Any]]:
+        return self._top(organization, project, "recent_failures", definition_id, limit)
@@ -1,36 +1,54 @@
 from __future__ import annotations
 
+import threading
 from datetime import datetime
 from typing import Any
 
-from pymongo import MongoClient
-from pymongo.errors import PyMongoError
-
 from .auth import hash_password, verify_password
-from .config import settings
+from .db import get_database
+from .profiling import timed_methods
+from .revisions import RevisionStore
 
 
+@timed_methods("store")
 class UserStore:
-    def __init__(self) -> None:
+    def __init__(self, revisions: RevisionStore | None = None) -> None:
+        self.revisions = revisions
         self._users_mem: list[dict[str, Any]] = []
         self._dashboards_mem: list[dict[str, Any]] = []
-        self._users_collection = None
-        self._dashboards_collection = None
-
-        if settings.mongodb_uri:
+        self._users_ref = None
+        self._dashboards_ref = None
+        self._ready = False
+        self._initializing = False
+        self._ready_lock = threading.RLock()
+
+    def ensure_ready(self) -> None:
+        if self._ready:
+            return
+        with self._ready_lock:
+            # Creating the default admin goes through the public methods again on this thread.
+            if self._ready or self._initializing:
+                return
+            self._initializing = True
             try:
-                client = MongoClient(settings.mongodb_uri, serverSelectionTimeoutMS=1500)
-                db = client[settings.mongodb_database]
-                self._users_collection = db["users"]
-                self._dashboards_collection = db["dashboards"]
-                self._users_collection.create_index("email", unique=True)
-                self._users_collection.create_index("username", unique=True)
-                self._dashboards_collection.create_index("name")
-            except PyMongoError:
-                self._users_collection = None
-                self._dashboards_collection = None
-
-        self._ensure_default_admin()
+                db = get_database()
+                if db is not None:
+                    self._users_ref = db["users"]
+                    self._dashboards_ref = db["dashboards"]
+                self._ensure_default_admin()
+                self._ready = True
+            finally:
+                self._initializing = False
+
+    @property
+    def _users_collection(self):
+        self.ensure_ready()
+        return self._users_ref
+
+    @property
+    def _dashboards_collection(self):
+        self.ensure_ready()
+        return self._dashboards_ref
 
     def _ensure_default_admin(self) -> None:
         if self.find_user("admin@gmail.com"):
@@ -131,10 +149,11 @@ class UserStore:
         if self._dashboards_collection is not None:
             result = self._dashboards_collection.insert_one(payload)
             payload["id"] = str(result.inserted_id)
-            return payload
-
-        payload["id"] = f"dashboard-{len(self._dashboards_mem) + 1}"
-        self._dashboards_mem.append(payload)
+        else:
+            payload["id"] = f"dashboard-{len(self._dashboards_mem) + 1}"
+            self._dashboards_mem.append(payload)
+        if self.revisions is not None:
+            self.revisions.bump("dashboards")
         return payload
 
     def list_dashboards(self) -> list[dict[str, Any]]:
@@ -168,19 +187,32 @@ class UserStore:
         return None
 
 
-    def set_devops_credentials(self, email: str, organization: str, encrypted_pat: str) -> dict[str, Any] | None:
-        email_n = self._normalize(email)
-        now = datetime.utcnow()
+    def _credential_list(self, user: dict[str, Any]) -> list[dict[str, Any]]:
+        if user.get("devops_credentials") is not None:
+            return list(user["devops_credentials"])
+        # Users saved before multi-organization support only have the single legacy pair.
+        if user.get("devops_org") and user.get("devops_pat_encrypted"):
+            return [
+                {
+                    "organization": user["devops_org"],
+                    "encrypted_pat": user["devops_pat_encrypted"],
+                    "updated_at": user.get("devops_updated_at"),
+                }
+            ]
+        return []
+
+    def _save_credentials(self, email_n: str, credentials: list[dict[str, Any]]) -> dict[str, Any] | None:
+        # The legacy fields mirror the most recently saved organization for older readers.
+        latest = credentials[-1] if credentials else {}
+        fields = {
+            "devops_credentials": credentials,
+            "devops_org": latest.get("organization"),
+            "devops_pat_encrypted": latest.get("encrypted_pat"),
+            "devops_updated_at": latest.get("updated_at"),
+        }
 
         if self._users_collection is not None:
-            self._users_collection.update_one(
-                {"email": email_n},
-                {"$set": {
-                    "devops_org": organization.strip(),
-                    "devops_pat_encrypted": encrypted_pat,
-                    "devops_updated_at": now,
-                }},
-            )
+            self._users_collection.update_one({"email": email_n}, {"$set": fields})
             row = self._users_collection.find_one({"email": email_n})
             if not row:
                 return None
@@ -189,12 +221,33 @@ class UserStore:
 
         for user in self._users_mem:
             if user["email"] == email_n:
-                user["devops_org"] = organization.strip()
-                user["devops_pat_encrypted"] = encrypted_pat
-                user["devops_updated_at"] = now
+                user.update(fields)
                 return user
         return None
 
+    def set_devops_credentials(self, email: str, organization: str, encrypted_pat: str) -> dict[str, Any] | None:
+        email_n = self._normalize(email)
+        user = self.find_user(email_n)
+        if not user:
+            return None
+        org = organization.strip()
+        credentials = [c for c in self._credential_list(user) if c["organization"].lower() != org.lower()]
+        credentials.append({"organization": org, "encrypted_pat": encrypted_pat, "updated_at": datetime.utcnow()})
+        return self._save_credentials(email_n, credentials)
+
+    def remove_devops_credentials(self, email: str, organization: str) -> dict[str, Any] | None:
+        email_n = self._normalize(email)
+        user = self.find_user(email_n)
+        if not user:
+            return None
+        org = organization.strip().lower()
+        credentials = [c for c in self._credential_list(user) if c["organization"].lower() != org]
+        return self._save_credentials(email_n, credentials)
+
+    def list_devops_credentials(self, email: str) -> list[dict[str, Any]]:
+        user = self.find_user(self._normalize(email))
+        return self._credential_list(user) if user else []
+
     def get_devops_credentials(self, email: str) -> dict[str, Any] | None:
         email_n = self._normalize(email)
         user = self.find_user(email_n)
@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+import base64
+import hmac
+from typing import Any
+from urllib.parse import urlparse
+
+BUILD_COMPLETE_EVENT = "build.complete"
+RUN_STATE_CHANGED_EVENT = "ms.vss-pipelines.run-state-changed-event"
+
+
+def verify_service_hook_secret(secret: str, authorization: str | None, header_secret: str | None) -> bool:
+    """Accept the secret either as the basic-auth password or as an ``X-Webhook-Secret`` header.
+
+    Azure DevOps service hook subscriptions support both (basic auth or custom HTTP headers).
+    """
+    if not secret:
+        return False
+    if header_secret and hmac.compare_digest(header_secret, secret):
+        return True
+    if authorization and authorization.lower().startswith("basic "):
+        try:
+            decoded = base64.b64decode(authorization[6:]).decode("utf-8")
+        except (ValueError, UnicodeDecodeError):
+            return False
+        _, _, password = decoded.partition(":")
+        return hmac.compare_digest(password, secret)
+    return False
+
+
+def _organization_from_containers(payload: dict[str, Any]) -> str | None:
+    containers = payload.get("resourceContainers") or {}
+    for name in ("account", "collection"):
+        base_url = (containers.get(name) or {}).get("baseUrl")
+        if base_url:
+            parsed = urlparse(base_url)
+            if parsed.hostname == "dev.azure.com":
+                parts = [p for p in parsed.path.split("/") if p]
+                if parts:
+                    return parts[0]
+            elif parsed.hostname and parsed.hostname.endswith(".visualstudio.com"):
+                return parsed.hostname.split(".", 1)[0]
+    return None
+
+
+def parse_service_hook(payload: dict[str, Any]) -> dict[str, Any] | None:
+    """Normalize a build/run service hook into an upstream-shaped build record.
+
+    Returns ``None`` for event types we do not ingest.
+    """
+    event_type = payload.get("eventType")
+    resource = payload.get("resource") or {}
+    organization = _organization_from_containers(payload)
+    project_id = ((payload.get("resourceContainers") or {}).get("project") or {}).get("id")
+
+    if event_type == BUILD_COMPLETE_EVENT:
+        definition = resource.get("definition") or {}
+        project = resource.get("project") or definition.get("project") or {}
+        return {
+            "organization": organization,
+            "project": project.get("name"),
+            "project_id": project.get("id") or project_id,
+            "build": resource,
+        }
+
+    if event_type == RUN_STATE_CHANGED_EVENT:
+        run = resource.get("run") or {}
+        pipeline = resource.get("pipeline") or run.get("pipeline") or {}
+        build = {
+            "id": run.get("id"),
+            "buildNumber": run.get("name"),
+            # Pipeline runs use "state"; stored builds follow the build API's "status".
+            "status": run.get("state"),
+            "result": run.get("result"),
+            "queueTime": run.get("createdDate"),
+            "finishTime": run.get("finishedDate"),
+            "definition": {"id": pipeline.get("id"), "name": pipeline.get("name")},
+            "project": {"id": project_id},
+        }
+        return {"organization": organization, "project": None, "project_id": project_id, "build": build}
+
+    return None
@@ -0,0 +1,64 @@
+"""Compare default FastAPI serialization with the fast response path.
+
+Run from ``backend/``: ``python -m benchmarks.bench_responses [rows]``
+"""
+from __future__ import annotations
+
+import gzip
+import sys
+import time
+from datetime import datetime
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from app.models import DashboardResourceItem
+from app.responses import FastJSONResponse
+
+
+def _rows(count: int) -> list[dict]:
+    now = datetime.utcnow()
+    return [
+        {
+            "id": f"mem-{i}",
+            "dashboard_id": "dashboard-1",
+            "owner_email": "admin@gmail.com",
+            "project": f"project-{i % 25}",
+            "environment": ("dev", "stage", "prod")[i % 3],
+            "name": f"resource-{i}",
+            "url": f"https://service-{i}.example.com/health",
+            "resource_type": "web-app",
+            "notes": "Resource card used for serialization benchmarks.",
+            "created_at": now,
+        }
+        for i in range(count)
+    ]
+
+
+def _timed(label: str, fn, repeat: int = 5) -> bytes:
+    best = float("inf")
+    body = b""
+    for _ in range(repeat):
+        started = time.perf_counter()
+        body = fn()
+        best = min(best, time.perf_counter() - started)
+    print(f"{label:<28} {best * 1000:8.2f} ms  {len(body):>10,} bytes  {len(gzip.compress(body)):>10,} gzip")
+    return body
+
+
+def main(count: int) -> None:
+    rows = _rows(count)
+    fields = DashboardResourceItem.model_fields
+    print(f"{count:,} dashboard resource rows")
+    _timed(
+        "pydantic + jsonable_encoder",
+        lambda: JSONResponse(jsonable_encoder([DashboardResourceItem(**row) for row in rows])).body,
+    )
+    _timed(
+        "fast path (projection)",
+        lambda: FastJSONResponse([{name: row.get(name) for name in fields} for row in rows]).body,
+    )
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5000)
@@ -0,0 +1,44 @@
+"""Measure cold start of a fresh worker process: import, lifespan startup and first /health.
+
+Run from ``backend/``: ``python -m benchmarks.bench_startup [runs] [target_ms]``
+Set ``MONGODB_URI`` to an unreachable host to check startup does not wait on Mongo.
+"""
+from __future__ import annotations
+
+import json
+import statistics
+import subprocess
+import sys
+
+PROBE = """
+import json, time
+started = time.perf_counter()
+from app.main import app
+imported = time.perf_counter()
+from fastapi.testclient import TestClient
+with TestClient(app) as client:
+    client.get("/health").raise_for_status()
+    ready = time.perf_counter()
+print(json.dumps({"import_ms": (imported - started) * 1000, "ready_ms": (ready - started) * 1000}))
+"""
+
+
+def main(runs: int, target_ms: float) -> None:
+    samples = []
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, "-c", PROBE], capture_output=True, text=True, check=True).stdout
+        samples.append(json.loads(output.strip().splitlines()[-1]))
+
+    import_ms = statistics.median(s["import_ms"] for s in samples)
+    ready_ms = statistics.median(s["ready_ms"] for s in samples)
+    verdict = "OK" if ready_ms <= target_ms else "OVER TARGET"
+    print(f"median import {import_ms:.0f} ms, first /health {ready_ms:.0f} ms (target {target_ms:.0f} ms) {verdict}")
+    if ready_ms > target_ms:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 5,
+        float(sys.argv[2]) if len(sys.argv) > 2 else 1500,
+    )
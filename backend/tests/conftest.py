@@ -0,0 +1,4 @@
+import os
+
+# Tests run against the in-memory stores; an empty URI keeps a local .env from pointing them at Mongo.
+os.environ["MONGODB_URI"] = ""
@@ -0,0 +1,101 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import main
+from app.admission import AdmissionController, AdmissionRejected
+from app.security import encrypt_secret
+
+
+def test_waiting_users_are_granted_round_robin():
+    async def scenario() -> list[str]:
+        controller = AdmissionController(user_concurrency=4, org_concurrency=1, queue_budget_seconds=30)
+        order: list[str] = []
+        release = asyncio.Event()
+
+        async def request(user: str) -> None:
+            async with controller.slot("Org", user):
+                order.append(user)
+                await release.wait()
+
+        holder = asyncio.create_task(request("holder"))
+        await asyncio.sleep(0)
+        waiters = []
+        for user in ("busy", "busy", "busy", "quiet"):
+            waiters.append(asyncio.create_task(request(user)))
+            await asyncio.sleep(0)
+        release.set()
+        await asyncio.gather(holder, *waiters)
+        return order
+
+    # The quiet user is served after one of the busy user's requests, not after all three.
+    assert asyncio.run(scenario()) == ["holder", "busy", "quiet", "busy", "busy"]
+
+
+def test_requests_over_the_queue_budget_are_rejected_with_retry_after():
+    async def scenario() -> AdmissionRejected:
+        controller = AdmissionController(user_concurrency=1, org_concurrency=8, queue_budget_seconds=0.5)
+        async with controller.slot("Org", "user"):
+            with pytest.raises(AdmissionRejected) as info:
+                async with controller.slot("Org", "user"):
+                    pass
+        assert controller.snapshot()["in_flight_by_org"] == {}
+        return info.value
+
+    rejected = asyncio.run(scenario())
+    assert rejected.reason == "over_budget"
+    assert rejected.retry_after >= 1
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(main, "admission", AdmissionController(user_concurrency=1, queue_budget_seconds=0.5))
+    with TestClient(main.app) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def session_id():
+    session_id = main._new_session("dev@example.com", [("Contoso", encrypt_secret("pat"))])
+    yield session_id
+    main.session_store.pop(session_id, None)
+
+
+def _stub_export(monkeypatch, rows):
+    async def allowed(session, project):
+        return None
+
+    async def fresh(*args, **kwargs):
+        return None
+
+    monkeypatch.setattr(main, "_authorize_project", allowed)
+    monkeypatch.setattr(main, "_refresh_builds", fresh)
+    monkeypatch.setattr(main.build_store, "iter_builds", lambda *args, **kwargs: rows())
+
+
+def test_streaming_export_holds_its_slot_until_the_body_is_sent(client, session_id, monkeypatch):
+    in_flight: list[dict] = []
+
+    def rows():
+        in_flight.append(main.admission.snapshot()["in_flight_by_org"])
+        yield from ()
+
+    _stub_export(monkeypatch, rows)
+    response = client.get("/api/projects/proj/export/builds", params={"session_id": session_id})
+
+    assert response.status_code == 200
+    assert in_flight == [{"contoso": 1}]
+    assert main.admission.snapshot()["in_flight_by_org"] == {}
+
+
+def test_busy_user_gets_429_with_retry_after(client, session_id, monkeypatch):
+    _stub_export(monkeypatch, lambda: iter(()))
+    main.admission._grant("contoso", "dev@example.com")
+    try:
+        response = client.get("/api/projects/proj/export/builds", params={"session_id": session_id})
+    finally:
+        main.admission._release("contoso", "dev@example.com")
+
+    assert response.status_code == 429
+    assert int(response.headers["retry-after"]) >= 1
@@ -0,0 +1,46 @@
+from app.build_store import BuildStore
+
+
+def _build(build_id: int, **fields) -> dict:
+    return {"id": build_id, "status": "completed", "result": "failed", "definition": {"id": 1, "name": "ci"}, **fields}
+
+
+def test_claim_builds_claims_each_build_once():
+    store = BuildStore()
+    store.upsert_builds("Org", "proj", [_build(1), _build(2)])
+
+    assert [b["id"] for b in store.claim_builds("org", "proj", [1, 2, 3], "tests_ingested")] == [1, 2]
+    assert store.claim_builds("org", "proj", [1, 2], "tests_ingested") == []
+    # Flags are independent, so another consumer still gets every build.
+    assert len(store.claim_builds("org", "proj", [1, 2], "other")) == 2
+
+
+def test_claim_builds_leaves_builds_missing_required_fields():
+    store = BuildStore()
+    store.upsert_builds("org", "proj", [_build(1), _build(2, finishTime="2026-10-01T10:00:00Z")])
+
+    claimed = store.claim_builds("org", "proj", [1, 2], "rolled_up", require=("finishTime",))
+    assert [b["id"] for b in claimed] == [2]
+
+    store.upsert_builds("org", "proj", [_build(1, finishTime="2026-10-01T11:00:00Z")])
+    assert [b["id"] for b in store.claim_builds("org", "proj", [1, 2], "rolled_up", require=("finishTime",))] == [1]
+
+
+def test_released_builds_can_be_claimed_again():
+    store = BuildStore()
+    store.upsert_builds("org", "proj", [_build(1)])
+    store.claim_builds("org", "proj", [1], "tests_ingested")
+
+    store.release_builds("org", "proj", [1], "tests_ingested")
+
+    assert [b["id"] for b in store.claim_builds("org", "proj", [1], "tests_ingested")] == [1]
+
+
+
+
+
+def test_list_unflagged_returns_oldest_first():
+    store = BuildStore()
+    store.upsert_builds("org", "proj", [_build(5), _build(3), _build(9), _build(4, result="succeeded")])
+
+    assert [b["id"] for b in store.list_unflagged("org", "proj", "tests_ingested", ("failed",), limit=2)] == [3, 5]
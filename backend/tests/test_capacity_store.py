@@ -0,0 +1,116 @@
+import asyncio
+from datetime import datetime
+
+from app import main
+from app.capacity_store import UNKNOWN_POOL, CapacityStore
+
+START = datetime(2026, 10, 1)
+END = datetime(2026, 10, 1, 23, 59)
+
+
+def _build(build_id: int, definition_id: int, pool_id: int | None, queued: str, started: str, finished: str) -> dict:
+    build = {
+        "id": build_id,
+        "definition": {"id": definition_id, "name": f"pipeline-{definition_id}"},
+        "queueTime": f"2026-10-01T{queued}Z",
+        "startTime": f"2026-10-01T{started}Z",
+        "finishTime": f"2026-10-01T{finished}Z",
+    }
+    if pool_id is not None:
+        build["queue"] = {"pool": {"id": pool_id, "name": f"pool-{pool_id}"}}
+    return build
+
+
+def test_rollups_split_wait_and_run_time_by_pipeline_and_pool():
+    store = CapacityStore()
+    store.add_builds(
+        "Org",
+        "proj",
+        [
+            _build(1, 1, 7, "10:00:00", "10:01:00", "10:11:00"),
+            _build(2, 1, 7, "10:30:00", "10:30:20", "10:35:20"),
+            _build(3, 2, None, "11:00:00", "11:02:00", "11:03:00"),
+            # Not started yet: nothing to roll up.
+            {"id": 4, "definition": {"id": 1}, "queueTime": "2026-10-01T12:00:00Z"},
+        ],
+    )
+
+    summary = store.summarize("org", "proj", START, END, granularity="hour")
+
+    assert summary["runs"] == 3
+    assert summary["queue_wait_seconds"]["max"] == 120.0
+    assert summary["busy_seconds"] == 600 + 300 + 60
+    assert sorted(summary["series"]) == ["2026-10-01T10", "2026-10-01T11"]
+    assert summary["series"]["2026-10-01T10"]["runs"] == 2
+    pools = {p["pool_id"]: p for p in summary["pools"]}
+    assert set(pools) == {"7", UNKNOWN_POOL}
+    assert pools["7"]["queue_wait_seconds"]["avg"] == 40.0
+    assert [p["definition_id"] for p in summary["pipelines"]] == [2, 1]
+
+
+def test_definition_filter_and_daily_buckets_read_the_same_rollups():
+    store = CapacityStore()
+    store.add_builds(
+        "org",
+        "proj",
+        [_build(1, 1, 7, "10:00:00", "10:01:00", "10:02:00"), _build(2, 2, 7, "11:00:00", "11:00:30", "11:01:00")],
+    )
+
+    daily = store.summarize("org", "proj", START, END, definition_id=2, granularity="day")
+
+    assert daily["granularity"] == "day"
+    assert daily["runs"] == 1
+    assert list(daily["series"]) == ["2026-10-01"]
+    assert daily["queue_wait_seconds"]["max"] == 30.0
+
+
+def test_pool_samples_are_reported_per_pool_and_only_when_allowed():
+    store = CapacityStore()
+    store.add_builds("org", "proj", [_build(1, 1, 7, "10:00:00", "10:01:00", "10:02:00")])
+    at = datetime(2026, 10, 1, 10, 5)
+    for busy in (1, 3):
+        store.record_pool_sample(
+            "Org",
+            [
+                {"pool_id": 7, "pool_name": "pool-7", "agents": 4, "online": 4, "busy": busy},
+                {"pool_id": 9, "pool_name": "pool-9", "agents": 2, "online": 0, "busy": 0},
+            ],
+            at=at,
+        )
+
+    summary = store.summarize("org", "proj", START, END, granularity="hour")
+
+    usage = summary["pools"][0]["usage"]
+    assert usage["samples"] == 2
+    assert usage["busy_avg"] == 2.0
+    assert usage["utilization"] == 0.5
+    assert usage["series"]["2026-10-01T10"]["busy_max"] == 3
+    assert [p["pool_id"] for p in summary["other_pools"]] == ["9"]
+    assert summary["other_pools"][0]["utilization"] is None
+
+    hidden = store.summarize("org", "proj", START, END, granularity="hour", pool_usage=False)
+    assert hidden["pools"][0]["usage"] is None
+    assert hidden["other_pools"] == []
+
+
+def test_pool_sample_time_is_stamped_only_after_a_stored_sample(monkeypatch):
+    session = {"organization": "Sampled", "encrypted_pat": main.encrypt_secret("pat"), "session_id": "s"}
+    outcomes = [RuntimeError("store unavailable"), None]
+
+    async def sample(client, organization):
+        outcome = outcomes.pop(0)
+        if outcome:
+            raise outcome
+
+    async def run_once() -> None:
+        main._schedule_pool_sample(session)
+        await main._background_tasks["pools:sampled"]
+
+    monkeypatch.setattr(main, "_sample_agent_pools", sample)
+    monkeypatch.setattr(main, "_pools_sampled_at", {})
+
+    asyncio.run(run_once())
+    assert "sampled" not in main._pools_sampled_at
+
+    asyncio.run(run_once())
+    assert "sampled" in main._pools_sampled_at
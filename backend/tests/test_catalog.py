@@ -0,0 +1,31 @@
+import time
+
+from app import main
+from app.catalog import Catalog
+from app.security import encrypt_secret
+
+
+def _session(pat: str) -> dict:
+    return {"organization": "Contoso", "encrypted_pat": encrypt_secret(pat)}
+
+
+def test_sessions_with_the_same_pat_share_a_catalog(monkeypatch):
+    monkeypatch.setattr(main, "catalogs", main.OrderedDict())
+
+    catalog = main._session_catalog(_session("pat-a"))
+
+    assert main._session_catalog(_session("pat-a")) is catalog
+    assert main._session_catalog(_session("pat-b")) is not catalog
+
+
+def test_catalogs_unused_for_several_refreshes_are_dropped(monkeypatch):
+    monkeypatch.setattr(main, "catalogs", main.OrderedDict())
+    idle = main.CATALOG_IDLE_REFRESHES * main.settings.catalog_refresh_seconds + 1
+    main.catalogs["stale"] = (time.monotonic() - idle, Catalog())
+    main.catalogs["recent"] = (time.monotonic() - 1, Catalog())
+
+    main._session_catalog(_session("pat-a"))
+
+    assert "stale" not in main.catalogs
+    assert list(main.catalogs)[0] == "recent"
+    assert len(main.catalogs) == 2
@@ -0,0 +1,95 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from app import main
+
+
+@pytest.fixture
+def client(monkeypatch):
+    scheduled: list[list[str]] = []
+    monkeypatch.setattr(main.resource_prober, "schedule", lambda urls: scheduled.append(sorted(urls)) or 0)
+    with TestClient(main.app) as test_client:
+        test_client.scheduled = scheduled
+        yield test_client
+
+
+@pytest.fixture
+def auth_token(client):
+    response = client.post("/api/auth/login", json={"email_or_username": "admin@gmail.com", "password": "admin"})
+    return response.json()["auth_token"]
+
+
+@pytest.fixture
+def dashboard_id(client, auth_token):
+    response = client.post("/api/dashboards", params={"auth_token": auth_token}, json={"name": "Cards board"})
+    return response.json()["id"]
+
+
+def _add_card(client, auth_token, dashboard_id, name: str, environment: str = "prod") -> str:
+    url = f"https://{name}.example.com/health"
+    response = client.post(
+        f"/api/dashboards/{dashboard_id}/resources",
+        params={"auth_token": auth_token},
+        json={"project": "proj", "environment": environment, "name": name, "url": url},
+    )
+    assert response.status_code == 200
+    return url
+
+
+def test_304_schedules_probes_without_reading_cards(client, auth_token, dashboard_id, monkeypatch):
+    url = _add_card(client, auth_token, dashboard_id, "api")
+    path = f"/api/dashboards/{dashboard_id}/resources"
+    params = {"auth_token": auth_token}
+    etag = client.get(path, params=params).headers["etag"]
+    client.scheduled.clear()
+
+    def unexpected(*args, **kwargs):
+        raise AssertionError("store read on the 304 path")
+
+    monkeypatch.setattr(main.resource_store, "list_resources", unexpected)
+    monkeypatch.setattr(main.user_store, "get_dashboard", unexpected)
+    cached = client.get(path, params=params, headers={"If-None-Match": f'W/{etag}, "other"'})
+
+    assert cached.status_code == 304
+    assert client.scheduled == [[url]]
+
+
+def test_etag_moves_with_cards_and_status_changes_only(client, auth_token, dashboard_id):
+    api = _add_card(client, auth_token, dashboard_id, "api")
+    path = f"/api/dashboards/{dashboard_id}/resources"
+    params = {"auth_token": auth_token}
+    etag = client.get(path, params=params).headers["etag"]
+
+    _add_card(client, auth_token, dashboard_id, "web")
+    with_card = client.get(path, params=params, headers={"If-None-Match": etag})
+    assert with_card.status_code == 200
+    etag = with_card.headers["etag"]
+
+    main.resource_prober._record(api, "up", 200, 0.01, None)
+    probed = client.get(path, params=params, headers={"If-None-Match": etag})
+    assert probed.status_code == 200
+    assert probed.json()[0]["health"]["status"] == "up"
+    etag = probed.headers["etag"]
+
+    # A new latency with the same status keeps the ETag, so revalidation stays a 304.
+    main.resource_prober._record(api, "up", 200, 0.02, None)
+    assert client.get(path, params=params, headers={"If-None-Match": etag}).status_code == 304
+
+
+def test_filters_apply_to_the_listing(client, auth_token, dashboard_id):
+    _add_card(client, auth_token, dashboard_id, "api", environment="prod")
+    stage = _add_card(client, auth_token, dashboard_id, "web", environment="stage")
+    path = f"/api/dashboards/{dashboard_id}/resources"
+
+    rows = client.get(path, params={"auth_token": auth_token, "environment": "stage"}).json()
+
+    assert [row["url"] for row in rows] == [stage]
+    # Probes still cover every card of the dashboard.
+    assert len(client.scheduled[-1]) == 2
+
+
+def test_unknown_dashboard_is_not_found_even_with_if_none_match(client, auth_token):
+    response = client.get(
+        "/api/dashboards/missing/resources", params={"auth_token": auth_token}, headers={"If-None-Match": "*"}
+    )
+    assert response.status_code == 404
@@ -0,0 +1,67 @@
+from datetime import datetime, timedelta
+
+from app.main import _deployment_runs
+
+NOW = datetime(2026, 10, 18, 12, 0)
+STALE_BEFORE = NOW - timedelta(hours=24)
+
+
+def _time(moment: datetime) -> str:
+    return moment.isoformat() + "Z"
+
+
+def _record(record_id: int, run_id: int, started: datetime, result: str | None = "succeeded") -> dict:
+    record = {"id": record_id, "owner": {"id": run_id}, "queueTime": _time(started), "startTime": _time(started)}
+    if result:
+        record.update(result=result, finishTime=_time(started + timedelta(minutes=10)))
+    return record
+
+
+def test_jobs_are_grouped_per_run_oldest_first():
+    started = NOW - timedelta(hours=3)
+    records = [
+        _record(13, 200, started + timedelta(hours=1)),
+        _record(12, 100, started, "failed"),
+        _record(11, 100, started),
+    ]
+    builds = {100: {"queueTime": _time(started - timedelta(minutes=5))}}
+
+    deployments, cursor = _deployment_runs(records, builds, STALE_BEFORE)
+
+    assert [d["run_id"] for d in deployments] == [100, 200]
+    assert deployments[0]["result"] == "failed"
+    assert deployments[0]["lead_seconds"] == 15 * 60
+    assert deployments[1]["lead_seconds"] is None
+    assert cursor == 13
+
+
+def test_run_in_progress_holds_the_cursor_back():
+    started = NOW - timedelta(hours=2)
+    records = [
+        _record(23, 300, started + timedelta(hours=1)),
+        _record(22, 200, started, result=None),
+        _record(21, 100, started),
+    ]
+
+    deployments, cursor = _deployment_runs(records, {}, STALE_BEFORE)
+
+    assert [d["run_id"] for d in deployments] == [100]
+    assert cursor == 21
+
+
+def test_run_stuck_in_progress_is_skipped():
+    stuck = NOW - timedelta(days=3)
+    records = [
+        _record(33, 300, NOW - timedelta(hours=1)),
+        _record(32, 200, stuck, result=None),
+        _record(31, 100, stuck),
+    ]
+
+    deployments, cursor = _deployment_runs(records, {}, STALE_BEFORE)
+
+    assert [d["run_id"] for d in deployments] == [100, 300]
+    assert cursor == 33
+
+
+def test_empty_listing_has_no_cursor():
+    assert _deployment_runs([], {}, STALE_BEFORE) == ([], None)
@@ -0,0 +1,47 @@
+import pytest
+from fastapi.testclient import TestClient
+from starlette.requests import Request
+
+from app import main
+from app.responses import etag_for, etag_matches
+
+
+def _request(if_none_match: str | None) -> Request:
+    headers = [(b"if-none-match", if_none_match.encode())] if if_none_match else []
+    return Request({"type": "http", "headers": headers})
+
+
+@pytest.mark.parametrize(
+    "header, matches",
+    [(None, False), ('"other"', False), ('"other", W/{etag}', True), ("{etag}", True), ("*", True)],
+)
+def test_etag_matches(header, matches):
+    etag = etag_for("scope", 3)
+    assert etag_matches(_request(header.format(etag=etag) if header else None), etag) is matches
+
+
+def test_etag_depends_on_every_version():
+    assert etag_for("dashboard", "d1", 1) != etag_for("dashboard", "d1", 2)
+    assert etag_for("dashboard", "d1", 1) == etag_for("dashboard", "d1", 1)
+
+
+@pytest.fixture
+def client():
+    with TestClient(main.app) as test_client:
+        yield test_client
+
+
+def test_dashboards_answer_304_until_a_dashboard_is_added(client):
+    login = client.post("/api/auth/login", json={"email_or_username": "admin@gmail.com", "password": "admin"})
+    params = {"auth_token": login.json()["auth_token"]}
+    etag = client.get("/api/dashboards", params=params).headers["etag"]
+
+    cached = client.get("/api/dashboards", params=params, headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.headers["etag"] == etag
+    assert cached.content == b""
+
+    client.post("/api/dashboards", params=params, json={"name": "Another board"})
+    changed = client.get("/api/dashboards", params=params, headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["etag"] != etag
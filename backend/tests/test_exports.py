@@ -0,0 +1,74 @@
+import csv
+import io
+from datetime import datetime
+
+import pytest
+
+from app import exports
+from app.exports import (
+    BUILD_COLUMNS,
+    attachment_disposition,
+    build_record,
+    csv_chunks,
+    export_chunks,
+    parquet_available,
+    parquet_chunks,
+)
+
+
+def _builds(count: int) -> list[dict]:
+    return [
+        {
+            "id": i,
+            "buildNumber": f"2026.{i}",
+            "definition": {"id": 1, "name": "ci, nightly"},
+            "result": "succeeded",
+            "queueTime": "2026-10-01T10:00:00Z",
+            "startTime": "2026-10-01T10:00:30Z",
+            "finishTime": "2026-10-01T10:05:30Z",
+        }
+        for i in range(1, count + 1)
+    ]
+
+
+def test_csv_streams_in_bounded_chunks_with_one_header(monkeypatch):
+    monkeypatch.setattr(exports, "CSV_CHUNK_ROWS", 2)
+
+    chunks = list(export_chunks("csv", _builds(5), build_record, BUILD_COLUMNS))
+
+    assert len(chunks) == 3
+    rows = list(csv.DictReader(io.StringIO(b"".join(chunks).decode("utf-8"))))
+    assert [row["id"] for row in rows] == ["1", "2", "3", "4", "5"]
+    assert rows[0]["definition_name"] == "ci, nightly"
+    assert rows[0]["queue_time"] == "2026-10-01T10:00:00Z"
+    assert rows[0]["queue_wait_seconds"] == "30.0"
+    assert rows[0]["duration_seconds"] == "300.0"
+    assert rows[0]["pool_name"] == ""
+
+
+def test_csv_without_rows_is_just_the_header():
+    assert b"".join(csv_chunks([], [("id", "int"), ("name", "str")])) == b"id,name\r\n"
+
+
+@pytest.mark.skipif(not parquet_available(), reason="pyarrow not installed")
+def test_parquet_writes_typed_row_groups(monkeypatch):
+    import pyarrow.parquet as pq
+
+    monkeypatch.setattr(exports, "PARQUET_ROW_GROUP_ROWS", 2)
+    records = [build_record(b) for b in _builds(5)]
+
+    chunks = list(parquet_chunks(records, BUILD_COLUMNS))
+
+    parquet = pq.ParquetFile(io.BytesIO(b"".join(chunks)))
+    assert parquet.metadata.num_row_groups == 3
+    table = parquet.read()
+    assert table.column("id").to_pylist() == [1, 2, 3, 4, 5]
+    assert table.column("queue_time").to_pylist()[0] == datetime(2026, 10, 1, 10, 0)
+    assert str(table.schema.field("duration_seconds").type) == "double"
+
+
+def test_attachment_disposition_keeps_non_latin_names_readable():
+    header = attachment_disposition('Équipe "web".csv')
+
+    header.encode("latin-1")
+    assert header == "attachment; filename=\"_quipe _web_.csv\"; filename*=UTF-8''%C3%89quipe%20%22web%22.csv"
@@ -0,0 +1,69 @@
+import asyncio
+
+import pytest
+
+from app.health_probe import ResourceProber, address_allowed
+
+
+@pytest.mark.parametrize(
+    "address, allowed",
+    [
+        ("93.184.216.34", True),
+        ("2606:2800:220:1:248:1893:25c8:1946", True),
+        ("127.0.0.1", False),
+        ("10.1.2.3", False),
+        ("169.254.169.254", False),
+        ("::1", False),
+        ("::ffff:127.0.0.1", False),
+        ("fe80::1%eth0", False),
+        ("224.0.0.1", False),
+        ("not-an-address", False),
+    ],
+)
+def test_address_allowed(address, allowed):
+    assert address_allowed(address) is allowed
+
+
+def _probe(prober: ResourceProber, url: str) -> dict:
+    async def run() -> dict:
+        prober.start()
+        try:
+            await prober._probe(url)
+        finally:
+            await prober.stop()
+        return prober.status(url)
+
+    return asyncio.run(run())
+
+
+def test_private_destinations_are_not_probed():
+    result = _probe(ResourceProber(), "http://127.0.0.1:9/health")
+
+    assert result["status"] == "skipped"
+    assert result["http_status"] is None
+
+
+def test_allowlist_refuses_other_hosts():
+    result = _probe(ResourceProber(allowed_hosts=("example.com",)), "https://203.0.113.7/")
+
+    assert result["status"] == "skipped"
+    assert result["error"] == "Host not in the probe allowlist"
+
+
+def test_watched_dashboards_are_told_about_status_changes():
+    changed = []
+    prober = ResourceProber(on_change=changed.append)
+    prober.watch("d1", ["https://a.example.com", "https://b.example.com"])
+    prober.watch("d2", ["https://b.example.com"])
+
+    prober._record("https://b.example.com", "up", 200, 0.1, None)
+    prober._record("https://b.example.com", "up", 200, 0.2, None)
+    prober._record("https://a.example.com", "down", 503, 0.1, None)
+    prober._record("https://unlisted.example.com", "down", None, None, "ConnectError")
+
+    assert changed == ["d1", "d2", "d1"]
+
+
+def test_unwatched_dashboards_are_not_scheduled():
+    prober = ResourceProber()
+    assert prober.schedule_dashboard("unknown") is False
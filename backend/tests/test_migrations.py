@@ -0,0 +1,29 @@
+from app.migrations import ensure_unique_indexes, index_plan
+
+
+class _Collection:
+    def __init__(self, name: str, created: list) -> None:
+        self.name = name
+        self.created = created
+
+    def create_index(self, keys, **options):
+        self.created.append((self.name, keys, options))
+        return f"index{len(self.created)}"
+
+
+class _Database:
+    def __init__(self) -> None:
+        self.created: list = []
+
+    def __getitem__(self, name: str) -> _Collection:
+        return _Collection(name, self.created)
+
+
+def test_compare_and_set_collections_get_their_unique_indexes():
+    db = _Database()
+    ensure_unique_indexes(db)
+
+    unique = {name for name, _, options in db.created if options.get("unique")}
+    assert {"dora_environments", "push_cursors", "pr_cursors", "pull_requests", "test_history"} <= unique
+    assert all(options.get("unique") for _, _, options in db.created)
+    assert len(db.created) == sum(1 for indexes in index_plan().values() for _, o in indexes if o.get("unique"))
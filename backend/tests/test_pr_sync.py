@@ -0,0 +1,68 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from app import main
+
+PULL_REQUESTS = 400
+LISTING_LIMIT = 60
+
+
+def _time(moment: datetime) -> str:
+    return moment.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+class _PullRequestClient:
+    """Repositories with pull requests closed evenly over the history window."""
+
+    def __init__(self, repositories: int) -> None:
+        now = datetime.utcnow()
+        step = timedelta(days=main.settings.pr_history_days) / (PULL_REQUESTS + 1)
+        self.repositories = [{"id": f"repo-{i}", "name": f"repo-{i}"} for i in range(repositories)]
+        self.closed = [now - step * (i + 1) for i in range(PULL_REQUESTS)]
+        self.truncated: dict[str, int] = {}
+        self.listing = 0
+        self.most_listing = 0
+
+    async def list_repositories(self, project: str) -> list[dict]:
+        return self.repositories
+
+    async def list_completed_pull_requests(self, project, repository_id, closed_since, closed_until, concurrency):
+        self.listing += 1
+        self.most_listing = max(self.most_listing, self.listing)
+        await asyncio.sleep(0)
+        self.listing -= 1
+        since = datetime.strptime(closed_since, "%Y-%m-%dT%H:%M:%SZ")
+        until = datetime.strptime(closed_until, "%Y-%m-%dT%H:%M:%SZ")
+        listed = [
+            {"pullRequestId": i + 1, "creationDate": _time(closed - timedelta(hours=1)), "closedDate": _time(closed)}
+            for i, closed in enumerate(self.closed)
+            if since <= closed <= until
+        ]
+        if len(listed) > LISTING_LIMIT:
+            self.truncated[repository_id] = self.truncated.get(repository_id, 0) + 1
+            return listed[:LISTING_LIMIT], True
+        return listed, False
+
+    async def list_pull_request_threads(self, project, repository_id, pull_request_id) -> list[dict]:
+        return []
+
+
+def test_windows_keep_the_width_that_fit_and_repositories_are_bounded(monkeypatch):
+    monkeypatch.setattr(main.settings, "pr_sync_concurrency", 2)
+    client = _PullRequestClient(repositories=5)
+    recorded: dict[str, set[int]] = {}
+    record = main.pr_store.record_pull_requests
+
+    def collect(organization, project, repository_id, repository_name, pull_requests, closed_until):
+        recorded.setdefault(repository_id, set()).update(pr["id"] for pr in pull_requests)
+        return record(organization, project, repository_id, repository_name, pull_requests, closed_until)
+
+    monkeypatch.setattr(main.pr_store, "record_pull_requests", collect)
+    asyncio.run(main._sync_pull_requests(client, "pr-windows", "proj"))
+
+    assert sorted(recorded) == [repo["id"] for repo in client.repositories]
+    assert all(len(ids) == PULL_REQUESTS for ids in recorded.values())
+    # 90 days of 400 pull requests fit a listing of 60 after three halvings; later windows
+    # start at that width instead of being split from "now" again.
+    assert client.truncated == {repo["id"]: 3 for repo in client.repositories}
+    assert client.most_listing == 2
@@ -0,0 +1,42 @@
+from app.push_store import PushStore
+
+
+def _push(push_id: int, day: str = "2026-10-01", author: str = "Dev@x") -> dict:
+    return {"pushId": push_id, "date": f"{day}T08:00:00Z", "pushedBy": {"uniqueName": author}}
+
+
+def _total(store: PushStore) -> int:
+    return sum(store.aggregate("org", "proj")["by_day"].values())
+
+
+def test_cursor_advances_with_compare_and_set():
+    store = PushStore()
+    assert store.record_pushes("org", "proj", "r0", "repo", [_push(2), _push(1)], None) == 2
+
+    # A second ingester that listed from the same (now outdated) cursor loses and counts nothing.
+    assert store.record_pushes("org", "proj", "r0", "repo", [_push(3), _push(2), _push(1)], None) == 0
+    assert _total(store) == 2
+    assert store.get_cursors("org", "proj")["r0"]["last_push_id"] == 2
+
+    assert store.record_pushes("org", "proj", "r0", "repo", [_push(3), _push(2)], 2) == 1
+    assert store.record_pushes("org", "proj", "r0", "repo", [_push(4)], 2) == 0
+    assert _total(store) == 3
+
+
+def test_pushes_at_or_below_the_cursor_are_ignored():
+    store = PushStore()
+    store.record_pushes("org", "proj", "r0", "repo", [_push(5)], None)
+
+    assert store.record_pushes("org", "proj", "r0", "repo", [_push(5), _push(4)], 5) == 0
+    assert store.get_cursors("org", "proj")["r0"]["last_push_id"] == 5
+
+
+def test_counts_are_kept_per_day_and_author():
+    store = PushStore()
+    store.record_pushes(
+        "Org", "proj", "r0", "repo", [_push(3, "2026-10-02"), _push(2, author="Other@x"), _push(1)], None
+    )
+
+    aggregate = store.aggregate("org", "proj")
+    assert aggregate["by_day"] == {"2026-10-01": 2, "2026-10-02": 1}
+    assert aggregate["by_author"] == {"dev@x": 2, "other@x": 1}
@@ -0,0 +1,32 @@
+import json
+from datetime import datetime
+
+from pydantic import BaseModel, Field
+
+from app.responses import dumps, project_rows
+
+
+class Card(BaseModel):
+    id: str
+    tags: list[str] = Field(default_factory=list)
+    pinned: bool = False
+    notes: str | None = None
+    created_at: datetime
+
+
+def test_fast_projection_matches_validated_output():
+    rows = [
+        {"id": "a", "created_at": datetime(2026, 10, 1, 8, 30), "owner": "dropped"},
+        {"id": "b", "tags": ["prod"], "pinned": True, "notes": "n", "created_at": datetime(2026, 10, 2)},
+    ]
+
+    fast = json.loads(dumps(project_rows(Card, rows)))
+    validated = [Card(**row).model_dump(mode="json") for row in rows]
+
+    assert fast == validated
+    assert fast[0]["tags"] == [] and fast[0]["pinned"] is False
+
+
+def test_default_factories_are_not_shared_between_rows():
+    first, second = project_rows(Card, [{"id": "a", "created_at": None}, {"id": "b", "created_at": None}])
+    assert first["tags"] is not second["tags"]
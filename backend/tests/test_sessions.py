@@ -0,0 +1,90 @@
+import httpx
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+
+from app import main
+from app.catalog import Catalog
+from app.security import encrypt_secret
+
+
+@pytest.fixture
+def session_id():
+    session_id = main._new_session(
+        "dev@example.com", [("Contoso", encrypt_secret("pat-a")), ("Fabrikam", encrypt_secret("pat-b"))]
+    )
+    yield session_id
+    main.session_store.pop(session_id, None)
+
+
+@pytest.fixture
+def client(monkeypatch):
+    async def valid(organization, pat):
+        return None
+
+    monkeypatch.setattr(main, "_validate_credentials", valid)
+    with TestClient(main.app) as test_client:
+        yield test_client
+
+
+def test_views_select_an_organization_and_default_to_the_first(session_id):
+    assert main._get_session(session_id)["organization"] == "Contoso"
+    fabrikam = main._get_session(session_id, " fabrikam ")
+    assert fabrikam["organization"] == "Fabrikam"
+    assert main.decrypt_secret(fabrikam["encrypted_pat"]) == "pat-b"
+    assert [v["scope"] for v in main._session_views(session_id)] == [f"{session_id}:contoso", f"{session_id}:fabrikam"]
+
+    with pytest.raises(HTTPException) as info:
+        main._get_session(session_id, "Northwind")
+    assert info.value.status_code == 404
+
+
+def test_cross_org_projects_merge_and_report_failing_organizations(client, session_id, monkeypatch):
+    async def projects(view):
+        if view["organization"] == "Fabrikam":
+            raise httpx.ConnectError("unreachable")
+        return "etag", [{"id": "2", "name": "web"}, {"id": "1", "name": "API"}]
+
+    monkeypatch.setattr(main, "_cached_projects", projects)
+    body = client.get("/api/orgs/projects", params={"session_id": session_id}).json()
+
+    assert [p["name"] for p in body["projects"]] == ["API", "web"]
+    assert {p["organization"] for p in body["projects"]} == {"Contoso"}
+    assert body["organizations"][0] == {"organization": "Contoso", "project_count": 2, "error": None}
+    assert body["organizations"][1]["organization"] == "Fabrikam"
+    assert body["organizations"][1]["error"]
+
+
+def test_connect_adds_an_organization_to_the_users_session(client, session_id, monkeypatch):
+    monkeypatch.setattr(main, "catalogs", main.OrderedDict())
+    catalog = Catalog()
+    catalog.refreshed_at = 1.0
+    catalog._projects = {"1": {}, "2": {}}
+    main.catalogs[main._credential_key("Contoso", "pat-a")] = (0.0, catalog)
+    token = client.post("/api/auth/login", json={"email_or_username": "admin@gmail.com", "password": "admin"})
+    auth_token = token.json()["auth_token"]
+    main.session_store[session_id]["owner_email"] = main.auth_sessions[auth_token]["email"]
+
+    response = client.post(
+        "/api/connect",
+        params={"auth_token": auth_token, "session_id": session_id},
+        json={"organization": "Northwind", "pat": "pat-c"},
+    )
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["organizations"] == ["Contoso", "Fabrikam", "Northwind"]
+    assert body["project_count"] == 2
+    assert main._get_session(session_id, "northwind")["organization"] == "Northwind"
+
+
+def test_connect_rejects_another_users_session(client, session_id):
+    token = client.post("/api/auth/login", json={"email_or_username": "admin@gmail.com", "password": "admin"})
+
+    response = client.post(
+        "/api/connect",
+        params={"auth_token": token.json()["auth_token"], "session_id": session_id},
+        json={"organization": "Northwind", "pat": "pat-c"},
+    )
+
+    assert response.status_code == 403
@@ -0,0 +1,105 @@
+import asyncio
+
+import httpx
+import pytest
+
+from app import main
+
+# Imported under another name so pytest does not take the store for a test class.
+from app.test_store import FAILED, PASSED
+from app.test_store import TestResultStore as HistoryStore
+
+
+def _record(store: HistoryStore, build_id: int, outcome: str) -> None:
+    build = {"id": build_id, "definition": {"id": 1, "name": "ci"}, "finishTime": f"2026-10-{build_id:02d}T00:00:00Z"}
+    store.record_build("org", "proj", build, [{"automatedTestName": "suite.test", "outcome": outcome}])
+
+
+def _history(store: HistoryStore) -> dict:
+    return store._load("org", "proj", 1, ["suite.test"])["suite.test"]
+
+
+def test_out_of_order_builds_keep_history_sorted():
+    store = HistoryStore()
+    _record(store, 3, "Failed")
+    _record(store, 5, "Passed")
+    _record(store, 4, "Failed")
+
+    history = _history(store)
+    assert [entry[0] for entry in history["recent"]] == [3, 4, 5]
+    assert history["runs"] == 3
+    assert history["failures"] == 2
+
+
+def test_last_fields_only_move_forward():
+    store = HistoryStore()
+    _record(store, 7, "Failed")
+    _record(store, 9, "Passed")
+    _record(store, 2, "Failed")
+
+    history = _history(store)
+    assert history["last_build_id"] == 9
+    assert history["last_outcome"] == PASSED
+    assert history["last_failed_build_id"] == 7
+    assert history["last_failed_at"] == "2026-10-07T00:00:00Z"
+
+
+def test_passing_tests_are_not_tracked_until_they_fail():
+    store = HistoryStore()
+    _record(store, 1, "Passed")
+    assert store._load("org", "proj", 1, ["suite.test"]) == {}
+
+    _record(store, 2, "Failed")
+    assert _history(store)["last_outcome"] == FAILED
+
+
+class _TestClient:
+    def __init__(self, failing: set[int]) -> None:
+        self.failing = failing
+
+    async def list_test_runs(self, project: str, build_id: int) -> list[dict]:
+        if build_id in self.failing:
+            raise httpx.ConnectError("unreachable")
+        return [{"id": build_id}]
+
+    async def list_test_results(self, project: str, run_id: int) -> list[dict]:
+        return [{"automatedTestName": "suite.test", "outcome": "Failed"}]
+
+
+def _failed_builds(organization: str, *build_ids: int) -> None:
+    main.build_store.upsert_builds(
+        organization,
+        "proj",
+        [
+            {"id": i, "status": "completed", "result": "failed", "definition": {"id": 1, "name": "ci"}}
+            for i in build_ids
+        ],
+    )
+
+
+def _unflagged(organization: str) -> list[int]:
+    return [b["id"] for b in main.build_store.list_unflagged(organization, "proj", "tests_ingested", ("failed",), 10)]
+
+
+def test_sync_releases_builds_whose_results_were_not_fetched():
+    _failed_builds("release-fetch", 1, 2)
+
+    asyncio.run(main._sync_test_results(_TestClient(failing={2}), "release-fetch", "proj"))
+
+    assert _unflagged("release-fetch") == [2]
+
+
+def test_sync_releases_unrecorded_builds_when_the_store_fails(monkeypatch):
+    _failed_builds("release-store", 1, 2, 3)
+    record_build = main.test_store.record_build
+
+    def fail_on_second(organization, project, build, results):
+        if build["id"] == 2:
+            raise RuntimeError("store unavailable")
+        record_build(organization, project, build, results)
+
+    monkeypatch.setattr(main.test_store, "record_build", fail_on_second)
+    with pytest.raises(RuntimeError):
+        asyncio.run(main._sync_test_results(_TestClient(failing=set()), "release-store", "proj"))
+
+    assert _unflagged("release-store") == [2, 3]
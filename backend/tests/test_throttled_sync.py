@@ -0,0 +1,54 @@
+import asyncio
+
+from app import main
+
+
+def test_sync_runs_once_per_interval_and_retries_unfinished_work():
+    calls = []
+
+    async def run() -> None:
+        async def done() -> bool:
+            calls.append("done")
+            return True
+
+        async def unfinished() -> bool:
+            calls.append("unfinished")
+            return False
+
+        await main._throttled_sync("t:unfinished", 60, unfinished)
+        await main._throttled_sync("t:unfinished", 60, unfinished)
+        await main._throttled_sync("t:done", 60, done)
+        await main._throttled_sync("t:done", 60, done)
+        await main._throttled_sync("t:done", 60, done, force=True)
+
+    asyncio.run(run())
+    assert calls == ["unfinished", "unfinished", "done", "done"]
+
+
+def test_concurrent_callers_share_one_sync():
+    calls = []
+
+    async def run() -> None:
+        async def slow() -> bool:
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return True
+
+        await asyncio.gather(*(main._throttled_sync("t:shared", 60, slow) for _ in range(5)))
+
+    asyncio.run(run())
+    assert calls == [1]
+
+
+def test_idle_states_past_their_interval_are_dropped():
+    async def run() -> None:
+        async def done() -> bool:
+            return True
+
+        await main._throttled_sync("t:expired", 0, done)
+        await asyncio.sleep(0.01)
+        await main._throttled_sync("t:other", 60, done)
+
+    asyncio.run(run())
+    assert "t:expired" not in main._sync_states
+    assert "t:other" in main._sync_states
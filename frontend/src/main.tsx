@@ -1,13 +1,25 @@
-import React, { FormEvent, useMemo, useState } from 'react';
+import React, { FormEvent, useMemo, useRef, useState } from 'react';
 import { createRoot } from 'react-dom/client';
 import './styles.css';
 
 type Step = 'userAuth' | 'homeChoice' | 'dashboardPortal' | 'devopsLogin' | 'projects' | 'dashboard';
 
-type ConnectResponse = { session_id: string; organization: string; project_count: number };
+type ConnectResponse = {
+  session_id: string;
+  organization: string;
+  project_count?: number | null;
+  organizations: string[];
+  failed_organizations: Record<string, string>;
+};
 type AuthResponse = { auth_token: string; email: string; username: string; is_admin: boolean; approved: boolean };
-type DevOpsCredentialInfo = { organization?: string | null; has_pat: boolean; updated_at?: string | null };
+type DevOpsCredentialInfo = {
+  organization?: string | null;
+  has_pat: boolean;
+  updated_at?: string | null;
+  organizations: string[];
+};
 type DashboardItem = { id: string; name: string; description?: string | null; created_by: string; created_at: string };
+type ResourceHealth = { status: 'up' | 'down' | 'skipped'; http_status?: number | null; latency_ms?: number | null; error?: string | null; checked_at: string };
 type DashboardResourceItem = {
   id: string;
   dashboard_id: string;
@@ -18,6 +30,7 @@ type DashboardResourceItem = {
   url: string;
   resource_type?: string | null;
   notes?: string | null;
+  health?: ResourceHealth | null;
 };
 type PendingUser = { id: string; email: string; username: string };
 type Project = { name: string };
@@ -163,6 +176,7 @@ function App() {
   const [modalTitle, setModalTitle] = useState('Failure Explanation');
   const [modalErrorText, setModalErrorText] = useState('');
   const [modalExplanationText, setModalExplanationText] = useState('');
+  const explanationStream = useRef<EventSource | null>(null);
 
   const filteredProjects = useMemo(
     () => projects.filter((p) => p.name.toLowerCase().includes(projectSearch.toLowerCase())),
@@ -473,7 +487,11 @@ function App() {
       setSessionId(payload.session_id);
       const projectsResponse = await fetch(`${API}/api/projects?session_id=${payload.session_id}`);
       setProjects((await projectsResponse.json()) as Project[]);
-      setStatus(`DevOps connected. ${payload.project_count} projects found.`);
+      const failed = Object.keys(payload.failed_organizations);
+      setStatus(
+        `DevOps connected to ${payload.organizations.join(', ')}.` +
+          (failed.length ? ` Could not connect to ${failed.join(', ')}.` : ''),
+      );
       setStep('projects');
     } finally {
       setIsBusy(false);
@@ -485,14 +503,18 @@ function App() {
     setSelectedProject(projectName);
     setIsBusy(true);
     try {
-      const [pResp, aResp] = await Promise.all([
-        fetch(`${API}/api/projects/${encodeURIComponent(projectName)}/pipelines?session_id=${sessionId}`),
-        fetch(`${API}/api/projects/${encodeURIComponent(projectName)}/analytics?session_id=${sessionId}`),
-      ]);
-      setPipelines((await pResp.json()) as Pipeline[]);
-      setAnalytics((await aResp.json()) as Analytics);
+      const response = await fetch(
+        `${API}/api/projects/${encodeURIComponent(projectName)}/overview?session_id=${sessionId}&fields=pipelines,analytics,resources`,
+      );
+      const overview = (await response.json()) as {
+        pipelines: Pipeline[];
+        analytics: Analytics;
+        resources: ResourceItem[];
+      };
+      setPipelines(overview.pipelines);
+      setAnalytics(overview.analytics);
+      setResources(overview.resources);
       setPipelineRuns({});
-      await loadResources(projectName);
       setStep('dashboard');
       setStatus(`Loaded dashboard for ${projectName}.`);
     } finally {
@@ -543,38 +565,68 @@ function App() {
     setLoadingRunsByPipeline((prev) => ({ ...prev, [pipelineId]: true }));
     try {
       const response = await fetch(
-        `${API}/api/projects/${encodeURIComponent(selectedProject)}/pipelines/${pipelineId}/runs?session_id=${sessionId}`,
+        `${API}/api/projects/${encodeURIComponent(selectedProject)}/pipelines/${pipelineId}/runs/history?session_id=${sessionId}&page_size=50`,
       );
-      const runs = (await response.json()) as PipelineRun[];
+      const { runs } = (await response.json()) as { runs: PipelineRun[]; continuation_token: string | null };
       setPipelineRuns((prev) => ({ ...prev, [pipelineId]: runs }));
     } finally {
       setLoadingRunsByPipeline((prev) => ({ ...prev, [pipelineId]: false }));
     }
   };
 
-  const explainRunFailure = async (pipeline: Pipeline, run: PipelineRun) => {
+  const closeExplanationStream = () => {
+    explanationStream.current?.close();
+    explanationStream.current = null;
+  };
+
+  const closeModal = () => {
+    closeExplanationStream();
+    setModalOpen(false);
+  };
+
+  const explainRunFailure = (pipeline: Pipeline, run: PipelineRun) => {
     if (!sessionId || !selectedProject) return;
+    closeExplanationStream();
     setModalTitle(`Failure Explanation · ${pipeline.name} · Run ${run.id}`);
     setModalErrorText('Loading error details...');
     setModalExplanationText('Loading explanation...');
     setModalOpen(true);
-    try {
-      const response = await fetch(
-        `${API}/api/projects/${encodeURIComponent(selectedProject)}/pipelines/${pipeline.id}/error-intelligence?session_id=${sessionId}&run_id=${run.id}`,
-      );
-      const insight = (await response.json()) as ErrorIntelligenceResponse;
+
+    const source = new EventSource(
+      `${API}/api/projects/${encodeURIComponent(selectedProject)}/pipelines/${pipeline.id}/error-intelligence/stream?session_id=${sessionId}&run_id=${run.id}`,
+    );
+    explanationStream.current = source;
+    let explained = false;
+
+    source.addEventListener('insight', (event) => {
+      const insight = JSON.parse((event as MessageEvent).data) as ErrorIntelligenceResponse;
       const matched = insight.failed_runs.find((f) => f.run_id === run.id);
       if (!matched) {
         setModalErrorText('No specific error detail was found for this run.');
         setModalExplanationText('No explanation available.');
+        closeExplanationStream();
         return;
       }
       setModalErrorText(`Failed task: ${matched.failed_task}\nError: ${matched.error_message}\nTimestamp: ${matched.timestamp}`);
-      setModalExplanationText(insight.ai_summary ?? 'AI explanation not configured.');
-    } catch {
-      setModalErrorText('Unable to load error details right now.');
-      setModalExplanationText('Unable to generate explanation right now.');
-    }
+    });
+    source.addEventListener('token', (event) => {
+      const token = JSON.parse((event as MessageEvent).data) as string;
+      setModalExplanationText((prev) => (explained ? prev + token : token));
+      explained = true;
+    });
+    source.addEventListener('error', (event) => {
+      const data = (event as MessageEvent).data;
+      if (data) setModalExplanationText(JSON.parse(data) as string);
+      else if (!explained) {
+        setModalErrorText((prev) => (prev === 'Loading error details...' ? 'Unable to load error details right now.' : prev));
+        setModalExplanationText('Unable to generate explanation right now.');
+      }
+      closeExplanationStream();
+    });
+    source.addEventListener('done', () => {
+      if (!explained) setModalExplanationText('AI explanation not configured.');
+      closeExplanationStream();
+    });
   };
 
   const availableEnvironments = useMemo(() => {
@@ -856,7 +908,23 @@ function App() {
                     <ul className="resource-list">
                       {items.map((r) => (
                         <li key={r.id} className="resource-item">
-                          <p><strong>{r.name}</strong>{r.resource_type ? ` · ${r.resource_type}` : ''}</p>
+                          <p>
+                            <strong>{r.name}</strong>{r.resource_type ? ` · ${r.resource_type}` : ''}{' '}
+                            {r.health ? (
+                              <span
+                                className={`badge badge-health-${r.health.status === 'skipped' ? 'unknown' : r.health.status}`}
+                                title={`Checked ${new Date(r.health.checked_at + 'Z').toLocaleTimeString()}${r.health.error ? ` · ${r.health.error}` : ''}`}
+                              >
+                                {r.health.status === 'up'
+                                  ? `● ${r.health.latency_ms ?? '-'} ms`
+                                  : r.health.status === 'skipped'
+                                    ? '● not probed'
+                                    : `● down${r.health.http_status ? ` (${r.health.http_status})` : ''}`}
+                              </span>
+                            ) : (
+                              <span className="badge badge-health-unknown">● checking</span>
+                            )}
+                          </p>
                           <a href={r.url} target="_blank" rel="noreferrer">{r.url}</a>
                           {r.notes ? <p className="muted">{r.notes}</p> : null}
                           {isAdmin || r.owner_email === userEmail ? (
@@ -1001,7 +1069,7 @@ function App() {
                           {(pipelineRuns[pipeline.id] ?? []).map((run) => (
                             <tr key={run.id}>
                               <td>{run.id}</td><td>{run.state ?? '-'}</td><td>{run.result ?? '-'}</td><td>{run.createdDate ?? '-'}</td>
-                              <td>{run.result === 'failed' ? <button onClick={() => void explainRunFailure(pipeline, run)}>Explain error</button> : '-'}</td>
+                              <td>{run.result === 'failed' ? <button onClick={() => explainRunFailure(pipeline, run)}>Explain error</button> : '-'}</td>
                             </tr>
                           ))}
                         </tbody>
@@ -1018,7 +1086,7 @@ function App() {
               <h3>{modalTitle}</h3>
               <section className="modal-block"><h4>Error</h4><pre className="modal-pre">{modalErrorText}</pre></section>
               <section className="modal-block"><h4>Explanation</h4><pre className="modal-pre">{modalExplanationText}</pre></section>
-              <button onClick={() => setModalOpen(false)}>Close</button>
+              <button onClick={closeModal}>Close</button>
             </dialog>
           ) : null}
         </main>